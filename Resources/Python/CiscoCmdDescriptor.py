@@ -1,5 +1,5 @@
 import logging
-import re
+from CiscoCriteria import CriteriaEvaluator
 
 
 class CiscoCmdDescriptor(object):
@@ -13,27 +13,35 @@ class CiscoCmdDescriptor(object):
         self.regex = list()
         self.empty = None
         self.logger = logging.getLogger(__name__)
+        self.evaluator = None   # Compiled criteria, see compile()
 
     def should_contain(self, contain):
         self.contain.append(contain)
+        self.evaluator = None
 
     def should_not_contain(self, notcontain):
         self.notcontain.append(notcontain)
+        self.evaluator = None
 
     def should_begin_with(self, begin):
         self.begin.append(begin)
+        self.evaluator = None
 
     def should_end_with(self, end):
         self.end.append(end)
+        self.evaluator = None
 
     def should_matched_regex(self, regex):
         self.regex.append(regex)
+        self.evaluator = None
 
     def should_be_empty(self):
         self.empty = True
+        self.evaluator = None
 
     def should_not_be_empty(self):
         self.empty = False
+        self.evaluator = None
 
     def add_criteria(self,
                      should_contain=None,
@@ -63,67 +71,21 @@ class CiscoCmdDescriptor(object):
         if should_be_empty is not None:
             self.empty = should_be_empty
 
-    def parse_cmd_output(self, output):
+        self.evaluator = None
+
+    def compile(self):
+        """Returns the criteria compiled into a CriteriaEvaluator."""
 
-        errmsg = ""
-
-        # Check if output is empty
-        if output.strip():
-            # Not empty
-            if self.empty is True:
-                # Should be empty
-                errmsg += "\t-> Output is not empty [{}]\n".format(output)
-
-            if self.contain:
-                for string in self.contain:
-                    if string not in output:
-                        errmsg += "\t-> Output does not contain[{}]\n".format(string)
-
-            if self.notcontain:
-                for string in self.notcontain:
-                    if string in output:
-                        errmsg += "\t-> Output contains[{}]\n".format(string)
-
-            if self.begin:
-                for start in self.begin:
-                    regex = "^[\s]*" + start + "[\s\S]*"
-
-                    if re.match(regex, output) is None:
-                        errmsg += "\t-> Output does not begin with [{}]\n".format(start)
-
-            if self.end:
-                for last in self.end:
-                    regex = "[\s\S]*" + last + "[\s\S]*$"
-
-                    if re.match(regex, output) is None:
-                        errmsg += "\t-> Output does not end with [{}]\n".format(last)
-
-            if self.regex:
-                for rgx in self.regex:
-                    self.logger.debug("rgx[{}]\noutput[{}]\n".format(rgx,
-                                                                     output))
-                    output_hex = ":".join("{:02x}".format(ord(c)) for c in output)
-                    self.logger.debug("output_hex[{}]\n".format(output_hex))
-                    if re.match(rgx, output) is None:
-                        errmsg += "\t-> Output does not match regex [{}]\n".format(rgx)
-
-        else:
-            # Empty!
-            if self.empty is False:
-                # Should not be empty
-                errmsg += "\t-> Output is empty\n"
-
-            if self.contain:
-                for should in self.contain:
-                    errmsg += "\t-> Output should contain[{}]\n".format(should)
-            if self.begin:
-                for should in self.begin:
-                    errmsg += "\t-> Output should begin with[{}]\n".format(should)
-            if self.end:
-                for should in self.end:
-                    errmsg += "\t-> Output should end with[{}]\n".format(should)
-            if self.regex:
-                for should in self.regex:
-                    errmsg += "\t-> Output should match regex[{}]\n".format(should)
-
-        return errmsg
+        if self.evaluator is None:
+            self.evaluator = CriteriaEvaluator(self.contain,
+                                               self.notcontain,
+                                               self.begin,
+                                               self.end,
+                                               self.regex,
+                                               self.empty,
+                                               self.logger)
+        return self.evaluator
+
+    def parse_cmd_output(self, output):
+        """Returns the error messages of the criteria not met by the output."""
+        return self.compile().evaluate(output)
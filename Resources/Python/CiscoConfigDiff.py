@@ -0,0 +1,72 @@
+from collections import namedtuple
+
+
+# A line of a configuration profile.
+#  section: header of the section the line is in, None for the top level
+#  line: the line as entered
+#  present: whether the line must be in the config, or must not be
+#  procedural: only set by the full configuration procedure, e.g. the SSH
+#  lines that need an RSA key generated first
+ConfigItem = namedtuple("ConfigItem", "section line present procedural")
+
+
+def config_item(section, line, present=True, procedural=False):
+    return ConfigItem(section, line, present, procedural)
+
+
+def diff_config(config, items, match_line):
+    """
+    Returns the ConfigItems of the profile not met by the config, in order.
+
+    match_line(parent, line) returns the node of the line in a ConfigNode,
+    see CiscoConfigure._match_config_line(). Lines that must not be there
+    are also found in their longer forms, e.g. "password" in "password 7 ...".
+    """
+
+    changes = []
+
+    for item in items:
+        parent = config.section(item.section) if item.section else config
+
+        if item.present:
+            met = parent is not None and match_line(parent, item.line) is not None
+        else:
+            met = parent is None or not any(
+                    node.text == item.line or node.text.startswith(item.line + " ")
+                    for node in parent.children)
+
+        if not met:
+            changes.append(item)
+
+    return changes
+
+
+def change_commands(changes):
+    """Returns the configuration lines that apply the changes, in order."""
+
+    cmds = []
+    section = None
+
+    for item in changes:
+        if item.section != section:
+            if section is not None:
+                cmds.append("exit")
+            if item.section is not None:
+                cmds.append(item.section)
+            section = item.section
+
+        cmds.append(item.line if item.present else "no " + item.line)
+
+    if section is not None:
+        cmds.append("exit")
+
+    return cmds
+
+
+def describe_changes(changes):
+    """Returns the changes as "+ section: line" / "- line" strings."""
+
+    return ["{} {}{}".format("+" if item.present else "-",
+                             item.section + ": " if item.section else "",
+                             item.line)
+            for item in changes]
@@ -0,0 +1,319 @@
+import string
+from collections import namedtuple
+from CiscoConfigDiff import config_item
+
+
+# A step of a configuration plan
+#  kind: "lines" sent one at a time, waiting for the prompt as they may ask
+#        for a confirmation
+#        "block" sent with CiscoConfigure.conf_send_block(), in bulk
+#        "verify" checked with CiscoConfigure.verify_config(), once the
+#        whole plan is applied
+#        "hook" a CiscoConfigure method running an interactive step
+#  lines: the lines, templates of the plan parameters, e.g. "{username}".
+#         A "*name" line is replaced by the lines of the parameter.
+Step = namedtuple("Step", "kind lines")
+
+STEP_KINDS = ("lines", "block", "verify", "hook")
+
+# CiscoConfigure methods that can be used as hooks
+HOOKS = ("conf_ssh", "end_config")
+
+# Parameters of the plans
+PARAMETERS = ("username", "syslog_ip", "tacacs_ip", "tacacs_pass", "remote_commands")
+
+
+def lines(*cmds):
+    return Step("lines", cmds)
+
+
+def block(*cmds):
+    return Step("block", cmds)
+
+
+def verify(*cmds):
+    return Step("verify", cmds)
+
+
+def hook(name):
+    return Step("hook", (name,))
+
+
+# A part of a profile: its steps, and the state of the config they leave
+# (see CiscoConfigDiff.ConfigItem). Fragments later in a profile override
+# the state of the earlier ones for the same lines.
+Fragment = namedtuple("Fragment", "steps state")
+
+REMOTE_AUTH_COMMANDS = (
+        "aaa new-model",
+        "aaa authentication login default group tacacs+ local-case",
+        "aaa authentication enable default group tacacs+ enable",
+        "aaa authorization config-commands",
+        "aaa authorization exec default group tacacs+ if-authenticated",
+        "aaa authorization commands 1 default group tacacs+ if-authenticated",
+        "aaa authorization commands 15 default group tacacs+ if-authenticated",
+        "aaa accounting exec default start-stop group tacacs+",
+        "aaa accounting commands 1 default start-stop group tacacs+",
+        "aaa accounting commands 15 default start-stop group tacacs+")
+
+RESET_COMMANDS = (
+        "logging message-counter syslog",
+        "logging trap debugging",
+        "logging buffered debugging",
+        "logging console debugging",
+        "logging monitor debugging",
+        "logging origin-id hostname",
+        "logging {syslog_ip}",
+        "service password-encryption",      # this is needed for ssh
+        "login on-failure log",
+        "login on-success log",
+        "archive",
+            "log config",
+                "logging enable",
+                "logging size 500",
+                "notify syslog contenttype plaintext",
+                "hidekeys",
+                "exit",
+            "exit") + REMOTE_AUTH_COMMANDS + (
+        "tacacs-server host {tacacs_ip}",
+        "tacacs-server directed-request",
+        "tacacs-server key {tacacs_pass}",
+        "no username {username}",
+        "username {username} password 0 password",
+        "line vty 0 4",
+            "exec-timeout 2 0",
+            "logging synchronous",
+            "no password",
+            "no privilege level 15",
+            "transport input telnet",
+            "exit",
+        "line vty 5 15",
+            "exec-timeout 2 0",
+            "logging synchronous",
+            "no privilege level 15",
+            "transport input ssh")
+
+
+def _privilege(level, admin):
+    priv_conf = "privilege level 15" if admin else "no privilege level 15"
+    steps = [block("no username {username}",
+                   "username {username} privilege " + level + " password 0 password")]
+    state = [config_item(None, "username {username} privilege " + level + " password 0 password")]
+
+    for vty in ("line vty 0 4", "line vty 5 15"):
+        steps.extend([block(vty, priv_conf, "exit"), verify(priv_conf)])
+        state.append(config_item(vty, "privilege level 15", present=admin))
+
+    return Fragment(steps, state)
+
+
+def _vty_login(login_conf_list, state):
+    return Fragment([block("line vty 0 4", *(login_conf_list + ("exit",))),
+                     verify(*login_conf_list)],
+                    state)
+
+
+FRAGMENTS = {
+    "enter": Fragment([lines("config terminal")], []),
+
+    "exit": Fragment([lines("exit")], []),
+
+    "end": Fragment([hook("end_config")], []),
+
+    "priv_admin": _privilege("15", True),
+
+    "priv_user": _privilege("0", False),
+
+    "telnet": Fragment(
+            [block("line vty 0 4", "transport input telnet", "exit"),
+             verify("line vty 0 4", "transport input telnet")],
+            [config_item("line vty 0 4", "transport input telnet")]),
+
+    # Generates the RSA key when the firmware has a crypto module
+    "ssh": Fragment(
+            [hook("conf_ssh")],
+            [config_item(None, "ip ssh version 2", procedural=True),
+             config_item("line vty 5 15", "transport input ssh", procedural=True)]),
+
+    "local_auth": Fragment(
+            # "no aaa new-model" might prompt to confirm
+            [lines("no aaa new-model"),
+             block("line vty 0 4", "login local", "exit"),
+             verify("line vty 0 4", "login local"),
+             block("line vty 5 15", "login local", "exit"),
+             verify("line vty 5 15", "login local")],
+            [config_item(None, "aaa new-model", present=False, procedural=True),
+             config_item("line vty 0 4", "login local"),
+             config_item("line vty 5 15", "login local")]),
+
+    # Login using username configuration data
+    "login_local": _vty_login(
+            ("login local", "no password"),
+            [config_item("line vty 0 4", "login local"),
+             config_item("line vty 0 4", "password", present=False)]),
+
+    # Login using VTY password checking, only used for the local scenario
+    "login_password": _vty_login(
+            ("password password", "login"),
+            [config_item("line vty 0 4", "password password"),
+             config_item("line vty 0 4", "login"),
+             config_item("line vty 0 4", "login local", present=False)]),
+
+    # No login required
+    "no_login": _vty_login(
+            ("no login ", "no password"),
+            [config_item("line vty 0 4", "login", present=False),
+             config_item("line vty 0 4", "login local", present=False),
+             config_item("line vty 0 4", "password", present=False)]),
+
+    "remote_auth": Fragment(
+            [block(*REMOTE_AUTH_COMMANDS), verify(*REMOTE_AUTH_COMMANDS)],
+            [config_item(None, cmd) for cmd in REMOTE_AUTH_COMMANDS]),
+
+    "reset": Fragment(
+            [lines("configure terminal"),
+             block(*RESET_COMMANDS),
+             lines("exit"),
+             verify(*RESET_COMMANDS)],
+            []),
+
+    # Commands given by the test, which might prompt
+    "acl": Fragment([lines("*remote_commands")], []),
+}
+
+# Fragments of each CONF_* profile
+PROFILES = {
+    "CONF_RESET": ("reset", "end"),
+    "CONF_ACL": ("enter", "acl", "exit"),
+    "CONF_ACL_RESET": ("enter", "acl", "exit"),
+}
+
+AUTH_TYPES = {"LOCAL": "local", "REMOTE": "remote"}
+LOGIN_TYPES = {"UIDPASS": "login_local", "PASS": "login_password", "NOUIDPASS": "no_login"}
+PRIVILEGES = {"ADMIN": "priv_admin", "USR": "priv_user"}
+
+for _auth in AUTH_TYPES:
+    for _login in LOGIN_TYPES:
+        for _priv in PRIVILEGES:
+            if _auth == "LOCAL":
+                _auth_fragments = ("local_auth", LOGIN_TYPES[_login])
+            else:
+                _auth_fragments = ("remote_auth",)
+
+            PROFILES["CONF_{}_{}_{}".format(_auth, _login, _priv)] = (
+                    ("enter", PRIVILEGES[_priv], "telnet", "ssh") + _auth_fragments + ("end",))
+
+
+def profile_name(auth_type, login_type, admin):
+    """Returns the CONF_* profile of configure_login_auth()'s arguments."""
+
+    login = dict((fragment_type, name) for name, fragment_type in LOGIN_TYPES.items())
+    login["LOGINLOCAL"] = "UIDPASS"
+    login["PASSONLY"] = "PASS"
+    login["NOLOGIN"] = "NOUIDPASS"
+
+    return "CONF_{}_{}_{}".format(auth_type.upper(), login[login_type],
+                                  "ADMIN" if admin else "USR")
+
+
+class CommandPlan(object):
+    """
+    The ordered steps of a profile and the state of the config they leave.
+
+    Rendering the templates with the parameters is cached.
+    """
+
+    def __init__(self, name, fragments):
+        self.name = name
+        self.fragments = tuple(fragments)
+        self.template_steps = tuple(step for fragment in fragments
+                                    for step in FRAGMENTS[fragment].steps)
+
+        state = {}
+        for fragment in fragments:
+            for item in FRAGMENTS[fragment].state:
+                # Overrides the earlier fragments' state of the line
+                state.pop((item.section, item.line), None)
+                state[(item.section, item.line)] = item
+        order = [item for fragment in fragments for item in FRAGMENTS[fragment].state]
+        self.template_state = tuple(item for item in order
+                                    if state.get((item.section, item.line)) is item)
+
+        self._rendered = {}
+
+    def _render_lines(self, cmds, params):
+        rendered = []
+        for cmd in cmds:
+            if cmd.startswith("*"):
+                rendered.extend(params.get(cmd[1:]) or [])
+            else:
+                rendered.append(cmd.format(**params))
+        return tuple(rendered)
+
+    def render(self, params):
+        """Returns (steps, state) with the parameters filled in."""
+
+        key = tuple((name, params.get(name) if name != "remote_commands"
+                     else tuple(params.get(name) or ())) for name in PARAMETERS)
+
+        rendered = self._rendered.get(key)
+        if rendered is None:
+            steps = tuple(Step(step.kind, step.lines if step.kind == "hook"
+                               else self._render_lines(step.lines, params))
+                          for step in self.template_steps)
+            state = tuple(item._replace(line=item.line.format(**params))
+                          for item in self.template_state)
+            rendered = self._rendered[key] = (steps, state)
+
+        return rendered
+
+    def steps(self, params):
+        return self.render(params)[0]
+
+    def state(self, params):
+        return self.render(params)[1]
+
+    def commands(self, params):
+        """Returns every line sent, in order, e.g. to review a profile offline."""
+        return [cmd for step in self.steps(params) if step.kind in ("lines", "block")
+                for cmd in step.lines]
+
+
+def validate_plan(plan):
+    """Returns the problems found in a plan, without a router."""
+
+    problems = []
+    formatter = string.Formatter()
+
+    for step in plan.template_steps:
+        if step.kind not in STEP_KINDS:
+            problems.append("unknown step kind [{}]".format(step.kind))
+        elif step.kind == "hook":
+            if step.lines[0] not in HOOKS:
+                problems.append("unknown hook [{}]".format(step.lines[0]))
+            continue
+
+        for cmd in step.lines:
+            names = [cmd[1:]] if cmd.startswith("*") else \
+                    [name for _, name, _, _ in formatter.parse(cmd) if name]
+            for name in names:
+                if name not in PARAMETERS:
+                    problems.append("unknown parameter [{}] in [{}]".format(name, cmd))
+
+    for item in plan.template_state:
+        for _, name, _, _ in formatter.parse(item.line):
+            if name and name not in PARAMETERS:
+                problems.append("unknown parameter [{}] in [{}]".format(name, item.line))
+
+    return problems
+
+
+# Compiled once at import
+PLANS = dict((name, CommandPlan(name, fragments)) for name, fragments in PROFILES.items())
+
+
+def get_plan(name):
+    try:
+        return PLANS[name]
+    except KeyError:
+        raise ValueError("Configure Router: Unknown configuration profile [{}]".format(name))
@@ -0,0 +1,80 @@
+import re
+
+
+# Lines of "show running-config" that are not configuration
+NOT_CONFIG = re.compile("^(!.*|Building configuration.*|Current configuration.*|end)$")
+
+
+class ConfigNode(object):
+    """A line of the running config, with the lines of its section."""
+
+    __slots__ = ("text", "children", "_index")
+
+    def __init__(self, text):
+        self.text = text
+        self.children = []
+        self._index = None
+
+    def child(self, text):
+        """Returns the child line with the given text, None if there is none."""
+
+        if self._index is None:
+            self._index = {}
+            for node in self.children:
+                self._index.setdefault(node.text, node)
+
+        return self._index.get(text)
+
+    def children_starting_with(self, prefix):
+        return [node for node in self.children if node.text.startswith(prefix)]
+
+    def contains(self, text):
+        return self.child(text) is not None
+
+
+class ConfigTree(ConfigNode):
+    """
+    The running config, parsed into sections by indentation.
+
+    e.g. tree.section("line vty 5 15").contains("transport input ssh")
+    """
+
+    __slots__ = ("raw", "_all_lines")
+
+    def __init__(self, raw):
+        ConfigNode.__init__(self, "")
+        self.raw = raw
+        self._all_lines = set()
+
+        # (indentation, node) of the sections the current line may belong to
+        stack = [(-1, self)]
+
+        for line in raw.splitlines():
+            text = line.strip()
+            if not text or NOT_CONFIG.match(text):
+                continue
+
+            indent = len(line) - len(line.lstrip())
+            while stack[-1][0] >= indent:
+                stack.pop()
+
+            node = ConfigNode(text)
+            stack[-1][1].children.append(node)
+            stack.append((indent, node))
+            self._all_lines.add(text)
+
+    def section(self, header):
+        """Returns the top level line with the given text, None if there is none."""
+        return self.child(header)
+
+    def section_contains(self, header, text):
+        section = self.section(header)
+        return section is not None and section.contains(text)
+
+    def has_line(self, text):
+        """Whether the line is anywhere in the config, at any depth."""
+        return text in self._all_lines
+
+
+def parse_running_config(raw):
+    return ConfigTree(raw)
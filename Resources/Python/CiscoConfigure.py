@@ -1,45 +1,92 @@
 import logging
 import re
+import time
+from CiscoConfigTree import ConfigTree
+from CiscoConfigDiff import diff_config, change_commands, describe_changes
+from CiscoConfigProfiles import get_plan, profile_name
+
+
+# Pause between the lines of a configuration block sent in bulk, so that the
+# router's input buffer is not overrun
+DEFAULT_BULK_PACING = 0.05
+
+# Errors reported by IOS for a configuration line
+CONF_LINE_ERROR = re.compile(
+        "^\s*((% (Invalid input|Incomplete command|Ambiguous command|Unknown command)"
+        "|(Command authorization|Authorization) failed).*?)\s*$", re.MULTILINE)
+
+# Confirmation asked for by a configuration line. In bulk mode, the next
+# streamed line was taken as the answer
+CONF_LINE_PROMPT = re.compile("(\[confirm\]|\[yes/no\]|\[y/n\]|\(y/n\))", re.IGNORECASE)
+
+MORE_PROMPT = re.compile("--More--")
+
+# Commands that move between modes without changing the configuration
+MODE_CMDS = ("config terminal", "configure terminal", "exit", "end", "write memory")
+
+# "aaa accounting exec default start-stop group tacacs+", which newer IOS
+# versions display as a section with action-type and group lines
+AAA_ACCOUNTING = re.compile("aaa accounting (.+?) start-stop group tacacs\+")
+
+# "username admin privilege 15 password 0 password", displayed encrypted as
+# "username admin privilege 15 password 7 0822455D0A16"
+CLEAR_PASSWORD = re.compile("^(.* (password|secret)) 0 \S+$")
 
 
 class CiscoConfigure:
 
-    def __init__(self, cisco_conn, fs_class):
+    def __init__(self, cisco_conn, fs_class, bulk=False):
         self.cconn = cisco_conn
         self.filesys_class = fs_class
         self.last_cli_shell = ""
         self.conf_mode_cmd_list = []
 
-    def check_curr_conf_mode(self, cmd):
-        
-        logging.debug("Checking if the cli shell is configuration mode now...")
+        # Send configuration blocks without a round trip per line, opt-in
+        # until proven on the IOS versions tested
+        self.bulk = bulk
+        self.bulk_pacing = DEFAULT_BULK_PACING
+        # (line, error) of the lines rejected by the router in bulk mode
+        self.conf_errors = []
+        self._sync_count = 0
+        # Running config snapshot, until the next configuration command
+        self._running_config = None
+        # Lines checked by verify_config() once a plan is applied, None
+        # when they are checked right away
+        self._deferred_checks = None
+
+        hostname = self.cconn.hostname
+        self.conf_shell = re.compile(hostname + "\([\s\S]*\)#")
+        self.exec_shell = re.compile(hostname + "#")
+        self.prompt = re.compile(hostname + "(\([^\s)]*\))?#")
+        self.conf_expect = re.compile("(back to no aaa new-model is not supported|Authorization failed|" + hostname + "[\s\S]*[#|>])")
+
+    def check_curr_conf_mode(self, cmd, shell=None):
+
+        if shell is None:
+            shell = self.cconn.after()
+
+        if self.conf_shell.match(shell):
 
-        if re.match(self.cconn.hostname + "\([\s\S]*\)#", self.cconn.after()):
-                            
             if self.last_cli_shell == "":
-                self.last_cli_shell = self.cconn.after()
+                self.last_cli_shell = shell
                 self.conf_mode_cmd_list.append(cmd)
-                logging.debug("Last CLI Shell: {}".format(self.cconn.after()))
-
-            else:
 
-                if self.last_cli_shell != self.cconn.after():
-                    
-                    self.last_cli_shell = self.cconn.after()
+            elif self.last_cli_shell != shell:
 
-                    if cmd != "exit":
-                        self.conf_mode_cmd_list.append(cmd)
-                    else:
-                        self.conf_mode_cmd_list = self.conf_mode_cmd_list[:-1]
+                self.last_cli_shell = shell
 
-                logging.debug("last CLI Shell: {}".format(self.cconn.after()))
+                if cmd != "exit":
+                    self.conf_mode_cmd_list.append(cmd)
+                else:
+                    self.conf_mode_cmd_list = self.conf_mode_cmd_list[:-1]
 
-            logging.debug("Configuration Mode Command Entered:\n")
-            for cmd in self.conf_mode_cmd_list:
+            else:
+                return
 
-                logging.debug("[+] {}".format(cmd))
+            logging.debug("Configuration mode [{}]: {}".format(
+                    shell, " > ".join(self.conf_mode_cmd_list)))
 
-        elif re.match(self.cconn.hostname + "#", self.cconn.after()):
+        elif self.exec_shell.match(shell):
 
             self.last_cli_shell = ""
             self.conf_mode_cmd_list = []
@@ -55,10 +102,13 @@ class CiscoConfigure:
 
     def conf_sendline_expect(self, cmd):
         """Automatic handling of authorization failed by re-login."""
-        expectstr = "(back to no aaa new-model is not supported|Authorization failed|" + self.cconn.hostname + "[\s\S]*[#|>])"
+        expectstr = [self.conf_expect]
+
+        if cmd.strip() not in MODE_CMDS:
+            self._running_config = None
 
         self.cconn.sendline(cmd)
-        self.cconn.expectline(expectstr)
+        self.cconn.expect_any(expectstr)
 
         self.check_curr_conf_mode(cmd)
 
@@ -80,157 +130,260 @@ class CiscoConfigure:
             elif "back to no aaa new-model is not supported" in self.cconn.after(): 
                 self.cconn.sendline("y")
 
-            self.cconn.expectline(expectstr)
+            self.cconn.expect_any(expectstr)
+
+    def conf_send_block(self, cmds):
+        """Send configuration lines, in bulk unless bulk mode is disabled."""
+
+        if self.bulk:
+            self.conf_push_block(cmds)
+        else:
+            for cmd in cmds:
+                self.conf_sendline_expect(cmd)
+
+    def conf_push_block(self, cmds):
+        """
+        Send a block of configuration lines with a single prompt sync.
+
+        The lines are streamed, then a comment line is sent as a marker and
+        waited for. Errors are found by parsing the echoed transcript; they
+        are kept in conf_errors and raise a ValueError once the block is
+        sent. Lines asking for a confirmation are errors too, as the next
+        line was taken as the answer. When the authorization of a line
+        fails, the session is reconnected and the block resumed from it.
+        """
+
+        errors = []
+        pending = list(cmds)
+        resumed = False
+        self._running_config = None
+
+        while pending:
+            failed = None
+
+            for index, (cmd, shell, response) in enumerate(self._stream_block(pending)):
+                error = CONF_LINE_ERROR.search(response)
+                if error and "authorization failed" in error.group(1).lower():
+                    failed = index
+                    break
+
+                if error:
+                    errors.append((cmd, error.group(1)))
+                elif CONF_LINE_PROMPT.search(response):
+                    errors.append((cmd, "Line asked for a confirmation: {}".format(
+                            response.strip().splitlines()[-1])))
+
+                if shell is not None:
+                    self.check_curr_conf_mode(cmd, shell)
+
+            if failed is None:
+                break
+
+            if resumed and failed == 0:
+                raise ValueError("CiscoConfigure: Authorization failed\n")
+
+            logging.debug("Authorization failed on [{}], reconnecting".format(pending[failed]))
+            self.cconn.reconnect_and_login()
+            self.rerun_conf_mode_cmds()
+            pending = pending[failed:]
+            resumed = True
+
+        if errors:
+            self.conf_errors.extend(errors)
+            raise ValueError("Configure Error: Failed to configure in : {}".format(
+                    ", ".join("[{}] {}".format(cmd, error) for cmd, error in errors)))
+
+    def _stream_block(self, cmds):
+        """Returns (line, shell after it, response) of each line sent."""
+
+        self._sync_count += 1
+        marker = "!bulk-sync-{}".format(self._sync_count)
+
+        for cmd in cmds:
+            self.cconn.sendline(cmd)
+            time.sleep(self.bulk_pacing)
+
+        self.cconn.sendline(marker)
+        self.cconn.expect_any([re.compile(re.escape(marker) + "\s*[\r\n]+" + self.prompt.pattern)])
+
+        # "<line 1 echo and response><shell><line 2 echo and response>...<shell>"
+        transcript = self.cconn.before()
+        texts = []
+        shells = []
+        start = 0
+        for m in self.prompt.finditer(transcript):
+            texts.append(transcript[start:m.start()])
+            shells.append(m.group(0))
+            start = m.end()
+        texts.append(transcript[start:])
+
+        if len(shells) != len(cmds):
+            logging.debug("Transcript has {} prompts for {} lines".format(len(shells), len(cmds)))
+
+        results = []
+        for index, cmd in enumerate(cmds):
+            response = texts[index] if index < len(texts) else ""
+            shell = shells[index] if index < len(shells) else None
+            results.append((cmd, shell, response))
+
+        # Output not attributed to a line
+        unattributed = "".join(texts[len(cmds):])
+        if CONF_LINE_ERROR.search(unattributed):
+            results.append(("", None, unattributed))
+
+        return results
 
     def configure_replace_running(self, replace_path):
+        self._running_config = None
         self.cconn.sendline("configure replace " + replace_path)
         self.cconn.expectline("sure you want to proceed. ?")
         self.conf_sendline_expect("yes")
 
     def configure_replace_startup(self, replace_path):
+        self._running_config = None
         self.cconn.sendline("copy {:s} startup".format(replace_path))
         self.cconn.expectline("Destination filename")
         self.conf_sendline_expect(" ")
 
-    def verify_config(self, conf_list):
-
-        conf_out = ""
+    def get_running_config(self):
+        """
+        Return the running config as a ConfigTree.
 
-        logging.debug("Check configuration...")
+        It is fetched once and reused until a configuration command is sent.
+        """
 
-        self.cconn.sendline("do show run")
-        self.cconn.expectline("(" + self.cconn.hostname + "\(config\)#|--More--)")
-        conf_out += self.cconn.before()
+        if self._running_config is not None:
+            return self._running_config
 
-        logging.debug("Ran do show run...")
+        cmd = "do show run" if self.last_cli_shell else "show run"
+        self.cconn.sendline(cmd)
 
-        while "(config)#" not in self.cconn.after():
+        conf_out = ""
+        while self.cconn.expect_any([self.prompt, MORE_PROMPT]) == 1:
             #   Accumulate the output
             conf_out += self.cconn.before()
+            self.cconn.send(" ")
+        conf_out += self.cconn.before()
 
-            self.cconn.sendline()
-            self.cconn.expectline("(\(config\)#|--More--)")
+        # Drop the echo of the command
+        lines = conf_out.lstrip().split("\n", 1)
+        if lines[0].strip() == cmd:
+            conf_out = lines[1] if len(lines) > 1 else ""
 
-        logging.debug("conf_out:[{}]".format(conf_out))
-        for conf in conf_list:
-            if conf.lower() == "password password":
-                if re.match("[\s\S]*line vty[\s\S]+password[\s\S]*", conf_out) is None:
-                    raise ValueError(
-                            "password password Configure Error: Failed to configure in : {}".format(conf))
-            elif "aaa accounting" in conf.lower():
-                m = re.search("aaa accounting (.+?) start-stop group tacacs+", conf.lower())
-                if m:
-
-                    #   Extract the different part of the aaa accounting
-                    #   configuration
-                    found = m.group(1)
-
-                    #   Try to match the aaa accounting setup for two
-                    #   different versions of display
-                    if re.match("[\s\S]*aaa accounting " + found + "[\t\r\n ]*(action-type )?start-stop[\t\r\n ]*group tacacs+[\s\S]*", conf_out) is None:
-                        logging.debug("conf_out:[{}]".format(conf_out))
-                        raise ValueError(
-                                "aaa accounting Configure Error: Failed to "
-                                "configure in : {}".format(conf))
-            else:
-                if conf.startswith("no") is False:
-                    if conf not in conf_out:
-                        logging.debug("conf_out:[{}]".format(conf_out))
-                        raise ValueError(
-                                "Configure Error: Failed to configure in : {}"
-                                "".format(conf))
+        self._running_config = ConfigTree(conf_out)
+        return self._running_config
 
-    def set_vty_lines_priv(self, start_line, end_line, is_admin):
+    def verify_config(self, conf_list):
+        """
+        Check that the configuration lines are in the running config.
 
-        priv_conf_list = []
+        The lines are looked up in the sections entered by the lines before
+        them, e.g. "transport input ssh" after "line vty 5 15". Top level
+        lines not found are checked against the text of the running config,
+        as some are displayed differently from how they were entered.
 
-        self.conf_sendline_expect(
-                "line vty {} {}".format(start_line, end_line))
+        While a plan runs, the lines are checked once all of it is applied.
+        """
 
-        if is_admin:
-            priv_conf_list.append("privilege level 15")
-        else:
-            priv_conf_list.append("no privilege level 15")
+        if self._deferred_checks is not None:
+            self._deferred_checks.append(conf_list)
+            return
 
-        for priv_conf in priv_conf_list:
-            self.conf_sendline_expect(priv_conf)
+        logging.debug("Check configuration...")
 
-        # Exiting line config
-        self.conf_sendline_expect("exit")
-        self.verify_config(priv_conf_list)
+        config = self.get_running_config()
 
-    def conf_login_priv(self, is_admin, username):
-        # For both Telnet & SSH
-        self.conf_sendline_expect("no username " + username)
+        # Sections entered by the lines so far, outermost first
+        sections = []
 
-        if is_admin:
-            self.conf_sendline_expect(
-                    "username " + username + " privilege 15 password 0 password")
+        for conf in conf_list:
+            if conf == "exit":
+                sections = sections[:-1]
+            elif conf.startswith("no "):
+                self._verify_config_text(config.raw, conf)
+            elif not self._find_config_line(config, sections, conf):
+                if sections:
+                    logging.debug("conf_out:[{}]".format(config.raw))
+                    raise ValueError(
+                            "Configure Error: Failed to configure in : {} (section {})"
+                            "".format(conf, sections[-1].text))
+                self._verify_config_text(config.raw, conf)
+
+    def _find_config_line(self, config, sections, conf):
+
+        # Lines not valid in a section go back to the enclosing one, as on IOS
+        for depth in range(len(sections), -1, -1):
+            parent = sections[depth - 1] if depth else config
+            node = self._match_config_line(parent, conf)
+
+            if node is not None:
+                del sections[depth:]
+                if node.children:
+                    sections.append(node)
+                return True
+
+        return False
+
+    def _match_config_line(self, parent, conf):
+
+        node = parent.child(conf.strip())
+        if node is not None:
+            return node
+
+        if conf.lower() == "password password":
+            # Shown encrypted, e.g. "password 7 0822455D0A16"
+            passwords = parent.children_starting_with("password ")
+            return passwords[0] if passwords else None
+
+        m = CLEAR_PASSWORD.match(conf)
+        if m:
+            passwords = parent.children_starting_with(m.group(1) + " ")
+            return passwords[0] if passwords else None
+
+        m = AAA_ACCOUNTING.match(conf.lower())
+        if m:
+            node = parent.child("aaa accounting " + m.group(1))
+            if (node is not None and node.contains("action-type start-stop")
+                    and node.contains("group tacacs+")):
+                return node
+
+        return None
+
+    def _verify_config_text(self, conf_out, conf):
+
+        if conf.lower() == "password password":
+            if re.match("[\s\S]*line vty[\s\S]+password[\s\S]*", conf_out) is None:
+                raise ValueError(
+                        "password password Configure Error: Failed to configure in : {}".format(conf))
+        elif "aaa accounting" in conf.lower():
+            m = re.search("aaa accounting (.+?) start-stop group tacacs+", conf.lower())
+            if m:
+
+                #   Extract the different part of the aaa accounting
+                #   configuration
+                found = m.group(1)
+
+                #   Try to match the aaa accounting setup for two
+                #   different versions of display
+                if re.match("[\s\S]*aaa accounting " + found + "[\t\r\n ]*(action-type )?start-stop[\t\r\n ]*group tacacs+[\s\S]*", conf_out) is None:
+                    logging.debug("conf_out:[{}]".format(conf_out))
+                    raise ValueError(
+                            "aaa accounting Configure Error: Failed to "
+                            "configure in : {}".format(conf))
         else:
-            self.conf_sendline_expect(
-                    "username " + username + " privilege 0 password 0 password")
-
-        # For Telnet
-        self.set_vty_lines_priv(0, 4, is_admin)
-
-        # For SSH
-        self.set_vty_lines_priv(5, 15, is_admin)
-
-    def conf_login_type(self, login_type):
-
-        login_conf_list = []
-
-        # Login using username configuration data
-        if login_type == "LOGINLOCAL":
-            # to reference the username command
-            login_conf_list.append("login local")
-            login_conf_list.append("no password")
-        # Login using VTY password checking
-        elif login_type == "PASSONLY":
-            # only use for local scenario
-            login_conf_list.append("password password")
-            login_conf_list.append("login")     # login for passwd only
-        # No Login required
-        elif login_type == "NOLOGIN":
-            login_conf_list.append("no login ")
-            login_conf_list.append("no password")
-
-        self.conf_sendline_expect("line vty 0 4")
-
-        for login_conf in login_conf_list:
-            self.conf_sendline_expect(login_conf)
-
-        # Exiting line config
-        self.conf_sendline_expect("exit")
-
-        self.verify_config(login_conf_list)
-
-    def conf_connection_channel(self):
-
-        logging.info("Configuring for comms connection")
-
-        self.conf_telnet()
-        self.conf_ssh()
-
-    def conf_telnet(self):
-
-        logging.info("Configuring for Telnet connection")
-
-        config_local_telnet_commands = [
-                    "line vty 0 4",
-                    "transport input telnet"]
-
-        for cmd in config_local_telnet_commands:
-            self.conf_sendline_expect(cmd)
-
-        # Exiting line config
-        self.conf_sendline_expect("exit")
-        self.verify_config(config_local_telnet_commands)
+            if conf.startswith("no") is False:
+                if conf not in conf_out:
+                    logging.debug("conf_out:[{}]".format(conf_out))
+                    raise ValueError(
+                            "Configure Error: Failed to configure in : {}"
+                            "".format(conf))
 
     def conf_ssh(self):
 
         logging.info("Configuring for SSH connection")
 
+        self._running_config = None
+
         config_local_ssh_commands = [
                     "line vty 5 15",
                     "transport input ssh"]
@@ -273,66 +426,88 @@ class CiscoConfigure:
                 self.conf_sendline_expect("exit")
                 self.verify_config(config_local_ssh_commands)
 
-    def conf_local_auth(self):
-        config_local_telnet_commands = [
-                    "line vty 0 4",
-                    "login local"]
+    def run_plan(self, plan, params):
+        """
+        Run the steps of a CiscoConfigProfiles.CommandPlan.
+
+        The "verify" steps are checked after the last step, against a single
+        fetch of the running config.
+        """
+
+        self._deferred_checks = []
+        try:
+            for step in plan.steps(params):
+                if step.kind == "lines":
+                    for cmd in step.lines:
+                        self.conf_sendline_expect(cmd)
+                elif step.kind == "block":
+                    self.conf_send_block(step.lines)
+                elif step.kind == "verify":
+                    self.verify_config(step.lines)
+                else:
+                    getattr(self, step.lines[0])()
+        finally:
+            checks, self._deferred_checks = self._deferred_checks, None
 
-        config_local_ssh_commands = [
-                    "line vty 5 15",
-                    "login local"]
+        for conf_list in checks:
+            self.verify_config(conf_list)
 
-        self.conf_sendline_expect("no aaa new-model")
+    def configure_profile(self, name, params):
+        """Apply a CONF_* profile, see CiscoConfigProfiles.PROFILES."""
 
-        for cmd in config_local_telnet_commands:
-            self.conf_sendline_expect(cmd)
+        logging.info("Configuring profile {}".format(name))
+        self.run_plan(get_plan(name), params)
 
-        # Exiting line config
-        self.conf_sendline_expect("exit")
-        self.verify_config(config_local_telnet_commands)
+    def configure_profile_diff(self, name, params):
+        """
+        Bring the router to a CONF_* profile, only applying the lines that
+        differ from the running config.
 
-        for cmd in config_local_ssh_commands:
-            self.conf_sendline_expect(cmd)
+        Nothing is sent when the router already matches the profile. Lines
+        that need the full procedure (e.g. SSH) make it run instead.
 
-        # Exiting line config
-        self.conf_sendline_expect("exit")
-        self.verify_config(config_local_ssh_commands)
+        Returns the changes applied, see CiscoConfigDiff.describe_changes().
+        """
 
-    def conf_remote_auth(self):
+        plan = get_plan(name)
+        state = plan.state(params)
+        if not state:
+            raise ValueError("Configure Router: Profile [{}] has no state to "
+                             "compare with the running config".format(name))
 
-        config_remote_commands = [
-                "aaa new-model",
-                "aaa authentication login default group tacacs+ local-case",
-                "aaa authentication enable default group tacacs+ enable",
-                "aaa authorization config-commands",
-                "aaa authorization exec default group tacacs+ if-authenticated",
-                "aaa authorization commands 1 default group tacacs+ if-authenticated",
-                "aaa authorization commands 15 default group tacacs+ if-authenticated",
-                "aaa accounting exec default start-stop group tacacs+",
-                "aaa accounting commands 1 default start-stop group tacacs+",
-                "aaa accounting commands 15 default start-stop group tacacs+"
-                ]
+        changes = diff_config(self.get_running_config(), state, self._match_config_line)
+        applied = describe_changes(changes)
 
-        for cmd in config_remote_commands:
-            self.conf_sendline_expect(cmd)
+        if not changes:
+            logging.info("Configuration already applied, nothing to do")
+            return applied
 
-        self.verify_config(config_remote_commands)
+        logging.info("Configuration changes:\n{}".format("\n".join(applied)))
 
-    def configure_login_auth(self, auth_type, login_type, admin, username):
-        """Enter configuration mode."""
-        self.conf_sendline_expect("config terminal")
+        if any(item.procedural for item in changes):
+            self.run_plan(plan, params)
+            return applied
 
-        self.conf_login_priv(admin, username)
-        self.conf_connection_channel()
+        self.conf_sendline_expect("config terminal")
+        self.conf_send_block(change_commands(changes))
 
-        if auth_type == "local":
-            self.conf_local_auth()
-            self.conf_login_type(login_type)
-        else:
-            self.conf_remote_auth()
+        remaining = diff_config(self.get_running_config(), state, self._match_config_line)
+        if remaining:
+            raise ValueError("Configure Error: Failed to configure in : {}"
+                             "".format(", ".join(describe_changes(remaining))))
 
         self.end_config()
 
+        return applied
+
+    def configure_login_auth(self, auth_type, login_type, admin, username):
+        self.configure_profile(profile_name(auth_type, login_type, admin),
+                               {"username": username})
+
+    def configure_login_auth_diff(self, auth_type, login_type, admin, username):
+        return self.configure_profile_diff(profile_name(auth_type, login_type, admin),
+                                           {"username": username})
+
     def commit(self):
         """Write config to file."""
         # Filesystem B cannot write to memory
@@ -353,90 +528,14 @@ class CiscoConfigure:
                                    syslog_IP,
                                    tacacs_IP,
                                    tacacs_pass="password"):
-
-        config_reset_commands = [
-            "logging message-counter syslog",
-            "logging trap debugging",
-            "logging buffered debugging",
-            "logging console debugging",
-            "logging monitor debugging",
-            "logging origin-id hostname",
-            "logging " + syslog_IP,
-            "service password-encryption",      # this is needed for ssh
-            "login on-failure log",
-            "login on-success log",
-            "archive",
-                "log config",
-                    "logging enable",
-                    "logging size 500",
-                    "notify syslog contenttype plaintext",
-                    "hidekeys",
-                    "exit",
-                "exit",
-            "aaa new-model",
-            "aaa authentication login default group tacacs+ local-case",
-            "aaa authentication enable default group tacacs+ enable",
-            "aaa authorization config-commands",
-            "aaa authorization exec default group tacacs+ if-authenticated",
-            "aaa authorization commands 1 default group tacacs+ if-authenticated",
-            "aaa authorization commands 15 default group tacacs+ if-authenticated",
-            "aaa accounting exec default start-stop group tacacs+",
-            "aaa accounting commands 1 default start-stop group tacacs+",
-            "aaa accounting commands 15 default start-stop group tacacs+"
-            "tacacs-server host " + tacacs_IP,
-            "tacacs-server directed-request",
-            "tacacs-server key " + tacacs_pass,
-            "no username " + username,
-            "username " + username + " password 0 password",
-            "line vty 0 4",
-                "exec-timeout 2 0",
-                "logging synchronous",
-                "no password",
-                "no privilege level 15",
-                "transport input telnet",
-                "exit",
-            "line vty 5 15",
-                "exec-timeout 2 0",
-                "logging synchronous",
-                "no privilege level 15",
-                "transport input ssh"]
-
-        # Enter configuration mode
-        self.conf_sendline_expect("configure terminal")
-
-        for cmd in config_reset_commands:
-            self.conf_sendline_expect(cmd)
-
-        self.conf_sendline_expect("exit")
-        self.verify_config(config_reset_commands)
-
-        self.end_config()
+        self.configure_profile("CONF_RESET", {"username": username,
+                                              "syslog_ip": syslog_IP,
+                                              "tacacs_ip": tacacs_IP,
+                                              "tacacs_pass": tacacs_pass})
 
     def configure_acl(self, remote_commands):
-        
-        config_remote_commands = remote_commands
         logging.debug("Configuring ACLs")
-
-        self.conf_sendline_expect("config terminal")
-
-        for cmd in config_remote_commands:
-            self.conf_sendline_expect(cmd)
-        
-        # To exit from aaa conf mode
-        self.conf_sendline_expect("exit")
-        #child = self.cconn.reconnect_and_login()
-        #self.verify_config(config_remote_commands)
+        self.configure_profile("CONF_ACL", {"remote_commands": remote_commands})
 
     def configure_acl_reset(self, remote_commands):
-        
-        config_remote_commands = remote_commands
-
-        self.conf_sendline_expect("config terminal")
-
-        for cmd in config_remote_commands:
-            self.conf_sendline_expect(cmd)
-        
-        # To exit from aaa conf mode
-        self.conf_sendline_expect("exit")
-        #child = self.cconn.reconnect_and_login()
-        #self.verify_config(config_remote_commands)
+        self.configure_profile("CONF_ACL_RESET", {"remote_commands": remote_commands})
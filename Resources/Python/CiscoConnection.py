@@ -1,6 +1,18 @@
 import logging
+import socket
 import time
-from Common import spawn_and_print, expect_and_print, expect_eof
+import pexpect
+from Common import (spawn_and_print, expect_and_print, expect_eof,
+                    parse_backspace)
+from CiscoTransport import spawn_native, TransportUnavailable
+
+
+# Session transports:
+#   native  - in-process telnet client / SSH channel
+#   pexpect - spawn the telnet / ssh binaries, the default
+#   auto    - native, falling back to pexpect if it is unavailable or fails
+#             to connect
+TRANSPORTS = ("auto", "native", "pexpect")
 
 
 class CiscoConnection:
@@ -13,7 +25,8 @@ class CiscoConnection:
                  en_password,
                  hostname,
                  default_timeout=None,
-                 set_terminate_len0=True):
+                 set_terminate_len0=True,
+                 transport="pexpect"):
 
         self.protocol = protocol
         self.IP = IP
@@ -27,6 +40,10 @@ class CiscoConnection:
         self.default_timeout = default_timeout
         self.set_terminate_len0 = set_terminate_len0
 
+        if transport not in TRANSPORTS:
+            raise ValueError('Invalid transport "{:s}"'.format(transport))
+        self.transport = transport
+
         self.connect_and_login()
 
     def connect(self):
@@ -37,6 +54,20 @@ class CiscoConnection:
                 "".format(self.IP, self.username, self.protocol))
         logging.debug("timeout:{:d}".format(self.default_timeout))
 
+        if self.transport != "pexpect":
+            try:
+                self.cisco_process = spawn_native(self.protocol,
+                                                  self.IP,
+                                                  self.username,
+                                                  self.password,
+                                                  timeout=self.default_timeout)
+                return
+            except (TransportUnavailable, socket.error) as e:
+                if self.transport == "native":
+                    raise
+                logging.info("Native transport unavailable ({}), "
+                             "spawning {:s}".format(e, self.protocol))
+
         if self.protocol.lower() == 'telnet':
             # Telnet
             self.cisco_process = spawn_and_print(
@@ -111,6 +142,35 @@ class CiscoConnection:
         expect_eof(self.cisco_process)
         self.cisco_process.close()
 
+    def flush(self):
+        """Discard any output still pending on the session."""
+        try:
+            while True:
+                self.cisco_process.read_nonblocking(
+                        size=self.cisco_process.maxread, timeout=0)
+        except pexpect.TIMEOUT:
+            pass
+        self.cisco_process.buffer = self.cisco_process.buffer[:0]
+
+    def probe_prompt(self, timeout=None):
+        """
+        Check that the session is still alive and sitting at the prompt.
+
+        Returns True if the router answered an empty line with its prompt.
+        """
+        if not self.cisco_process.isalive():
+            return False
+
+        try:
+            self.flush()
+            self.sendline()
+            self.expect_hostname(timeout)
+        except (pexpect.TIMEOUT, pexpect.EOF):
+            logging.debug("Prompt probe failed on {:s}".format(self.IP))
+            return False
+
+        return True
+
     def connect_and_login(self):
         """Connect and login."""
         self.connect()
@@ -153,9 +213,37 @@ class CiscoConnection:
         logging.debug("expectline timeout: {}".format(timeout))
         expect_and_print(self.cisco_process, expect_string, timeout)
 
+    def expect_any(self, patterns, timeout=None):
+        """
+        Wait for any of the compiled regex patterns.
+
+        Returns the index of the pattern that matched.
+        """
+        if timeout is None:
+            timeout = self.default_timeout
+        index = self.cisco_process.expect_list(patterns, timeout)
+
+        output = self.before() + str(self.after())
+        logging.debug("Output:\n{:s}".format(output))
+        logging.info(parse_backspace(output))
+
+        return index
+
     def expect_hostname(self, timeout=None):
         self.expectline(self.hostname + "[^\s]*#", timeout)
 
+    def read_chunk(self, size, timeout=None):
+        """Read up to size characters of output as soon as some arrives."""
+        if timeout is None:
+            timeout = self.default_timeout
+
+        buffered = self.cisco_process.buffer
+        if buffered:
+            self.cisco_process.buffer = buffered[size:]
+            return buffered[:size]
+
+        return self.cisco_process.read_nonblocking(size, timeout)
+
     def after(self):
         return self.cisco_process.after
 
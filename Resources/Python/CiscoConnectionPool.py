@@ -0,0 +1,44 @@
+import logging
+import pexpect
+from IdlePool import IdlePool
+
+
+class CiscoConnectionPool(IdlePool):
+    """Keeps logged-in CiscoConnection sessions alive for reuse."""
+
+    # The vty lines are configured with "exec-timeout 2 0", so idle sessions
+    # must be retired well before the router drops them
+    DEFAULT_IDLE_TIMEOUT = 60
+    # Timeout for the prompt probe done before a session is reused
+    PROBE_TIMEOUT = 5
+
+    @staticmethod
+    def make_key(router_ip, hostname, protocol, username, password,
+                 en_password):
+        """Returns the pool key of a session."""
+        return (router_ip, hostname, protocol.lower(),
+                (username, password, en_password))
+
+    def evict(self, router_ip=None, credentials=None):
+        """
+        Close idle sessions.
+
+        Only sessions to router_ip and/or logged in with the credentials
+        tuple (username, password, en_password) are closed if given.
+        """
+
+        def match(key):
+            if router_ip is not None and key[0] != router_ip:
+                return False
+            return credentials is None or key[3] == tuple(credentials)
+
+        self._evict(match)
+
+    def _validate(self, cconn, idle_time):
+        return cconn.probe_prompt(self.PROBE_TIMEOUT)
+
+    def _close(self, cconn):
+        try:
+            cconn.disconnect()
+        except (pexpect.ExceptionPexpect, OSError, IOError) as e:
+            logging.debug("Error closing pooled connection: {}".format(e))
@@ -3,15 +3,55 @@ import logging
 import pexpect
 import time
 import os
+import atexit
+import threading
+import hashlib
+from multiprocessing.pool import ThreadPool
 from contextlib import contextmanager
+from dateutil.parser import parse
 
 from CiscoControllerLib import (
         get_router_running_image, process_copy_verify_firmware, process_delete_file, get_image_md5)
 from Common import (spawn_and_print, expect_and_print, ping_wait)
-from CiscoConnection import CiscoConnection
+from CiscoConnection import CiscoConnection, TRANSPORTS
+from CiscoConnectionPool import CiscoConnectionPool
 from CiscoConfigure import CiscoConfigure
-from CiscoLogging import CiscoLogging
+from CiscoConfigProfiles import get_plan
+from FtpController import FtpController
+from CiscoLogging import CiscoLogging, DEFAULT_FLUSH_TIMEOUT
 from CiscoCmdDescriptor import CiscoCmdDescriptor
+from CiscoFleet import CiscoFleet, DEFAULT_MAX_WORKERS
+from CiscoPrompt import get_prompt_machine, iter_lines, DEFAULT_CHUNK_SIZE
+
+
+# Logged-in sessions are shared by all CiscoController instances, as Robot
+# creates a new library instance for every test case
+_connection_pool = CiscoConnectionPool()
+atexit.register(_connection_pool.close_all)
+
+# Cap on logins in progress at the same time over all routers, so that the
+# TACACS server is not flooded when running on a fleet
+DEFAULT_MAX_CONCURRENT_LOGINS = 4
+_login_slots = threading.BoundedSemaphore(DEFAULT_MAX_CONCURRENT_LOGINS)
+
+# CiscoLogging sources of the log types of get_log_output()
+LOG_TYPES = {
+        "buffered": "show log",
+        "tacacs access": "tacacs access",
+        "tacacs account": "tacacs accounting",
+        "syslog": "syslog",
+        "snmp": "snmp",
+        "history all": "show history all",
+        "archive log": "show archive log config all",
+}
+
+
+class TestCmdsError(ValueError):
+    """Commands of a run_test_cmds() batch failed, results has every command's."""
+
+    def __init__(self, message, results):
+        ValueError.__init__(self, message)
+        self.results = results
 
 
 class CiscoController(object):
@@ -30,8 +70,10 @@ class CiscoController(object):
         self.tacacs_ip = None
         self.syslog_ip = None
         self.snmp_ip = None
+        self.remote_commands = []
 
         self.protocol = "telnet"
+        self.transport = "pexpect"  # See CiscoConnection.TRANSPORTS
         self.acl_config_protocol = None    # ACL's router configuring protocol
         self.acl_enabled = None    # If ACL test case is enabled
 
@@ -44,8 +86,16 @@ class CiscoController(object):
         self.test_cmds_dscrptors = list()
 
         self.clog = None    # CiscoLogging class
+        self.log_flush_timeout = DEFAULT_FLUSH_TIMEOUT
 
         self.filesys_class = None
+        self.bulk_configuration = False    # See CiscoConfigure.conf_push_block
+        self.idempotent_configuration = True   # Only apply what differs
+        self.last_config_diff = None       # Changes applied by the last configure()
+
+        self.last_cmd_prompt = None     # Prompt that ended the last command
+
+        self.connection_pooling = True     # Reuse logged-in sessions
 
     def initialise_controller(self, router_ip, router_name):
         self.router_ip = router_ip
@@ -66,12 +116,24 @@ class CiscoController(object):
         if firmware:
             self.firmware_timeout = int(firmware)
 
+    def set_log_flush_timeout(self, timeout):
+        """Set the upper bound of the wait for the log databases to settle."""
+        self.log_flush_timeout = int(timeout)
+        if self.clog:
+            self.clog.flush_timeout = self.log_flush_timeout
+
     def set_credentials(self, test_user, test_pass, test_en_pass):
+        if (test_user, test_pass, test_en_pass) != (self.test_user, self.password, self.en_password):
+            _connection_pool.evict(self.router_ip, (self.test_user, self.password, self.en_password))
+
         self.password = test_pass
         self.test_user = test_user
         self.en_password = test_en_pass
 
     def set_config_credentials(self, config_user, config_pass, config_en_pass):
+        if (config_user, config_pass, config_en_pass) != (self.conf_user, self.conf_pass, self.conf_en_pass):
+            _connection_pool.evict(self.router_ip, (self.conf_user, self.conf_pass, self.conf_en_pass))
+
         self.conf_user = config_user
         self.conf_pass = config_pass
         self.conf_en_pass = config_en_pass
@@ -82,6 +144,12 @@ class CiscoController(object):
         else:
             raise ValueError("No such protocol: " + protocol)
 
+    def set_transport(self, transport):
+        if transport.lower() in TRANSPORTS:
+            self.transport = transport.lower()
+        else:
+            raise ValueError("No such transport: " + transport)
+
     def set_config_protocol(self, protocol):
         if protocol.lower() == "telnet" or protocol.lower() == "ssh":
             self.acl_config_protocol = protocol
@@ -94,15 +162,59 @@ class CiscoController(object):
     def set_filesystem_class(self, fs_class):
         self.filesys_class = fs_class
 
+    def set_bulk_configuration(self, enabled):
+        """
+        Enable or disable sending configuration blocks in bulk.
+
+        When disabled, the default, the prompt is waited for after every line.
+        """
+        self.bulk_configuration = str(enabled).lower() in ("true", "yes", "1")
+
+    def set_idempotent_configuration(self, enabled):
+        """
+        Enable or disable skipping the configuration already applied.
+
+        When disabled, the CONF_LOCAL_* and CONF_REMOTE_* options always run
+        the full configuration procedure.
+        """
+        self.idempotent_configuration = str(enabled).lower() in ("true", "yes", "1")
+
+    def get_last_config_diff(self):
+        """
+        Return the changes applied by the last configure().
+
+        e.g. ["+ line vty 0 4: login local", "- line vty 0 4: password"],
+        empty when the router was already configured. None when the option
+        has no profile to compare with, or idempotent configuration is disabled.
+        """
+        return self.last_config_diff
+
     def set_remote_commands(self, remote_commands):
         self.remote_commands = remote_commands
 
-    @contextmanager
-    def _get_conf_connection(self, protocol, acc_type=None):
+    def set_connection_pooling(self, enabled):
         """
-        Returns a CiscoConnection instance initialised with super user
-        credentials.
+        Enable or disable reuse of logged-in sessions.
+
+        Disable it for tests that need to observe a fresh login.
         """
+        self.connection_pooling = str(enabled).lower() in ("true", "yes", "1")
+
+        if not self.connection_pooling:
+            _connection_pool.evict(self.router_ip)
+
+    def set_connection_idle_timeout(self, idle_timeout):
+        _connection_pool.idle_timeout = int(idle_timeout)
+
+    def set_max_concurrent_logins(self, max_logins):
+        global _login_slots
+        _login_slots = threading.BoundedSemaphore(int(max_logins))
+
+    def close_pooled_connections(self):
+        """Log out of every idle session to the router."""
+        _connection_pool.evict(self.router_ip)
+
+    def _resolve_protocol(self, protocol, acc_type):
         if acc_type != None and acc_type.lower() == "legit":
             protocol = self.acl_config_protocol;
         elif self.acl_config_protocol != None:
@@ -110,61 +222,94 @@ class CiscoController(object):
         if protocol == None:
             protocol = self.protocol
 
-        cconn = CiscoConnection(protocol,
-                                self.router_ip,
-                                self.conf_user,
-                                self.conf_pass,
-                                self.conf_en_pass,
-                                self.hostname,
-                                self.default_timeout)
-
-        try:
-            yield cconn
-        finally:
-            #   Close connection
-            cconn.disconnect()
+        return protocol
 
     @contextmanager
-    def _get_connection(self, protocol, acc_type=None):
+    def _pooled_connection(self,
+                           protocol,
+                           username,
+                           password,
+                           en_password,
+                           reusable=True):
         """
-        Returns a CiscoConnection instance initialised with normal credentials.
+        Returns a logged-in CiscoConnection instance.
+
+        The session is taken from the connection pool and returned to it
+        afterwards, unless pooling is disabled, the session is not reusable
+        (e.g. the router is reloaded) or an error occurred.
         """
-        if acc_type != None and acc_type.lower() == "legit":
-            protocol = self.acl_config_protocol;
-        elif self.acl_config_protocol != None:
-            protocol = self.acl_config_protocol
-        if protocol == None:
-            protocol = self.protocol
 
-        cconn = CiscoConnection(protocol,
-                                self.router_ip,
-                                self.test_user,
-                                self.password,
-                                self.en_password,
-                                self.hostname,
-                                self.default_timeout)
+        def create_connection():
+            with _login_slots:
+                return CiscoConnection(protocol,
+                                       self.router_ip,
+                                       username,
+                                       password,
+                                       en_password,
+                                       self.hostname,
+                                       self.default_timeout,
+                                       transport=self.transport)
+
+        key = CiscoConnectionPool.make_key(self.router_ip,
+                                           self.hostname,
+                                           protocol,
+                                           username,
+                                           password,
+                                           en_password)
+
+        if self.connection_pooling:
+            cconn = _connection_pool.acquire(key, create_connection)
+            cconn.default_timeout = self.default_timeout
+        else:
+            cconn = create_connection()
 
         try:
             yield cconn
-        finally:
+        except:
+            #   The session state is unknown, close connection
+            cconn.disconnect()
+            raise
+
+        if self.connection_pooling and reusable:
+            _connection_pool.release(key, cconn)
+        else:
             #   Close connection
             cconn.disconnect()
 
+    def _get_conf_connection(self, protocol, acc_type=None, reusable=True):
+        """
+        Returns a CiscoConnection instance initialised with super user
+        credentials.
+        """
+        return self._pooled_connection(self._resolve_protocol(protocol, acc_type),
+                                       self.conf_user,
+                                       self.conf_pass,
+                                       self.conf_en_pass,
+                                       reusable)
+
+    def _get_connection(self, protocol, acc_type=None, reusable=True):
+        """
+        Returns a CiscoConnection instance initialised with normal credentials.
+        """
+        return self._pooled_connection(self._resolve_protocol(protocol, acc_type),
+                                       self.test_user,
+                                       self.password,
+                                       self.en_password,
+                                       reusable)
+
     def start_tracking_logs(self, log_check_list, protocol=None):
 
         # Connect and login
         with self._get_conf_connection(protocol) as cconn:
 
             self.clog = CiscoLogging(self.tacacs_ip, self.syslog_ip, self.snmp_ip)
+            self.clog.flush_timeout = self.log_flush_timeout
             self.clog.logging_start(cconn, log_check_list)
 
     def retrieve_logs(self, log_check_list, protocol=None):
 
-        # Additional sleep to allow time for SNMP to be flush out
-        logging.debug("### SNMP Flush out before retrieving log (experimental)  ###")
-        logging.debug("Waiting for SNMP to flush itself...")
-        time.sleep(120)
-        logging.debug("Waiting for SNMP to flush itself... DONE")
+        # Allow time for the test's records to be flushed to the databases
+        self.clog.wait_for_log_flush(log_check_list)
 
         # Connect and login
         with self._get_conf_connection(protocol) as cconn:
@@ -194,6 +339,71 @@ class CiscoController(object):
 
         return log_output
 
+    def save_log_output(self, log_type, output_path, fmt="tsv"):
+        """
+        Write the records of a log database to a file as tsv, csv or jsonl.
+
+        Returns the number of records written.
+        """
+
+        databases = ("tacacs access", "tacacs account", "syslog", "snmp")
+
+        if log_type.lower() not in databases:
+            raise ValueError("Cannot save {} logs, expected one of {}"
+                             "".format(log_type, ", ".join(databases)))
+
+        return self.clog.write_logs(LOG_TYPES[log_type.lower()], output_path, fmt.lower())
+
+    def count_log_entries(self,
+                          log_type=None,
+                          user=None,
+                          contains=None,
+                          regex=None,
+                          facility=None,
+                          severity=None,
+                          start=None,
+                          end=None):
+        """
+        Count the retrieved log entries meeting every criteria given.
+
+        log_type is one of get_log_output()'s, all the logs by default.
+        facility and severity are those of "%FACILITY-SEVERITY-MNEMONIC"
+        syslog messages. start and end are date times, e.g. "2018-03-01 10:01:02".
+        """
+
+        return len(self.get_log_entries(log_type, user, contains, regex,
+                                        facility, severity, start, end))
+
+    def get_log_entries(self,
+                        log_type=None,
+                        user=None,
+                        contains=None,
+                        regex=None,
+                        facility=None,
+                        severity=None,
+                        start=None,
+                        end=None):
+        """Return the text of the retrieved log entries meeting every criteria given."""
+
+        source = None
+        if log_type:
+            if log_type.lower() not in LOG_TYPES:
+                raise ValueError("Unknown log type [{}], expected one of {}"
+                                 "".format(log_type, ", ".join(sorted(LOG_TYPES))))
+            source = LOG_TYPES[log_type.lower()]
+
+        entries = self.clog.log_store().query(
+                source=source,
+                user=user or None,
+                contains=contains or None,
+                regex=regex or None,
+                facility=facility.upper() if facility else None,
+                severity=int(severity) if severity not in (None, "") else None,
+                start=parse(start) if start else None,
+                end=parse(end) if end else None)
+
+        return [entry.text for entry in entries]
+
     def create_test_cmd(self, cmd):
         return CiscoCmdDescriptor(cmd)
 
@@ -215,69 +425,95 @@ class CiscoController(object):
 
     def run_cmd_until_next_shell(self, cconn, cmd, no_shell_prompt=False):
 
-        #   Send test cmd with return carriage
-        cconn.sendline(cmd)
+        if no_shell_prompt == True:
+            #   Send test cmd with return carriage
+            cconn.sendline(cmd)
+            return ""
 
-        cmd_out = ""
-        if no_shell_prompt == False:
+        #   Run until the next command line shell of the Cisco device has been
+        #   reached
+        result = get_prompt_machine(self.hostname).run(cconn, cmd)
 
-            #   Governs the failsafe mechanism for the while loop below
-            noOfLoopsOccurred = 0
-            maxNoOfLoops = 10
+        #   Shell prompt that terminated the command, e.g. "router(config)#"
+        self.last_cmd_prompt = result.prompt
 
-            #   Loop until the next command line shell of the Cisco device has
-            #   been reached
-            while (noOfLoopsOccurred == 0) or (re.match("{}[^\s]*#".format(self.hostname), cconn.after()) is None):
+        return result.output
 
-                cconn.expectline(("(\[[yY]es\/[nN]o\]|{}[^\s]*#|\[confirm\])").format(self.hostname))
+    def _check_test_cmd(self, cconn, test_cmd):
+        """
+        Run a test command on the connection and check its output.
 
-                #   Concat all the outputs into one variable
-                #   till the point before the command shell is hit again
-                #   NOTE:   cconn.before() gives the string from the
-                #           start / previous expect() until the next expect string
-                #           (not inclusive)
-                cmd_out += cconn.before()
+        Returns (passed, message).
+        """
 
-                #   Perform additional command send to get the execution
-                #   to end with a command line shell instead of prompts
-                #   NOTE:   .lower() to make the case insensitive for string
-                #           comparison
-                if "[yes/no]" in cconn.after().lower():
-                    cconn.sendline("n")
-                elif "[confirm]" in cconn.after().lower():
-                    cconn.send("n")
+        #   Loop until the next command line shell of the Cisco device has
+        #   been reached
+        cmd_out = self.__run_cmd_until_next_shell(cconn, test_cmd.cmd)
 
-                #   Failsafe mechanism for this loop in case it goes into an
-                #   infinite loop
-                noOfLoopsOccurred += 1
-                if noOfLoopsOccurred > maxNoOfLoops:
-                    logging.debug("Looping has exceeded {} times".format(maxNoOfLoops))
-                    break
+        retmsg = ""
+        # Parse output and remove the cmd entered
+        if cmd_out.startswith(test_cmd.cmd):
+            cmd_out = cmd_out[len(test_cmd.cmd):].lstrip('\r\n')
 
-        return cmd_out
+        errmsg = test_cmd.parse_cmd_output(cmd_out)
+        if len(errmsg) == 0:
+            retmsg = "\n[+][{}] succeed\n".format(test_cmd.cmd)
+            logging.info(retmsg)
+            return True, retmsg
+        else:
+            retmsg = "\n[-][{}] failed\n{}\nout[{}]".format(test_cmd.cmd, errmsg, cmd_out)
+            logging.info(retmsg)
+            logging.debug("run_test_cmd for {} failed, output: {}".format(test_cmd.cmd, cmd_out))
+            return False, retmsg
 
     def run_test_cmd(self, test_cmd, protocol=None, acc_type=None):
 
         #   Connect and login
         with self._get_connection(protocol, acc_type) as cconn:
-            #   Loop until the next command line shell of the Cisco device has
-            #   been reached
-            cmd_out = self.__run_cmd_until_next_shell(cconn, test_cmd.cmd)
-
-            retmsg = ""
-            # Parse output and remove the cmd entered
-            if cmd_out.startswith(test_cmd.cmd):
-                cmd_out = cmd_out[len(test_cmd.cmd):].lstrip('\r\n')
-
-            errmsg = test_cmd.parse_cmd_output(cmd_out)
-            if len(errmsg) == 0:
-                retmsg = "\n[+][{}] succeed\n".format(test_cmd.cmd)
-                logging.info(retmsg)
-            else:
-                retmsg = "\n[-][{}] failed\n{}\nout[{}]".format(test_cmd.cmd, errmsg, cmd_out)
-                logging.info(retmsg)
-                logging.debug("run_test_cmd for {} failed, output: {}".format(test_cmd.cmd, cmd_out))
-                raise ValueError("run_test_cmd failed: " + retmsg)
+            passed, retmsg = self._check_test_cmd(cconn, test_cmd)
+
+        # Raised once the session is released, it is still usable
+        if not passed:
+            raise ValueError("run_test_cmd failed: " + retmsg)
+
+    def run_test_cmds(self, test_cmds, protocol=None, acc_type=None,
+                      raise_on_failure=True):
+        """
+        Run a batch of test commands over one session.
+
+        Every command is run even if an earlier one fails. Returns a list
+        with a dictionary per command: "cmd", "passed", "elapsed" and
+        "message". Raises TestCmdsError, a ValueError with the list as
+        results, after the batch if any command failed and raise_on_failure
+        is set.
+        """
+
+        results = []
+
+        #   Connect and login
+        with self._get_connection(protocol, acc_type) as cconn:
+            for test_cmd in test_cmds:
+                start_time = time.time()
+                passed, retmsg = self._check_test_cmd(cconn, test_cmd)
+                results.append({
+                    "cmd": test_cmd.cmd,
+                    "passed": passed,
+                    "elapsed": time.time() - start_time,
+                    "message": retmsg})
+
+        for result in results:
+            logging.info("[{}][{}] {:.2f}s".format("+" if result["passed"] else "-",
+                                                   result["cmd"],
+                                                   result["elapsed"]))
+
+        failed = [result for result in results if not result["passed"]]
+        if failed and raise_on_failure:
+            raise TestCmdsError(
+                    "run_test_cmds failed {}/{}: ".format(len(failed), len(results)) +
+                    "".join(result["message"] for result in failed),
+                    results)
+
+        return results
 
     def run_command_and_get_output(self,
                                    cmd,
@@ -325,6 +561,27 @@ class CiscoController(object):
 
         return all_cmd_out
 
+    def run_commands_on_fleet(self,
+                              inventory,
+                              cmds_list,
+                              protocol=None,
+                              max_workers=DEFAULT_MAX_WORKERS,
+                              log_dir=None):
+        """
+        Run the commands on many routers in parallel.
+
+        The inventory is a dictionary of router_ip to router_name. The
+        credentials, protocol and timeouts set on this controller are used
+        for every router. With log_dir, each router logs to its own file.
+
+        Returns a dictionary of router_ip to a dictionary with the
+        "hostname", the command "outputs", the per-command "cmd_times", the
+        total "elapsed" time and the "error" that stopped the router, if any.
+        """
+
+        fleet = CiscoFleet(self, int(max_workers), log_dir)
+        return fleet.run_commands(inventory, cmds_list, protocol)
+
     def cisco_delete_file(self, router_file_path, protocol=None):
 
         # Connect and login
@@ -344,6 +601,59 @@ class CiscoController(object):
             return self.__run_cmd_until_next_shell(cconn,
                                                    "more {:s}".format(router_file_path))
 
+    def iter_command_output(self,
+                            cmd,
+                            protocol=None,
+                            tee_path=None,
+                            lines=False,
+                            chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Run a command and yield its output as it arrives.
+
+        The output is yielded in chunks, or line by line with lines=True, and
+        is also written to tee_path if given. Use it for outputs too large to
+        be held in memory, e.g. "show tech-support" or "more flash:big.log".
+        """
+
+        def iter_chunks(cconn):
+            chunks = get_prompt_machine(self.hostname).stream(cconn, cmd, chunk_size)
+            if tee_path is None:
+                for chunk in chunks:
+                    yield chunk
+            else:
+                with open(tee_path, "wb") as tee:
+                    for chunk in chunks:
+                        tee.write(chunk)
+                        yield chunk
+
+        # Connect and login
+        with self._get_connection(protocol) as cconn:
+            if lines:
+                for line in iter_lines(iter_chunks(cconn)):
+                    yield line
+            else:
+                for chunk in iter_chunks(cconn):
+                    yield chunk
+
+    def save_command_output(self, cmd, output_path, protocol=None):
+        """
+        Write the output of a command to a file, without holding it in memory.
+
+        Returns the MD5 of the output.
+        """
+
+        md5 = hashlib.md5()
+        for chunk in self.iter_command_output(cmd, protocol, tee_path=output_path):
+            md5.update(chunk)
+
+        return md5.hexdigest()
+
+    def save_router_file(self, router_file_path, output_path, protocol=None):
+        """Write a file on the router to a local file. Returns its MD5."""
+        return self.save_command_output("more {:s}".format(router_file_path),
+                                        output_path,
+                                        protocol)
+
     def run_script(self, path, cmd_args=[], expect_status=None):
 
         script_dir = os.path.dirname(os.path.abspath(path))
@@ -382,7 +692,7 @@ class CiscoController(object):
 
         # Connect and login
         # Reboot should be using config-user for now
-        with self._get_conf_connection(protocol) as cconn:
+        with self._get_conf_connection(protocol, reusable=False) as cconn:
 
             cconn.sendline("reload")
             cconn.expectline("(Proceed with reload\?|System configuration has been modified)")
@@ -394,6 +704,9 @@ class CiscoController(object):
             cconn.sendline("y")
             cconn.expectline(pexpect.EOF)
 
+        # Pooled sessions do not survive the reload
+        _connection_pool.evict(self.router_ip)
+
         # Wait for the router to reboot
         print("\n@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@@\n")
         # wait for 10s for the router to reboot. We need this because router
@@ -408,41 +721,63 @@ class CiscoController(object):
                          protocol=None):
         logging.info("Replacing firmware")
 
-        # Connect and login
-        with self._get_conf_connection(protocol) as cconn:
-            # Get path of firmware running image
-            image_path = get_router_running_image(cconn)
+        md5_pool = None
+        ftp_md5_result = None
 
-            # Get the local path based on the src firmware_path
-            base_name = os.path.basename(ftp_firmware_path) 
-            local_dst_path = "flash:" + base_name
+        if self.filesys_class == "C":
+            # Look up the reference MD5 while the router copies the firmware
+            md5_pool = ThreadPool(1)
+            ftp_md5_result = md5_pool.apply_async(FtpController().get_ftp_md5,
+                                                  (ftp_firmware_path,))
+            md5_pool.close()
 
-            # Delete the running image             
-            process_delete_file(cconn, self.filesys_class, image_path)
-
-            # Copy the firmware and verify
-            process_copy_verify_firmware(cconn,
-                                         self.filesys_class,
-                                         ftp_firmware_path,
-                                         local_dst_path,
-                                         cconn.hostname,
-                                         self.firmware_timeout)
+        try:
+            # Connect and login
+            with self._get_conf_connection(protocol) as cconn:
+                # Get path of firmware running image
+                image_path = get_router_running_image(cconn)
+
+                # Get the local path based on the src firmware_path
+                base_name = os.path.basename(ftp_firmware_path) 
+                local_dst_path = "flash:" + base_name
+
+                # Delete the running image             
+                process_delete_file(cconn, self.filesys_class, image_path)
+
+                # Copy the firmware and verify
+                process_copy_verify_firmware(cconn,
+                                             self.filesys_class,
+                                             ftp_firmware_path,
+                                             local_dst_path,
+                                             cconn.hostname,
+                                             self.firmware_timeout,
+                                             ftp_md5_result)
+        finally:
+            # Does not wait for the hashing when the copy failed
+            if md5_pool is not None:
+                md5_pool.terminate()
 
     def replace_running_config(self, replace_path, protocol=None):
 
         # Connect and login
-        with self._get_conf_connection(protocol) as cconn:
+        with self._get_conf_connection(protocol, reusable=False) as cconn:
             cconfig = CiscoConfigure(cconn, self.filesys_class)
             cconfig.configure_replace_running(replace_path)
 
+        # Login requirements might have changed
+        _connection_pool.evict(self.router_ip)
+
     def replace_startup_config(self, replace_path, protocol=None):
 
         # Connect and login
-        with self._get_conf_connection(protocol) as cconn:
+        with self._get_conf_connection(protocol, reusable=False) as cconn:
             cconfig = CiscoConfigure(cconn, self.filesys_class)
             cconfig.configure_replace_startup(replace_path)
 
-    # Types of configure:
+        # Login requirements might have changed
+        _connection_pool.evict(self.router_ip)
+
+    # Types of configure, see CiscoConfigProfiles.PROFILES:
     #  1. CONF_RESET
     #  2. CONF_LOCAL_UIDPASS_ADMIN
     #  3. CONF_LOCAL_UIDPASS_USR
@@ -452,10 +787,14 @@ class CiscoController(object):
     #  7. CONF_LOCAL_NOUIDPASS_USR
     #  8. CONF_REMOTE_UIDPASS_ADMIN
     #  9. CONF_REMOTE_UIDPASS_USR
+    #  10. CONF_ACL / CONF_ACL_RESET
     def configure(self, config_option, acc_type=None):
+
+        self.last_config_diff = None
+
         # Connect and login
         with self._get_conf_connection(self.protocol, acc_type) as cconn:
-            cconfig = CiscoConfigure(cconn, self.filesys_class)
+            cconfig = CiscoConfigure(cconn, self.filesys_class, self.bulk_configuration)
 
             logging.debug('config_option: {:s}'.format(config_option))
 
@@ -465,57 +804,33 @@ class CiscoController(object):
             if self.test_user.strip() == "":
                 raise ValueError("Configure Router: Test Credential not set.")
 
-            if config_option == "CONF_RESET":
-                cconfig.configure_login_auth_reset(self.test_user,
-                                                   self.syslog_ip,
-                                                   self.tacacs_ip)
-            elif config_option == "CONF_ACL":
-                cconfig.configure_acl(self.remote_commands)
-            elif config_option == "CONF_ACL_RESET":
-                cconfig.configure_acl_reset(self.remote_commands)
+            # Unknown options raise a ValueError, before anything is sent
+            plan = get_plan(config_option)
+            params = {"username": self.test_user,
+                      "syslog_ip": self.syslog_ip,
+                      "tacacs_ip": self.tacacs_ip,
+                      "tacacs_pass": "password",
+                      "remote_commands": self.remote_commands}
+
+            if self.idempotent_configuration and plan.state(params):
+                self.last_config_diff = cconfig.configure_profile_diff(config_option, params)
             else:
-                auth_type = ""
-                login_type = ""
-                admin = 0
-
-                # Set Authentication type
-                if "_LOCAL" in config_option:
-                    auth_type = "local"
-                elif "_REMOTE" in config_option:
-                    auth_type = "remote"
-                else:
-                    logging.info("[-]ERROR: CONFIG unknown authentication type")
-                    raise ValueError("Configure Router: Unknown auth type\n")
-
-                # Set login type
-                if "_UIDPASS" in config_option:
-                    login_type = "LOGINLOCAL"
-                elif "_PASS" in config_option:
-                    login_type = "PASSONLY"
-                elif "_NOUIDPASS" in config_option:
-                    login_type = "NOLOGIN"
-                else:
-                    logging.info("[-]ERROR: CONFIG unknown login type")
-                    raise ValueError("Configure Router: Unknown login type\n")
-
-                # set privilege type
-                if "_ADMIN" in config_option:
-                    admin = 1
-                elif "_USR" in config_option:
-                    admin = 0
-                else:
-                    logging.info("[-]ERROR: CONFIG not _ADMIN or _USR")
-                    raise ValueError("Configure Router: Unknown privilege type\n")
-
-                cconfig.configure_login_auth(
-                        auth_type, login_type, admin, self.test_user)
-
-            # to verify output
-            cconn.sendline_and_expect_hostname("show run")
+                cconfig.configure_profile(config_option, params)
+
+            if self.last_config_diff == []:
+                # Already configured, the session is still usable
+                return 0
+
+            # to verify output, already fetched by the last verification
+            # unless the configuration changed since
+            cconfig.get_running_config()
 
             # commit config changes
             cconfig.commit()
 
+        # Pooled sessions were logged in with the previous configuration
+        _connection_pool.evict(self.router_ip)
+
         time.sleep(1)   # Give some time for the logs to generate
 
         return 0
@@ -26,8 +26,16 @@ def process_copy_verify_firmware(cisco_conn,
                                  ftp_source_path,
                                  local_dst_path,
                                  router_name,
-                                 timeout):
-    
+                                 timeout,
+                                 ftp_md5_result=None):
+    """
+    Copy the firmware from FTP and verify it.
+
+    ftp_md5_result is the AsyncResult of the FTP MD5 of the firmware, started
+    before the copy so that both overlap. It is computed after the copy when
+    not given.
+    """
+
     logging.debug("In process_copy_verify_file")
     
     # Prepare for copy file, for filesystem C
@@ -86,8 +94,10 @@ def process_copy_verify_firmware(cisco_conn,
         check_md5 = get_image_md5(cisco_conn, copy_dst)
         
         logging.debug('Get image md5 from ftp...')
-        ftp_ctrl = FtpController()
-        ftp_md5 = ftp_ctrl.get_ftp_md5(copy_src)
+        if ftp_md5_result is not None:
+            ftp_md5 = ftp_md5_result.get(timeout)
+        else:
+            ftp_md5 = FtpController().get_ftp_md5(copy_src)
 
         logging.debug('Check MD5 of {:s}: {:s}'.format(copy_dst, check_md5))
         if check_md5.lower() != ftp_md5.lower():
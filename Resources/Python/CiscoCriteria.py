@@ -0,0 +1,133 @@
+import logging
+import re
+
+
+# Leading/trailing "match anything" parts of the criteria regexes. They do
+# not change whether a regex matches, but backtrack badly on large outputs.
+MATCH_ANY = ("[\s\S]*", "[\S\s]*")
+
+# Characters that modify the quantifier before them, e.g. the lazy "*?"
+QUANTIFIER_MODIFIERS = ("?", "+", "{")
+
+
+def strip_match_any(regex):
+    """
+    Returns (regex, anchored) with the leading and trailing "match anything"
+    parts removed.
+
+    anchored is False when the leading part was removed, i.e. the regex
+    should be searched for instead of matched at the start. The regex is
+    returned unchanged if the stripped one does not compile.
+    """
+
+    original = regex
+    anchored = True
+
+    # Alternations would change meaning without the surrounding parts
+    if "|" in regex:
+        return regex, anchored
+
+    for match_any in MATCH_ANY:
+        if regex.startswith(match_any) and \
+                not regex[len(match_any):].startswith(QUANTIFIER_MODIFIERS):
+            regex = regex[len(match_any):]
+            anchored = False
+            break
+
+    for match_any in MATCH_ANY:
+        for end in (match_any + "$", match_any):
+            if regex.endswith(end) and not regex.endswith("\\" + end):
+                regex = regex[:-len(end)]
+                break
+        else:
+            continue
+        break
+
+    try:
+        re.compile(regex)
+    except re.error:
+        return original, True
+
+    return regex, anchored
+
+
+class CriteriaEvaluator(object):
+    """The criteria of a CiscoCmdDescriptor, compiled once."""
+
+    def __init__(self, contain, notcontain, begin, end, regex, empty,
+                 logger=None):
+        self.contain = list(contain)
+        self.notcontain = list(notcontain)
+        self.begin = [(start, re.compile("[\s]*(?:" + start + ")"))
+                      for start in begin]
+        # Output ends with the criteria anywhere, see Common.output_should_end_with
+        self.end = [(last, re.compile(last)) for last in end]
+        self.regex = []
+        for rgx in regex:
+            stripped, anchored = strip_match_any(rgx)
+            self.regex.append((rgx, re.compile(stripped), anchored))
+        self.empty = empty
+        self.logger = logger or logging.getLogger(__name__)
+
+    def evaluate(self, output):
+        """Returns the error messages of the criteria not met by the output."""
+
+        errmsg = ""
+
+        # Check if output is empty
+        if output.strip():
+            # Not empty
+            if self.empty is True:
+                # Should be empty
+                errmsg += "\t-> Output is not empty [{}]\n".format(output)
+
+            for string in self.contain:
+                if string not in output:
+                    errmsg += "\t-> Output does not contain[{}]\n".format(string)
+
+            for string in self.notcontain:
+                if string in output:
+                    errmsg += "\t-> Output contains[{}]\n".format(string)
+
+            for start, pattern in self.begin:
+                if pattern.match(output) is None:
+                    errmsg += "\t-> Output does not begin with [{}]\n".format(start)
+
+            for last, pattern in self.end:
+                if pattern.search(output) is None:
+                    errmsg += "\t-> Output does not end with [{}]\n".format(last)
+
+            for rgx, pattern, anchored in self.regex:
+                if anchored:
+                    matched = pattern.match(output)
+                else:
+                    matched = pattern.search(output)
+
+                if matched is None:
+                    errmsg += "\t-> Output does not match regex [{}]\n".format(rgx)
+                    self._log_regex_failure(rgx, output)
+
+        else:
+            # Empty!
+            if self.empty is False:
+                # Should not be empty
+                errmsg += "\t-> Output is empty\n"
+
+            for should in self.contain:
+                errmsg += "\t-> Output should contain[{}]\n".format(should)
+            for should, _ in self.begin:
+                errmsg += "\t-> Output should begin with[{}]\n".format(should)
+            for should, _ in self.end:
+                errmsg += "\t-> Output should end with[{}]\n".format(should)
+            for should, _, _ in self.regex:
+                errmsg += "\t-> Output should match regex[{}]\n".format(should)
+
+        return errmsg
+
+    def _log_regex_failure(self, rgx, output):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+
+        self.logger.debug("rgx[{}]\noutput[{}]\n".format(rgx, output))
+        output_hex = ":".join("{:02x}".format(ord(c)) for c in output)
+        self.logger.debug("output_hex[{}]\n".format(output_hex))
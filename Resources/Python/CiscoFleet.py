@@ -0,0 +1,135 @@
+import copy
+import logging
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+
+# Number of routers worked on at the same time by default
+DEFAULT_MAX_WORKERS = 8
+
+
+class DeviceLogFilter(logging.Filter):
+    """Passes only the records logged by one worker thread."""
+
+    def __init__(self, thread_name):
+        logging.Filter.__init__(self)
+        self.thread_name = thread_name
+
+    def filter(self, record):
+        return record.threadName == self.thread_name
+
+
+def parse_inventory(inventory):
+    """
+    Returns a list of (router_ip, router_name) pairs.
+
+    The inventory is either a dictionary of router_ip to router_name or a
+    list of (router_ip, router_name) pairs.
+    """
+
+    if hasattr(inventory, "items"):
+        return sorted(inventory.items())
+
+    return [tuple(device) for device in inventory]
+
+
+class CiscoFleet(object):
+    """Runs the same commands on many routers, one session per router."""
+
+    def __init__(self, controller, max_workers=DEFAULT_MAX_WORKERS,
+                 log_dir=None):
+        self.controller = controller
+        self.max_workers = max_workers
+        self.log_dir = log_dir
+
+    def run_commands(self, inventory, cmds_list, protocol=None):
+        """
+        Run the commands on every router of the inventory.
+
+        Returns a dictionary of router_ip to its result, see
+        _run_device_commands.
+        """
+
+        devices = parse_inventory(inventory)
+        if not devices:
+            return {}
+
+        pool = ThreadPool(min(self.max_workers, len(devices)))
+        try:
+            results = pool.map(
+                    lambda device: self._run_device_commands(device, cmds_list, protocol),
+                    devices)
+        finally:
+            pool.close()
+            pool.join()
+
+        return dict(zip([router_ip for router_ip, _ in devices], results))
+
+    def _run_device_commands(self, device, cmds_list, protocol):
+        router_ip, router_name = device
+
+        result = {
+            "hostname": router_name,
+            "outputs": [],
+            "cmd_times": [],
+            "elapsed": 0.0,
+            "error": None,
+        }
+
+        # Each router gets its own controller, sharing the settings
+        worker = copy.copy(self.controller)
+        worker.initialise_controller(router_ip, router_name)
+
+        thread = threading.current_thread()
+        pool_thread_name = thread.name
+        thread.name = "fleet-{}".format(router_ip)
+        handler = self._add_device_log_handler(router_ip, router_name, thread.name)
+
+        start_time = time.time()
+        try:
+            with worker._get_connection(protocol) as cconn:
+                for cmd in cmds_list:
+                    cmd_start_time = time.time()
+                    result["outputs"].append(
+                            worker.run_cmd_until_next_shell(cconn, cmd))
+                    result["cmd_times"].append(time.time() - cmd_start_time)
+
+        except Exception as e:
+            # One broken router should not stop the rest of the fleet
+            logging.info("[-][{}] failed: {}".format(router_ip, e))
+            result["error"] = "{}: {}".format(type(e).__name__, e)
+
+        finally:
+            result["elapsed"] = time.time() - start_time
+            logging.info("[{}] done in {:.2f}s".format(router_ip, result["elapsed"]))
+
+            if handler:
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+            thread.name = pool_thread_name
+
+        return result
+
+    def _add_device_log_handler(self, router_ip, router_name, thread_name):
+        """Send the logs of the router's worker thread to its own file."""
+
+        if not self.log_dir:
+            return None
+
+        if not os.path.exists(self.log_dir):
+            try:
+                os.makedirs(self.log_dir)
+            except OSError:
+                # Created by another worker
+                pass
+
+        handler = logging.FileHandler(os.path.join(
+                self.log_dir, "{}_{}.log".format(router_name, router_ip)))
+        handler.setFormatter(logging.Formatter(
+                "%(asctime)s %(levelname)s %(message)s"))
+        handler.addFilter(DeviceLogFilter(thread_name))
+        logging.getLogger().addHandler(handler)
+
+        return handler
@@ -0,0 +1,128 @@
+import re
+import logging
+from datetime import datetime
+from operator import attrgetter
+from dateutil.parser import parse
+
+
+# Lines of the entries, starting with "*<timestamp>:", "<sequence number>:" or "CMD:"
+ENTRY_PATTERN = re.compile("^((\*(.+?):)|[\d]+:|CMD:)(.+?)$")
+
+TIME_PATTERN = re.compile("(\d{2}:\d{2}:\d{2})")
+DATE_PATTERN = re.compile("((Mon|Tue|Wed|Thu|Fri|Sat|Sun)?( )?(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) (\d{2})( )?(\d{4})?)")
+
+
+class CiscoShowHistoryLog(object):
+    """An entry of "show history all", with its date time if it has one."""
+
+    __slots__ = ("logDateTime", "line")
+
+    def __init__(self, line, parser=None):
+
+        if parser is None:
+            parser = ShowHistoryParser()
+
+        self.logDateTime = parser.parse_datetime(line)
+        self.line = line
+
+
+class ShowHistoryParser(object):
+    """
+    Parses the output of "show history all".
+
+    Date times without a year or a date are completed with today's, as
+    dateutil would. Identical date times are only parsed once.
+    """
+
+    def __init__(self, today=None):
+        self.today = today or datetime.now()
+        self._memo = {}
+
+    def parse(self, output):
+        """
+        Returns the entries of the output, sorted by date time.
+
+        Entries without a date time take the one of the entry before them,
+        or of the first entry with one for the entries at the start.
+        """
+
+        entries = [CiscoShowHistoryLog(line, self)
+                   for line in output.splitlines() if ENTRY_PATTERN.match(line)]
+
+        # Single pass backfill
+        last_datetime = None
+        leading = []
+
+        for entry in entries:
+            if entry.logDateTime is not None:
+                last_datetime = entry.logDateTime
+                for undated in leading:
+                    undated.logDateTime = last_datetime
+                leading = []
+            elif last_datetime is not None:
+                entry.logDateTime = last_datetime
+            else:
+                leading.append(entry)
+
+        if last_datetime is None:
+            # No point in sorting since there are no entry with datetime
+            logging.debug("No show history entry with a date time")
+        else:
+            # Sort the list in order of early to latest, stable for equal times
+            entries.sort(key=attrgetter("logDateTime"))
+
+        return entries
+
+    def parse_datetime(self, line):
+        """Returns the date time of a line, None if it has none."""
+
+        mDate = DATE_PATTERN.search(line)
+        mTime = TIME_PATTERN.search(line)
+
+        date = mDate.group(4, 5, 7) if mDate else None
+        time = mTime.group(0) if mTime else None
+
+        if date is None and time is None:
+            return None
+
+        key = (date, time)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+
+        try:
+            logDateTime = self._strptime(date, time)
+        except ValueError:
+            logDateTime = self._dateutil_parse(mDate, time)
+
+        self._memo[key] = logDateTime
+        return logDateTime
+
+    def _strptime(self, date, time):
+
+        if date is None:
+            clock = datetime.strptime(time, "%H:%M:%S")
+            return self.today.replace(hour=clock.hour,
+                                      minute=clock.minute,
+                                      second=clock.second,
+                                      microsecond=0)
+
+        month, day, year = date
+        text = "{} {} {}".format(month, day, year or self.today.year)
+
+        if time is None:
+            return datetime.strptime(text, "%b %d %Y")
+
+        return datetime.strptime(text + " " + time, "%b %d %Y %H:%M:%S")
+
+    def _dateutil_parse(self, mDate, time):
+
+        text = " ".join(part for part in
+                        (mDate.group(0).strip() if mDate else None, time) if part)
+        try:
+            return parse(text, dayfirst=True, default=self.today.replace(
+                    hour=0, minute=0, second=0, microsecond=0))
+        except (ValueError, OverflowError):
+            logging.debug("Cannot parse the date time [{}]".format(text))
+            return None
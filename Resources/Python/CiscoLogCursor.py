@@ -0,0 +1,95 @@
+import logging
+
+
+# Number of rows fetched per query
+DEFAULT_PAGE_SIZE = 5000
+
+
+class LogTableCursor(object):
+    """
+    Reads the rows of a log table in pages ordered by id (keyset pagination).
+
+    The last id read is remembered, so that each read only fetches the rows
+    added since the previous one. The rows read so far are kept in rows.
+
+    filters is a list of (SQL condition, parameter) added to the WHERE clause.
+    unique_id is False when several rows share an id (e.g. the varbinds of an
+    SNMP trap), in which case the rows of an id are never split across pages.
+    Rows are converted with record_type._make() when a record type is given.
+    """
+
+    def __init__(self, fields, table, id_field_name, id_start=0, filters=(),
+                 unique_id=True, page_size=DEFAULT_PAGE_SIZE, record_type=None):
+        self.fields = fields
+        self.table = table
+        self.id_field_name = id_field_name
+        self.id_start = id_start
+        self.filters = list(filters)
+        self.unique_id = unique_id
+        self.page_size = page_size
+        self.record_type = record_type
+
+        # Position of the id in the rows
+        self.id_index = list(fields).index(id_field_name)
+
+        self.last_id = None
+        self.rows = []
+
+    def read(self, cur):
+        """Fetches the new rows and returns all the rows read so far."""
+
+        for _ in self.iter_pages(cur):
+            pass
+
+        return tuple(self.rows)
+
+    def iter_pages(self, cur):
+        """Yields the rows added since the last read, a page at a time."""
+
+        while True:
+            page = self._fetch(cur, self._lower_bound(), limit=self.page_size)
+            full_page = len(page) == self.page_size
+
+            if full_page and not self.unique_id:
+                # The last id may continue on the next page, read it whole
+                boundary = page[-1][self.id_index]
+                page = [row for row in page if row[self.id_index] != boundary]
+                page.extend(self._fetch(cur, (self.id_field_name + " = %s", boundary)))
+
+            if page and self.record_type:
+                page = [self.record_type._make(row) for row in page]
+
+            if page:
+                self.last_id = page[-1][self.id_index]
+                self.rows.extend(page)
+                yield page
+
+            if not full_page:
+                break
+
+    def _lower_bound(self):
+        if self.last_id is not None:
+            return (self.id_field_name + " > %s", self.last_id)
+        if self.id_start:
+            return (self.id_field_name + " >= %s", self.id_start)
+        return None
+
+    def _fetch(self, cur, bound, limit=None):
+
+        query = "SELECT {0} FROM {1}".format(",".join(self.fields), self.table)
+
+        where = [bound] if bound else []
+        where.extend(self.filters)
+
+        if where:
+            query += " WHERE " + " AND ".join(clause for clause, _ in where)
+
+        query += " ORDER BY " + self.id_field_name
+        if limit:
+            query += " LIMIT {:d}".format(limit)
+
+        parameters = [parameter for _, parameter in where]
+
+        logging.debug("SQL Query exec: {} {}".format(query, parameters))
+        cur.execute(query, parameters)
+        return list(cur.fetchall())
@@ -0,0 +1,72 @@
+import re
+from collections import Counter
+
+
+# "000123: *Mar  1 00:01:02.123: %SYS-5-CONFIG_I: ..." with
+# "logging message-counter syslog"
+SYSLOG_SEQUENCE = re.compile("^(\d+): ")
+
+# "   12     3        admin@vty0     |  hostname r1" of "show archive log config all"
+ARCHIVE_INDEX = re.compile("^\s*(\d+)\s+\d+\s+\S+\s+\|")
+
+
+class LogDelta(object):
+    """
+    Extracts the lines added to a router log since it was marked.
+
+    Lines with a sequence number are new when their number is above the
+    highest one seen when marking. Lines without one are new when they
+    occur more often than when marking.
+    """
+
+    def __init__(self, sequence_pattern):
+        self.sequence_pattern = sequence_pattern
+        self.marked = False
+        self.high_water = None
+        self.baseline = Counter()
+
+    def _sequence(self, line):
+        m = self.sequence_pattern.match(line)
+        return int(m.group(1)) if m else None
+
+    def mark(self, lines):
+        """Records the lines currently in the log."""
+
+        self.marked = True
+        self.high_water = None
+        self.baseline = Counter()
+
+        for line in lines:
+            sequence = self._sequence(line)
+            if sequence is None:
+                self.baseline[line] += 1
+            elif self.high_water is None or sequence > self.high_water:
+                self.high_water = sequence
+
+    def new_lines(self, lines):
+        """Returns the lines added since mark(), in order."""
+
+        if not self.marked:
+            return list(lines)
+
+        sequences = [self._sequence(line) for line in lines]
+
+        # The numbering restarted, e.g. the router was reloaded
+        numbered = [sequence for sequence in sequences if sequence is not None]
+        if numbered and self.high_water is not None and max(numbered) < self.high_water:
+            return list(lines)
+
+        seen = self.baseline.copy()
+        new = []
+
+        for line, sequence in zip(lines, sequences):
+            if sequence is not None:
+                if self.high_water is None or sequence > self.high_water:
+                    new.append(line)
+            elif seen[line] > 0:
+                # The earliest occurrences are the ones already there
+                seen[line] -= 1
+            else:
+                new.append(line)
+
+        return new
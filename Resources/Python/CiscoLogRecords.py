@@ -0,0 +1,110 @@
+import re
+from collections import namedtuple
+from operator import attrgetter
+from CiscoLogDelta import SYSLOG_SEQUENCE
+
+
+# Rows of the log databases, in the order of the fields selected by CiscoLogging
+TacacsAccessRecord = namedtuple(
+        "TacacsAccessRecord",
+        "id nas terminal uid client_ip service status")
+
+TacacsAccountingRecord = namedtuple(
+        "TacacsAccountingRecord",
+        "id nas uid terminal client_ip type service priv_lvl cmd elapsed_time")
+
+SyslogEventRecord = namedtuple(
+        "SyslogEventRecord",
+        "id receivedat devicereportedtime fromhost message syslogtag")
+
+SnmpVarbindRecord = namedtuple(
+        "SnmpVarbindRecord",
+        "trap_id date_time auth snmptrapoid transport security_model oid oid_type string_value")
+
+# Entries of the logs kept on the router
+SyslogBufferRecord = namedtuple("SyslogBufferRecord", "sequence line")
+
+ArchiveRecord = namedtuple("ArchiveRecord", "index session user command")
+
+ARCHIVE_ENTRY = re.compile("^\s*(\d+)\s+(\d+)\s+(\S+)\s+\|(.*)$")
+
+
+def parse_syslog_buffer(lines):
+    """Returns the SyslogBufferRecord of each line of the logging buffer."""
+
+    records = []
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+
+        m = SYSLOG_SEQUENCE.match(line)
+        records.append(SyslogBufferRecord(int(m.group(1)) if m else None, line))
+
+    return records
+
+
+def parse_archive(lines):
+    """Returns the ArchiveRecord of each entry of "show archive log config all"."""
+
+    records = []
+
+    for line in lines:
+        m = ARCHIVE_ENTRY.match(line.rstrip("\r\n"))
+        if m:
+            records.append(ArchiveRecord(int(m.group(1)), int(m.group(2)),
+                                         m.group(3), m.group(4).strip()))
+
+    return records
+
+
+class RecordSet(object):
+    """
+    Log records of one type, with columnar access.
+
+    Each column is built once, as a tuple of the values of every record, and
+    filtering scans the column instead of the records.
+    """
+
+    def __init__(self, records):
+        self.records = tuple(records)
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def column(self, name):
+        """Returns the values of a field of every record."""
+
+        try:
+            return self._columns[name]
+        except KeyError:
+            column = self._columns[name] = tuple(map(attrgetter(name), self.records))
+            return column
+
+    def _select(self, name, predicate):
+        records = self.records
+        return RecordSet(records[i] for i, value in enumerate(self.column(name))
+                         if predicate(value))
+
+    def where(self, name, value):
+        """Returns the records whose field equals the value."""
+        return self._select(name, lambda v: v == value)
+
+    def matching(self, name, regex):
+        """Returns the records whose field contains a match of the regex."""
+        pattern = re.compile(regex)
+        return self._select(name, lambda v: v is not None and pattern.search(str(v)) is not None)
+
+    def between(self, name, start=None, end=None):
+        """Returns the records whose field is within [start, end]."""
+        return self._select(name, lambda v: v is not None and
+                            (start is None or v >= start) and
+                            (end is None or v <= end))
@@ -0,0 +1,121 @@
+import csv
+import json
+import re
+
+
+FORMATS = ("tsv", "csv", "jsonl")
+
+# "net_snmp.varbinds.type AS 'oid_type'" -> "oid_type"
+FIELD_ALIAS = re.compile("\s+AS\s+['`\"]?([^'`\"]+)['`\"]?\s*$", re.IGNORECASE)
+
+
+def field_labels(fields):
+    """Returns the column names of the rows selected with the given fields."""
+
+    labels = []
+
+    for field in fields:
+        alias = FIELD_ALIAS.search(field)
+        if alias:
+            labels.append(alias.group(1))
+        else:
+            labels.append(field.split(".")[-1])
+
+    return labels
+
+
+def _cell(item):
+    if isinstance(item, unicode):
+        return item.encode("utf-8")
+    return str(item)
+
+
+class _LineWriter(object):
+    """File-like object for csv.writer, keeping the last line written."""
+
+    def write(self, line):
+        self.line = line
+
+
+def iter_lines(rows, fmt="tsv", fields=None):
+    """
+    Yields the rows formatted as lines, without the line endings.
+
+    The csv format starts with a header line when the fields are given.
+    The jsonl format has an object per row keyed by the field labels, or an
+    array per row without fields.
+    """
+
+    if fmt not in FORMATS:
+        raise ValueError("Unknown log format [{}], expected one of {}"
+                         "".format(fmt, ", ".join(FORMATS)))
+
+    labels = field_labels(fields) if fields else None
+
+    if fmt == "tsv":
+        for row in rows:
+            yield "\t".join(_cell(item) for item in row)
+
+    elif fmt == "csv":
+        out = _LineWriter()
+        writer = csv.writer(out, lineterminator="")
+        if labels:
+            writer.writerow(labels)
+            yield out.line
+        for row in rows:
+            writer.writerow([_cell(item) for item in row])
+            yield out.line
+
+    else:
+        for row in rows:
+            if labels:
+                row = dict(zip(labels, row))
+            yield json.dumps(row, default=str, sort_keys=True)
+
+
+def render(rows, fmt="tsv", fields=None):
+    """Returns the rows formatted as a single string, see iter_lines()."""
+
+    return "\n".join(iter_lines(rows, fmt, fields))
+
+
+def write(rows, path, fmt="tsv", fields=None):
+    """Streams the formatted rows to a file. Returns the number of rows."""
+
+    count = 0
+
+    with open(path, "w") as f:
+        for line in iter_lines(rows, fmt, fields):
+            f.write(line)
+            f.write("\n")
+            count += 1
+
+    if fmt == "csv" and fields:
+        count -= 1
+
+    return count
+
+
+class RenderCache(object):
+    """
+    Keeps the rendering of the result set of each source, per format.
+
+    A source is rendered again only when its result set changes.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def render(self, source, rows, fmt="tsv", fields=None):
+
+        key = (source, fmt)
+        cached = self._cache.get(key)
+
+        if cached is None or cached[0] is not rows or cached[1] != fields:
+            cached = (rows, fields, render(rows, fmt, fields))
+            self._cache[key] = cached
+
+        return cached[2]
+
+    def clear(self):
+        self._cache = {}
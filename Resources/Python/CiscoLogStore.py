@@ -0,0 +1,189 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple, defaultdict
+
+
+# "%SYS-5-CONFIG_I:" facility, severity and mnemonic of a syslog message
+SYSLOG_MESSAGE = re.compile("%([A-Z0-9_]+)-(\d)-([A-Z0-9_]+)")
+
+WORD = re.compile("\w+")
+
+# An entry of any log, with the fields the store is indexed by
+LogEntry = namedtuple("LogEntry", "source user text facility severity timestamp record")
+
+
+def _syslog_code(text):
+    m = SYSLOG_MESSAGE.search(text or "")
+    if m:
+        return m.group(1), int(m.group(2))
+    return None, None
+
+
+def _entry(source, user, text, timestamp, record):
+    text = "" if text is None else str(text)
+    facility, severity = _syslog_code(text)
+    return LogEntry(source, user, text, facility, severity, timestamp, record)
+
+
+def to_entry(source, record):
+    """Returns the LogEntry of a record of CiscoLogging.records(source)."""
+
+    if source == "tacacs access":
+        return _entry(source, record.uid, "{} {}".format(record.service, record.status),
+                      None, record)
+
+    if source == "tacacs accounting":
+        return _entry(source, record.uid, record.cmd, None, record)
+
+    if source == "syslog":
+        return _entry(source, None, record.message,
+                      record.devicereportedtime or record.receivedat, record)
+
+    if source == "snmp":
+        return _entry(source, None, record.string_value, record.date_time, record)
+
+    if source == "show log":
+        return _entry(source, None, record.line, None, record)
+
+    if source == "show archive log config all":
+        return _entry(source, record.user.split("@")[0], record.command, None, record)
+
+    if source == "show history all":
+        return _entry(source, None, record.line, record.logDateTime, record)
+
+    raise ValueError("Unknown log source [{}]".format(source))
+
+
+class LogStore(object):
+    """
+    Log entries of all the sources, indexed for queries.
+
+    Entries are indexed by source, user, facility, severity, the words of
+    their text and their timestamp. A query only looks at the entries its
+    indexed criteria select.
+    """
+
+    INDEXED_FIELDS = ("source", "user", "facility", "severity")
+
+    def __init__(self):
+        self.entries = []
+        self._indexes = dict((field, defaultdict(set)) for field in self.INDEXED_FIELDS)
+        self._words = defaultdict(set)
+        self._timestamps = []   # sorted (timestamp, position)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, source, records):
+        """Adds the records of a source, see to_entry()."""
+
+        timestamps = []
+
+        for record in records:
+            entry = to_entry(source, record)
+            position = len(self.entries)
+            self.entries.append(entry)
+
+            for field in self.INDEXED_FIELDS:
+                value = getattr(entry, field)
+                if value is not None:
+                    self._indexes[field][value].add(position)
+
+            for word in set(WORD.findall(entry.text.lower())):
+                self._words[word].add(position)
+
+            if entry.timestamp is not None:
+                timestamps.append((entry.timestamp, position))
+
+        if timestamps:
+            self._timestamps = sorted(self._timestamps + timestamps)
+
+    def query(self, source=None, user=None, facility=None, severity=None,
+              contains=None, regex=None, start=None, end=None):
+        """
+        Returns the entries meeting every criteria given, in the order added.
+
+        contains is a substring of the text, case sensitive, and regex is
+        searched for in the text. start and end bound the timestamp, entries
+        without one never match them. A ValueError is raised if none of the
+        entries selected by the other criteria has a timestamp, e.g. the
+        tacacs sources, rather than finding nothing.
+        """
+
+        candidates = []
+
+        for field, value in zip(self.INDEXED_FIELDS, (source, user, facility, severity)):
+            if value is not None:
+                candidates.append(self._indexes[field].get(value, set()))
+
+        if contains:
+            candidates.extend(self._words.get(word, set())
+                              for word in self._whole_words(contains))
+
+        if start is not None or end is not None:
+            self._check_timestamps(candidates, source)
+            candidates.append(self._time_range(start, end))
+
+        if candidates:
+            candidates.sort(key=len)
+            positions = set(candidates[0])
+            for other in candidates[1:]:
+                positions &= other
+            positions = sorted(positions)
+        else:
+            positions = range(len(self.entries))
+
+        pattern = re.compile(regex) if regex else None
+        entries = []
+
+        for position in positions:
+            entry = self.entries[position]
+            if contains and contains not in entry.text:
+                continue
+            if pattern and not pattern.search(entry.text):
+                continue
+            entries.append(entry)
+
+        return entries
+
+    def count(self, **criteria):
+        """Returns the number of entries meeting the criteria, see query()."""
+        return len(self.query(**criteria))
+
+    def _check_timestamps(self, candidates, source):
+
+        timed = set(position for _, position in self._timestamps)
+        if candidates:
+            selected = set.intersection(*[set(c) for c in candidates])
+        else:
+            selected = range(len(self.entries))
+
+        if selected and timed.isdisjoint(selected):
+            raise ValueError("The log entries{} have no timestamp to query a time range".format(
+                    " of [{}]".format(source) if source else ""))
+
+    def _whole_words(self, text):
+        """The words of a substring that cannot be part of longer words."""
+
+        words = []
+
+        for m in WORD.finditer(text.lower()):
+            # A word at an edge of the substring may continue beyond it
+            if m.start() == 0 or m.end() == len(text):
+                continue
+            words.append(m.group(0))
+
+        return words
+
+    def _time_range(self, start, end):
+
+        low = 0
+        high = len(self._timestamps)
+
+        # Positions are never compared, the bounds sort before/after them
+        if start is not None:
+            low = bisect_left(self._timestamps, (start, -1))
+        if end is not None:
+            high = bisect_right(self._timestamps, (end, len(self.entries)))
+
+        return set(position for _, position in self._timestamps[low:high])
@@ -1,10 +1,21 @@
 import re
 import logging
-import MySQLdb
 import time
+import atexit
+import multiprocessing
+import MySQLdb.cursors
+from multiprocessing.pool import ThreadPool
 from contextlib import closing
-from dateutil.parser import parse
 from Common import spawn_and_print
+from MySQLConnectionPool import MySQLConnectionPool
+from CiscoHistoryParser import CiscoShowHistoryLog, ShowHistoryParser, ENTRY_PATTERN
+from CiscoLogDelta import LogDelta, SYSLOG_SEQUENCE, ARCHIVE_INDEX
+from CiscoLogCursor import LogTableCursor, DEFAULT_PAGE_SIZE
+import CiscoLogRender
+from CiscoLogStore import LogStore
+from CiscoLogRecords import (TacacsAccessRecord, TacacsAccountingRecord,
+                             SyslogEventRecord, SnmpVarbindRecord, RecordSet,
+                             parse_syslog_buffer, parse_archive)
 
 
 # Fields to extract from the 'accounting' table
@@ -33,27 +44,35 @@ SNMPNOTIFICATION_FIELDS = (
         'net_snmp.varbinds.type AS \'oid_type\'',
         'CAST(value AS CHAR(1000) CHARACTER SET utf8) AS \'string_value\'')
 
-
-class CiscoShowHistoryLog:
-
-    def __init__(self, line):
-
-        # Use Regex to search for the date and time
-        mTime = re.search("(\d{2}:\d{2}:\d{2})", line)
-        mDate = re.search("((Mon|Tue|Wed|Thu|Fri|Sat|Sun)?( )?(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) \d{2}( )?(\d{4})?)", line)
-
-        # Parse the datetime of the log entry
-        if mDate and mTime:
-            self.logDateTime = parse(mDate.group(0).strip() + " " + mTime.group(0).strip(),
-                                     dayfirst=True)
-        elif mDate:
-            self.logDateTime = parse(mDate.group(0).strip(), dayfirst=True)
-        elif mTime:
-            self.logDateTime = parse(mTime.group(0).strip())
-        else:
-            self.logDateTime = None
-
-        self.line = line
+# Attribute holding the records of each log database, their fields and type
+LOG_SOURCES = {
+        "tacacs access": ("tacacs_access", ACCESS_FIELDS, TacacsAccessRecord),
+        "tacacs accounting": ("tacacs_accounting", ACCOUNTING_FIELDS, TacacsAccountingRecord),
+        "syslog": ("syslog", SYSTEMEVENTS_FIELDS, SyslogEventRecord),
+        "snmp": ("snmp", SNMPNOTIFICATION_FIELDS, SnmpVarbindRecord),
+}
+
+# Sequence numbers of the entries of the logs kept on the router
+ROUTER_LOG_SEQUENCES = {
+        "show log": SYSLOG_SEQUENCE,
+        "show archive log config all": ARCHIVE_INDEX,
+        "show history all": SYSLOG_SEQUENCE,
+}
+
+# Default upper bound of the wait for the log databases to settle, in seconds
+DEFAULT_FLUSH_TIMEOUT = 120
+# The log tables must not grow for this long to be considered settled
+FLUSH_QUIET_PERIOD = 5
+# Polling interval of the log tables, doubled after each poll
+FLUSH_POLL_INTERVAL = 1
+FLUSH_POLL_MAX_INTERVAL = 16
+
+# Default upper bound of the retrieval of a log database's records, in seconds
+DEFAULT_SOURCE_TIMEOUT = 300
+
+# Database connections shared by every CiscoLogging instance and thread
+_db_pool = MySQLConnectionPool()
+atexit.register(_db_pool.close_all)
 
 
 class CiscoLogging:
@@ -64,7 +83,6 @@ class CiscoLogging:
         self.syslog_IP = syslog_IP
         self.snmp_IP = snmp_IP
 
-        self.show_history_all_last = None
         self.show_history_all = None
         self.buffered = None
         self.archive = None
@@ -92,6 +110,28 @@ class CiscoLogging:
         self.syslog_id = 0
         self.snmp_id = 0
 
+        self.flush_timeout = DEFAULT_FLUSH_TIMEOUT
+
+        # Upper bound of the retrieval of the records of a log database
+        self.source_timeout = DEFAULT_SOURCE_TIMEOUT
+        # Time taken to retrieve the logs of each source by logging_read()
+        self.source_latency = {}
+
+        # Rows fetched per query of a log table
+        self.page_size = DEFAULT_PAGE_SIZE
+        # Cursors of the log tables read since logging_start(), per source
+        # and filter. Repeated reads only fetch the rows added in between.
+        self.log_cursors = {}
+
+        # Renderings of the records, computed once per retrieval
+        self.render_cache = CiscoLogRender.RenderCache()
+
+        # Lines of the logs kept on the router at logging_start(), per source
+        self.log_deltas = {}
+
+        # Index of the retrieved records, built on the first query
+        self._log_store = None
+
     def clear_local_logs(self, cisco_conn, log_check_list):
         """Clear Syslog log buffer and archive log."""
 
@@ -113,45 +153,118 @@ class CiscoLogging:
     def logging_start(self, cisco_conn, log_check_list):
 
         self.clear_local_logs(cisco_conn, log_check_list)
+        self.log_cursors = {}
+        self.render_cache.clear()
+
+        # Only the entries added from now on are retrieved
+        self.log_deltas = {}
+        for source in ROUTER_LOG_SEQUENCES:
+            if source in log_check_list:
+                delta = LogDelta(ROUTER_LOG_SEQUENCES[source])
+                delta.mark(self.get_router_log_lines(cisco_conn, source))
+                self.log_deltas[source] = delta
+
+        # Wait for the records of earlier tests to be flushed to the databases
+        last_ids = self.wait_for_log_flush(log_check_list)
+
+        if "tacacs access" in last_ids:
+            self.access_id = last_ids["tacacs access"] + 1
+
+        if "tacacs accounting" in last_ids:
+            self.accounting_id = last_ids["tacacs accounting"] + 1
+
+        if "syslog" in last_ids:
+            self.syslog_id = last_ids["syslog"] + 1
+
+        if "snmp" in last_ids:
+            self.snmp_id = last_ids["snmp"] + 1
 
-        if "show history all" in log_check_list:
-            self.show_history_all_last = self.get_show_history_all_last(cisco_conn)
+        logging.debug("last id in snmp:{}".format(self.snmp_id))
+
+    def get_log_table_last_ids(self, log_check_list):
+        """Returns the last id of the log tables in the check list."""
 
-        logging.debug("### SNMP Flush out before starting log (experimental)  ###")
-        logging.debug("Waiting for SNMP to flush itself...")
-        time.sleep(120)
-        logging.debug("Waiting for SNMP to flush itself... DONE")
+        last_ids = {}
 
         if "tacacs access" in log_check_list:
-            self.access_id = self.get_database_table_last_id(self.tacacs_IP,
-                                                            self.tacacs_db_user,
-                                                            self.tacacs_db_pass,
-                                                            self.tacacs_db_name,
-                                                            self.tacacs_access_table) + 1
+            last_ids["tacacs access"] = self.get_database_table_last_id(self.tacacs_IP,
+                                                                        self.tacacs_db_user,
+                                                                        self.tacacs_db_pass,
+                                                                        self.tacacs_db_name,
+                                                                        self.tacacs_access_table)
 
         if "tacacs accounting" in log_check_list:
-            self.accounting_id = self.get_database_table_last_id(self.tacacs_IP,
-                                                                self.tacacs_db_user,
-                                                                self.tacacs_db_pass,
-                                                                self.tacacs_db_name,
-                                                                self.tacacs_accounting_table) + 1
+            last_ids["tacacs accounting"] = self.get_database_table_last_id(self.tacacs_IP,
+                                                                            self.tacacs_db_user,
+                                                                            self.tacacs_db_pass,
+                                                                            self.tacacs_db_name,
+                                                                            self.tacacs_accounting_table)
 
         if "syslog" in log_check_list:
-            self.syslog_id = self.get_database_table_last_id(self.syslog_IP,
-                                                            self.syslog_snmp_db_user,
-                                                            self.syslog_snmp_db_pass,
-                                                            self.syslog_db_name,
-                                                            self.syslog_table) + 1
+            last_ids["syslog"] = self.get_database_table_last_id(self.syslog_IP,
+                                                                 self.syslog_snmp_db_user,
+                                                                 self.syslog_snmp_db_pass,
+                                                                 self.syslog_db_name,
+                                                                 self.syslog_table)
 
         if "snmp" in log_check_list:
-            self.snmp_id = self.get_database_table_last_id(self.snmp_IP,
-                                                        self.syslog_snmp_db_user,
-                                                        self.syslog_snmp_db_pass,
-                                                        self.snmp_db_name,
-                                                        self.snmp_table,
-                                                        id_name="net_snmp.varbinds.trap_id") + 1
+            last_ids["snmp"] = self.get_database_table_last_id(self.snmp_IP,
+                                                               self.syslog_snmp_db_user,
+                                                               self.syslog_snmp_db_pass,
+                                                               self.snmp_db_name,
+                                                               self.snmp_table,
+                                                               id_name="net_snmp.varbinds.trap_id")
 
-        logging.debug("last id in snmp:{}".format(self.snmp_id))
+        return last_ids
+
+    def wait_for_log_flush(self, log_check_list, timeout=None):
+        """
+        Wait until the log tables in the check list stop growing.
+
+        The last id of each table is polled with an exponential backoff until
+        it has not changed for FLUSH_QUIET_PERIOD seconds, or until the
+        timeout (default: flush_timeout) is reached.
+
+        Returns the last ids, see get_log_table_last_ids().
+        """
+
+        if timeout is None:
+            timeout = self.flush_timeout
+
+        start_time = time.time()
+        last_ids = self.get_log_table_last_ids(log_check_list)
+        if not last_ids:
+            return last_ids
+
+        logging.debug("Waiting for the log databases to flush...")
+
+        interval = FLUSH_POLL_INTERVAL
+        quiet_since = start_time
+
+        while True:
+            now = time.time()
+            if now - quiet_since >= FLUSH_QUIET_PERIOD:
+                logging.debug("Log databases flushed after {:.1f}s, last ids: {}"
+                              "".format(now - start_time, last_ids))
+                break
+
+            remaining = start_time + timeout - now
+            if remaining <= 0:
+                logging.info("Log databases still growing after {}s, last ids: {}"
+                             "".format(timeout, last_ids))
+                break
+
+            time.sleep(min(interval, remaining, quiet_since + FLUSH_QUIET_PERIOD - now))
+
+            current_ids = self.get_log_table_last_ids(log_check_list)
+            if current_ids != last_ids:
+                last_ids = current_ids
+                quiet_since = time.time()
+                interval = FLUSH_POLL_INTERVAL
+            else:
+                interval = min(interval * 2, FLUSH_POLL_MAX_INTERVAL)
+
+        return last_ids
 
     def logging_retrieve(self, cisco_conn, log_check_list,test_user):
         self.logging_read(cisco_conn, log_check_list, test_user)
@@ -160,73 +273,197 @@ class CiscoLogging:
     def logging_read(self, cisco_conn, log_check_list, test_user):
         '''Read the logs since running "logging_start()".'''
 
+        self._log_store = None
+
+        # (source, attribute to store the records in, func, args)
+        db_sources = []
+
         # Retrieving the tacacs access records
         if "tacacs access" in log_check_list:
-            self.tacacs_access = self.get_tacacs_access_logs(cisco_conn.IP,
-                                                            test_user)
+            db_sources.append(("tacacs access", "tacacs_access",
+                               self.get_tacacs_access_logs, (cisco_conn.IP, test_user)))
 
         # Retrieving the tacacs accounting records
         if "tacacs accounting" in log_check_list:
-            self.tacacs_accounting = self.get_tacacs_accounting_logs(cisco_conn.IP,
-                                                                    test_user)
+            db_sources.append(("tacacs accounting", "tacacs_accounting",
+                               self.get_tacacs_accounting_logs, (cisco_conn.IP, test_user)))
 
         # Retrieving the syslog_snmp records
         if "syslog" in log_check_list:
-            self.syslog = self.get_syslogs(cisco_conn.IP)
+            db_sources.append(("syslog", "syslog",
+                               self.get_syslogs, (cisco_conn.IP,)))
 
         # Retrieving the syslog_snmp records
         if "snmp" in log_check_list:
-            self.snmp = self.get_snmp_logs(cisco_conn.IP)
+            db_sources.append(("snmp", "snmp",
+                               self.get_snmp_logs, (cisco_conn.IP,)))
 
         # !Note! Remote servers logs should run before local logs
+        # The database queries are all started before the router is read and
+        # run in parallel with it
+        pool = ThreadPool(len(db_sources)) if db_sources else None
+        pending = []
+
+        try:
+            for source, attr, func, args in db_sources:
+                pending.append((source, attr, pool.apply_async(
+                        self._timed_read, (source, func, args))))
+
+            start_time = time.time()
+            self.logging_read_local(cisco_conn, log_check_list)
+            self.source_latency["router"] = time.time() - start_time
+
+            for source, attr, result in pending:
+                try:
+                    setattr(self, attr, result.get(self.source_timeout))
+                except multiprocessing.TimeoutError:
+                    raise ValueError("Retrieving {} logs timed out after {}s"
+                                     "".format(source, self.source_timeout))
+
+        finally:
+            if pool:
+                pool.terminate()
+
+        logging.debug("Log retrieval latency: {}".format(", ".join(
+                "{} {:.2f}s".format(source, latency)
+                for source, latency in sorted(self.source_latency.items()))))
+
+    def logging_read_local(self, cisco_conn, log_check_list):
+        '''Read the logs kept on the router since running "logging_start()".'''
 
         # Retrieving the 'show history all' records
-        if ("show history all" in log_check_list) or self.show_history_all_last:
-            self.show_history_all = self.get_show_history_all_new(
-                    cisco_conn, self.show_history_all_last)
+        if ("show history all" in log_check_list) or ("show history all" in self.log_deltas):
+            self.show_history_all = self.get_new_router_log_lines(
+                    cisco_conn, "show history all")
 
         # Retrieving the 'show logging' 'Log Buffer' records
         if "show log" in log_check_list:
-            self.buffered = self.get_show_logging_logs(cisco_conn)
+            self.buffered = "".join(self.get_new_router_log_lines(cisco_conn, "show log"))
 
         # Retrieving the 'show archive log config all' records
         if "show archive log config all" in log_check_list:
-            self.archive = self.get_archive_logs(cisco_conn)
+            self.archive = "".join(self.get_new_router_log_lines(
+                    cisco_conn, "show archive log config all"))
+
+    def get_router_log_lines(self, cisco_conn, source):
+        """Return the lines of a log kept on the router, with their line endings."""
+
+        if source == "show history all":
+            cisco_conn.sendline_and_expect_hostname("show history all")
+            return [line for line in cisco_conn.before().splitlines()
+                    if ENTRY_PATTERN.match(line)]
+
+        if source == "show log":
+            return self.get_show_logging_logs(cisco_conn).splitlines(True)
+
+        if source == "show archive log config all":
+            return self.get_archive_logs(cisco_conn).splitlines(True)
+
+        raise ValueError("Unknown router log [{}]".format(source))
+
+    def get_new_router_log_lines(self, cisco_conn, source):
+        """Return the lines added to a log kept on the router since logging_start()."""
+
+        lines = self.get_router_log_lines(cisco_conn, source)
+
+        delta = self.log_deltas.get(source)
+        if delta is None:
+            return lines
+
+        new_lines = delta.new_lines(lines)
+        logging.debug("{}: {} new lines out of {}".format(source, len(new_lines), len(lines)))
+        return new_lines
+
+    def _timed_read(self, source, func, args):
+        start_time = time.time()
+        try:
+            return func(*args)
+        finally:
+            self.source_latency[source] = time.time() - start_time
 
     def get_buffered_log(self):
         return self.buffered
 
     def _convert_tuple_to_string(self, db_tuples):
-        str_out = ""
+        return CiscoLogRender.render(db_tuples)
 
-        for innerlist in db_tuples:
-            inner_out = ""
+    def render_logs(self, source, fmt="tsv"):
+        """Return the records of a log database formatted as tsv, csv or jsonl."""
 
-            for item in innerlist:
+        attr, fields, _ = self._log_source(source)
 
-                if inner_out == "":
-                    inner_out = str(item)
-                else:
-                    inner_out = inner_out + "\t" + str(item)
+        # The tsv rendering has no header, the records are rendered as is
+        if fmt == "tsv":
+            fields = None
 
-            if str_out == "":
-                str_out = inner_out
-            else:
-                str_out = str_out + "\n" + inner_out
+        return self.render_cache.render(source, getattr(self, attr), fmt, fields)
+
+    def write_logs(self, source, path, fmt="tsv"):
+        """
+        Write the records of a log database to a file, one record per line.
+
+        Returns the number of records written.
+        """
+
+        attr, fields, _ = self._log_source(source)
 
-        return str_out
+        if fmt == "tsv":
+            fields = None
+
+        count = CiscoLogRender.write(getattr(self, attr), path, fmt, fields)
+
+        logging.debug("Wrote {} {} records to {}".format(count, source, path))
+        return count
+
+    def records(self, source):
+        """
+        Return the records retrieved from a log as a RecordSet.
+
+        The sources are the log databases, "show log", "show archive log
+        config all" and "show history all".
+        """
+
+        if source == "show log":
+            return RecordSet(parse_syslog_buffer((self.buffered or "").splitlines()))
+
+        if source == "show archive log config all":
+            return RecordSet(parse_archive((self.archive or "").splitlines()))
+
+        if source == "show history all":
+            return RecordSet(ShowHistoryParser().parse("\n".join(self.show_history_all or [])))
+
+        attr, _, record_type = self._log_source(source)
+        return RecordSet(record_type._make(row) for row in getattr(self, attr) or ())
+
+    def log_store(self):
+        """Return a LogStore of the records retrieved from every log."""
+
+        if self._log_store is None:
+            store = LogStore()
+            for source in LOG_SOURCES.keys() + ROUTER_LOG_SEQUENCES.keys():
+                store.add(source, self.records(source))
+            self._log_store = store
+
+        return self._log_store
+
+    def _log_source(self, source):
+        try:
+            return LOG_SOURCES[source]
+        except KeyError:
+            raise ValueError("Unknown log source [{}], expected one of {}"
+                             "".format(source, ", ".join(sorted(LOG_SOURCES))))
 
     def get_tacacs_access_log(self):
-        return self._convert_tuple_to_string(self.tacacs_access)
+        return self.render_logs("tacacs access")
 
     def get_tacacs_accounting_log(self):
-        return self._convert_tuple_to_string(self.tacacs_accounting)
+        return self.render_logs("tacacs accounting")
 
     def get_syslog_log(self):
-        return self._convert_tuple_to_string(self.syslog)
+        return self.render_logs("syslog")
 
     def get_snmp_log(self):
-        return self._convert_tuple_to_string(self.snmp)
+        return self.render_logs("snmp")
 
     def get_history_all_log(self):
         return " ".join(self.show_history_all)
@@ -235,128 +472,171 @@ class CiscoLogging:
         return self.archive
 
     def logging_write_all(self):
-        self.logging_write(self.tacacs_access, "Tacacs Access Logs")
-        self.logging_write(self.tacacs_accounting, "Tacacs Accounting Logs")
-        self.logging_write(self.syslog, "Remote Syslog")
-        self.logging_write(self.snmp, "SNMP Logs")
+        self.logging_write(self.tacacs_access, "Tacacs Access Logs", "tacacs access")
+        self.logging_write(self.tacacs_accounting, "Tacacs Accounting Logs", "tacacs accounting")
+        self.logging_write(self.syslog, "Remote Syslog", "syslog")
+        self.logging_write(self.snmp, "SNMP Logs", "snmp")
 
-    def logging_write(self, logs, log_name):
+    def logging_write(self, logs, log_name, source=None):
         logging.info(
                 "\n**************\n{}:\n**************\n".format(log_name))
 
         if len(logs) == 0:
             logging.info("No records found.\n")
+        elif source:
+            # Cached for the get_*_log() calls that follow
+            logging.info(self.render_cache.render(source, logs))
         else:
             logging.info(self._convert_tuple_to_string(logs))
 
     def get_tacacs_access_logs(self, router_ip, user):
 
-        conn = MySQLdb.connect(host=self.tacacs_IP,
-                               user=self.tacacs_db_user,
-                               passwd=self.tacacs_db_pass,
-                               db=self.tacacs_db_name,
-                               port=3306)
-
-        with closing(conn) as db:
-            with closing(db.cursor()) as cur:
-                return self.query_table(cur,
-                                        ACCESS_FIELDS,
-                                        self.tacacs_access_table,
-                                        self.access_id, "id",
-                                        router_ip, "nas",
-                                        user, "uid")
+        return self.read_log_table("tacacs access",
+                                   self.tacacs_IP,
+                                   self.tacacs_db_user,
+                                   self.tacacs_db_pass,
+                                   self.tacacs_db_name,
+                                   ACCESS_FIELDS,
+                                   self.tacacs_access_table,
+                                   self.access_id, "id",
+                                   router_ip, "nas",
+                                   user, "uid")
 
     def get_tacacs_accounting_logs(self, router_ip, user):
 
-        conn = MySQLdb.connect(host=self.tacacs_IP,
-                               user=self.tacacs_db_user,
-                               passwd=self.tacacs_db_pass,
-                               db=self.tacacs_db_name,
-                               port=3306)
-
-        with closing(conn) as db:
-            with closing(db.cursor()) as cur:
-                return self.query_table(cur,
-                                        ACCOUNTING_FIELDS,
-                                        self.tacacs_accounting_table,
-                                        self.accounting_id, "id",
-                                        router_ip, "nas",
-                                        user, "uid")
+        return self.read_log_table("tacacs accounting",
+                                   self.tacacs_IP,
+                                   self.tacacs_db_user,
+                                   self.tacacs_db_pass,
+                                   self.tacacs_db_name,
+                                   ACCOUNTING_FIELDS,
+                                   self.tacacs_accounting_table,
+                                   self.accounting_id, "id",
+                                   router_ip, "nas",
+                                   user, "uid")
 
     def get_syslogs(self, router_ip):
 
-        conn = MySQLdb.connect(host=self.syslog_IP,
-                               user=self.syslog_snmp_db_user,
-                               passwd=self.syslog_snmp_db_pass,
-                               db=self.syslog_db_name,
-                               port=3306)
-
-        with closing(conn) as db:
-            with closing(db.cursor()) as cur:
-                return self.query_table(cur,
-                                        SYSTEMEVENTS_FIELDS,
-                                        self.syslog_table,
-                                        self.syslog_id, "id",
-                                        router_ip, "FromHost")
+        return self.read_log_table("syslog",
+                                   self.syslog_IP,
+                                   self.syslog_snmp_db_user,
+                                   self.syslog_snmp_db_pass,
+                                   self.syslog_db_name,
+                                   SYSTEMEVENTS_FIELDS,
+                                   self.syslog_table,
+                                   self.syslog_id, "id",
+                                   router_ip, "FromHost")
 
     def get_snmp_logs(self, router_ip):
 
-        conn = MySQLdb.connect(host=self.snmp_IP,
-                               user=self.syslog_snmp_db_user,
-                               passwd=self.syslog_snmp_db_pass,
-                               db=self.snmp_db_name,
-                               port=3306)
-
-        with closing(conn) as db:
-            with closing(db.cursor()) as cur:
-                return self.query_table(cur,
-                                        SNMPNOTIFICATION_FIELDS,
-                                        self.snmp_table,
-                                        self.snmp_id,
-                                        "net_snmp.varbinds.trap_id",
-                                        router_ip, "transport")
+        # A trap has one row per varbind, all with the same trap_id
+        return self.read_log_table("snmp",
+                                   self.snmp_IP,
+                                   self.syslog_snmp_db_user,
+                                   self.syslog_snmp_db_pass,
+                                   self.snmp_db_name,
+                                   SNMPNOTIFICATION_FIELDS,
+                                   self.snmp_table,
+                                   self.snmp_id,
+                                   "net_snmp.varbinds.trap_id",
+                                   router_ip, "transport",
+                                   unique_id=False)
+
+    def read_log_table(self,
+                       source,
+                       db_ip,
+                       db_user,
+                       db_pass,
+                       db_name,
+                       fields,
+                       table,
+                       id_start,
+                       id_field_name,
+                       router_ip=None,
+                       router_ip_field_name=None,
+                       user=None,
+                       user_field_name=None,
+                       unique_id=True):
+        """
+        Return the rows of a log table since logging_start().
 
-    def query_table(self,
-                    cur,
-                    fields,
-                    table,
-                    id_start,
-                    id_field_name,
-                    router_ip=None,
-                    router_ip_field_name=None,
-                    user=None,
-                    user_field_name=None):
-        """ Return rows from a table with the given fields."""
+        Only the rows added since the previous read of the same source and
+        filter are fetched from the database.
+        """
 
-        query = """SELECT {0} FROM {1}""".format(','.join(fields), table)
-        parameters = list()
-        where_clauses = list()
+        key = (source, router_ip, user)
+        cursor = self.log_cursors.get(key)
+        if cursor is None or cursor.id_start != id_start:
+            cursor = self.log_cursors[key] = self.table_cursor(
+                    fields, table, id_start, id_field_name,
+                    router_ip, router_ip_field_name,
+                    user, user_field_name, unique_id,
+                    record_type=self._log_source(source)[2])
+
+        with _db_pool.connection(db_ip,
+                                 db_user,
+                                 db_pass,
+                                 db_name,
+                                 port=3306) as db:
+            # Unbuffered cursor, rows are streamed from the server
+            with closing(db.cursor(MySQLdb.cursors.SSCursor)) as cur:
+                rows = cursor.read(cur)
+
+        logging.debug("{}: {} rows, last id {}".format(source, len(rows), cursor.last_id))
+        return rows
+
+    def table_cursor(self,
+                     fields,
+                     table,
+                     id_start,
+                     id_field_name,
+                     router_ip=None,
+                     router_ip_field_name=None,
+                     user=None,
+                     user_field_name=None,
+                     unique_id=True,
+                     record_type=None):
+        """Return a LogTableCursor on a table with the given fields."""
+
+        filters = list()
 
         if id_start:
-            where_clauses.append(id_field_name + " >= %s")
-            parameters.append(id_start)
             logging.debug("id_start = {}".format(id_start))
 
         if user:
-            where_clauses.append(user_field_name + " = %s")
-            parameters.append(user)
+            filters.append((user_field_name + " = %s", user))
             logging.debug("user = {}".format(user))
 
         if router_ip:
             if router_ip_field_name == "transport":
                 router_ip = "UDP: [%s]%%" % router_ip
-                where_clauses.append(router_ip_field_name + " LIKE %s")
+                filters.append((router_ip_field_name + " LIKE %s", router_ip))
             else:
-                where_clauses.append(router_ip_field_name + " = %s")
-            parameters.append(router_ip)
+                filters.append((router_ip_field_name + " = %s", router_ip))
             logging.debug("router_ip = {}".format(router_ip))
 
-        if where_clauses:
-            query = query + " WHERE " + " AND ".join(where_clauses)
+        return LogTableCursor(fields, table, id_field_name,
+                              id_start=id_start,
+                              filters=filters,
+                              unique_id=unique_id,
+                              page_size=self.page_size,
+                              record_type=record_type)
+
+    def query_table(self,
+                    cur,
+                    fields,
+                    table,
+                    id_start,
+                    id_field_name,
+                    router_ip=None,
+                    router_ip_field_name=None,
+                    user=None,
+                    user_field_name=None):
+        """ Return rows from a table with the given fields."""
 
-        logging.debug("SQL Query exec: {}".format(query))
-        cur.execute(query, parameters)
-        return cur.fetchall()
+        return self.table_cursor(fields, table, id_start, id_field_name,
+                                 router_ip, router_ip_field_name,
+                                 user, user_field_name).read(cur)
 
     def get_database_table_last_id(self,
                                    db_ip,
@@ -369,13 +649,11 @@ class CiscoLogging:
 
         query = "SELECT " + id_name + " FROM " + table + " ORDER BY " + id_name + " DESC" + " LIMIT 1"
 
-        conn = MySQLdb.connect(host=db_ip,
-                               user=db_user,
-                               passwd=db_pass,
-                               db=db_name,
-                               port=port)
-
-        with closing(conn) as db:
+        with _db_pool.connection(db_ip,
+                                 db_user,
+                                 db_pass,
+                                 db_name,
+                                 port=port) as db:
             with closing(db.cursor()) as cur:
                 cur.execute(query)
                 row = cur.fetchone()
@@ -397,146 +675,19 @@ class CiscoLogging:
 
     def get_show_history_all(self, cisco_conn):
 
-        bDoNotSort = False
-
         #   Execute "show history all" command
         cisco_conn.sendline_and_expect_hostname("show history all")
 
         #   Log the size of the show history all buffer
         logging.debug("Show History All buffer size: {}".format(len(cisco_conn.before())))
 
-        #   Split by lines
-        lines = cisco_conn.before().splitlines()
-
-        showHistLogList = []
-        bWriteDateTimeBackwards = False
-
-        for line in (lines):
-
-            # Should match either "CMD:" or "001293:" to be unique
-            found = re.search("^((\*(.+?):)|[\d]+:|CMD:)(.+?)$", line)
-            if found:
-
-                # Convert line into a show hist entry object
-                showHistLog = CiscoShowHistoryLog(line)
-
-                # Handle the case when entry does not have a date time in
-                # string
-                if showHistLog.logDateTime is None:
-
-                    logging.debug("Current entry({}) has no date time".format(line))
-                    logging.debug("List has {} entry(s)".format(len(showHistLogList)))
-
-                    if len(showHistLogList) > 0 and bWriteDateTimeBackwards == False:
-                        showHistLog.logDateTime = showHistLogList[-1].logDateTime
-                        bWriteDateTimeBackwards = False
-
-                    #   Default assignment to indicate that there is a need to
-                    #   transverse backwards in the entry
-                    bWriteDateTimeBackwards = True
-
-                else:
-
-                    #   Indicates that there are entries without datetime
-                    #   behind
-                    #   Note: This is to cover the first few entries without
-                    #   date time
-                    if bWriteDateTimeBackwards == True:
-
-                        logging.debug("Backporting datetime")
-
-                        #   Transversing backwards to ensure that all entries
-                        #   are with datetime
-                        for logEntry in reversed(showHistLogList):
-
-                            if logEntry.logDateTime is None:
-                                logEntry.logDateTime = showHistLog.logDateTime
-                            else:
-                                break
-
-                        bWriteDateTimeBackwards = False
-
-                        logging.debug("Backporting datetime ... DONE")
-
-                # Add the current entry to list
-                showHistLogList.append(showHistLog)
-
-        #   This is to handle the case where there is entries without datetime at the end
-        #   of the "show history all" list
-        if bWriteDateTimeBackwards == True:
-
-            logging.debug("Found entry(s) witout datetime at the end")
-
-            #   Search for an entry before the first entry without datetime
-            for logEntry in reversed(showHistLogList):
-
-                if logEntry.logDateTime is not None:
-                    logDateTimeToBP = logEntry.logDateTime
-                    break
-
-            #   To guard against case where there is completely no entry with datetime
-            #   NOTE: Unlikely case but this is just failsafe
-            if logDateTimeToBP is None:
-                
-                #   No point in sorting since there are no entry with datetime
-                bDoNotSort = True
-
-            else:
-
-                logging.debug("Backporting date time")
-
-                #   Transversing backwards to ensure that all entries are with datetime
-                for logEntry in reversed(showHistLogList):
-
-                    if logEntry.logDateTime is None:
-                        logEntry.logDateTime = showHistLog.logDateTime
-                    else:
-                        break                            
-
-            bWriteDateTimeBackwards = False
-
-        if bDoNotSort == False:
-            
-            # Sort the list in order of early to latest
-            showHistLogList.sort(key=lambda CiscoShowHistoryLog: CiscoShowHistoryLog.logDateTime)
+        showHistLogList = ShowHistoryParser().parse(cisco_conn.before())
 
         # Store list to class member
         self.shHistLogList = showHistLogList
 
         return showHistLogList
 
-    def get_show_history_all_last(self, cisco_conn):
-        """
-        Get logs that start from the last unique line of show history all.
-        """
-
-        showHistLogList = self.get_show_history_all(cisco_conn)
-
-        if showHistLogList.count > 0:
-            return showHistLogList[-1]
-        else:
-            return None
-
-    def get_show_history_all_new(self, cisco_conn, last_list):
-        """Get logs that start from "being" line of show history all."""
-
-        logging.debug('last_list: {:s}'.format(last_list.line))
-
-        showHistLogList = self.get_show_history_all(cisco_conn)
-
-        new_logs = []
-
-        logging.debug("prev_last: {}".format(last_list.line))
-        for entry in showHistLogList:
-            logging.debug("current entry: {}".format(entry.line))
-            if entry.logDateTime > last_list.logDateTime:
-                logging.debug("New log found!!")
-                new_logs.append(entry.line)
-
-        logging.debug('new_logs: {:s}'.format(new_logs))
-
-        return new_logs
-
     def get_archive_logs(self, cisco_conn):
         cisco_conn.sendline_and_expect_hostname("show archive log config all")
 
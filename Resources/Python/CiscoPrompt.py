@@ -0,0 +1,147 @@
+import logging
+import re
+import pexpect
+
+
+# Prompts that can end the output of a command
+PROMPT_SHELL = "shell"
+PROMPT_YES_NO = "yes/no"
+PROMPT_CONFIRM = "confirm"
+
+# Size of the reads when streaming the output of a command
+DEFAULT_CHUNK_SIZE = 65536
+# Time without more output after the shell prompt before the output of a
+# streamed command is considered complete
+PROMPT_SETTLE_TIMEOUT = 0.2
+
+
+class CiscoCmdResult(object):
+    """Output of a command and the prompts seen while running it."""
+
+    def __init__(self, output, prompt, answered):
+        self.output = output
+        self.prompt = prompt            # Shell prompt that ended the command
+        self.answered = answered        # Interactive prompts answered with "n"
+
+
+class CiscoPromptMachine(object):
+    """
+    Runs a command until the router is back at its shell prompt.
+
+    Interactive "[yes/no]" and "[confirm]" prompts are declined on the way.
+    """
+
+    def __init__(self, hostname):
+        self.hostname = hostname
+
+        # Same order as the states below, pexpect returns the index of the
+        # pattern that matched first in the output
+        self.patterns = [
+            re.compile(hostname + "[^\s]*#"),
+            re.compile("\[[yY]es\/[nN]o\]"),
+            re.compile("\[confirm\]"),
+        ]
+        self.states = (PROMPT_SHELL, PROMPT_YES_NO, PROMPT_CONFIRM)
+
+        # Shell prompt at the very end of the output received so far
+        self.end_prompt = re.compile("\r?\n" + hostname + "[^\s]*#\Z")
+        self.end_prompt_window = len(hostname) + 64
+
+    def run(self, cconn, cmd):
+        """Send the command and returns a CiscoCmdResult."""
+
+        cconn.sendline(cmd)
+
+        #   NOTE:   cconn.before() gives the string from the start / previous
+        #           expect() until the next expect string (not inclusive)
+        chunks = []
+        answered = []
+
+        while True:
+            state = self.states[cconn.expect_any(self.patterns)]
+            chunks.append(cconn.before())
+
+            if state == PROMPT_SHELL:
+                break
+
+            #   Perform additional command send to get the execution to end
+            #   with a command line shell instead of prompts
+            logging.debug("Declining {} prompt".format(state))
+            answered.append(state)
+
+            if state == PROMPT_YES_NO:
+                cconn.sendline("n")
+            else:
+                cconn.send("n")
+
+        return CiscoCmdResult("".join(chunks), cconn.after(), answered)
+
+    def stream(self, cconn, cmd, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Send the command and yield its output as it arrives.
+
+        The echoed command and the final shell prompt are not part of the
+        output. Only the end of the output is kept to look for the prompt,
+        so memory use does not grow with the size of the output.
+        Interactive prompts are not handled.
+        """
+
+        cconn.sendline(cmd)
+
+        pending = ""
+        echoed = False
+
+        while True:
+            pending += cconn.read_chunk(chunk_size)
+
+            if not echoed:
+                if "\n" not in pending:
+                    continue
+                pending = pending.split("\n", 1)[1]
+                echoed = True
+
+            m = self.end_prompt.search(
+                    pending, max(0, len(pending) - self.end_prompt_window))
+            if m:
+                try:
+                    pending += cconn.read_chunk(chunk_size,
+                                                PROMPT_SETTLE_TIMEOUT)
+                    # Prompt-like line in the output, carry on
+                    continue
+                except pexpect.TIMEOUT:
+                    if m.start():
+                        yield pending[:m.start()]
+                    logging.debug("Streamed {} until {}".format(
+                            cmd, pending[m.start():].strip()))
+                    return
+
+            if len(pending) > self.end_prompt_window:
+                yield pending[:-self.end_prompt_window]
+                pending = pending[-self.end_prompt_window:]
+
+
+def iter_lines(chunks):
+    """Yield the lines of streamed output, without line endings."""
+
+    pending = ""
+    for chunk in chunks:
+        lines = (pending + chunk).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+
+    if pending:
+        yield pending.rstrip("\r")
+
+
+_prompt_machines = {}
+
+
+def get_prompt_machine(hostname):
+    """Returns the CiscoPromptMachine of a router, compiled once."""
+
+    machine = _prompt_machines.get(hostname)
+    if machine is None:
+        machine = _prompt_machines.setdefault(hostname,
+                                              CiscoPromptMachine(hostname))
+    return machine
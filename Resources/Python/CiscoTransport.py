@@ -0,0 +1,235 @@
+"""
+In-process transports for CiscoConnection.
+
+The sessions are pexpect spawn objects, so sendline/expect/before/after
+behave the same as with a spawned telnet or ssh binary, but without the
+fork/exec and pty per connection.
+"""
+
+import logging
+import select
+import socket
+import telnetlib
+import time
+from pexpect import EOF, TIMEOUT
+from pexpect.spawnbase import SpawnBase
+
+
+TELNET_PORT = 23
+SSH_PORT = 22
+
+# Key exchanges of the older IOS versions, also forced on the ssh binary
+LEGACY_KEX = ("diffie-hellman-group14-sha1", "diffie-hellman-group1-sha1")
+
+
+class TransportUnavailable(Exception):
+    """The native transport cannot be used on this host or with this router."""
+
+
+class _SocketSpawn(SpawnBase):
+    """pexpect spawn reading from a socket-like object."""
+
+    def __init__(self, timeout=30, maxread=4000):
+        super(_SocketSpawn, self).__init__(timeout=timeout, maxread=maxread)
+        self._pending = self.string_type()
+
+    def _fileno(self):
+        raise NotImplementedError
+
+    def _recv(self, size):
+        """Returns the data read, '' on EOF or None if nothing is ready."""
+        raise NotImplementedError
+
+    def _write(self, data):
+        raise NotImplementedError
+
+    def read_nonblocking(self, size=1, timeout=-1):
+
+        if self._pending:
+            data, self._pending = self._pending[:size], self._pending[size:]
+            return data
+
+        if self.flag_eof:
+            raise EOF('End Of File (EOF).')
+
+        if timeout == -1:
+            timeout = self.timeout
+
+        end_time = None if timeout is None else time.time() + timeout
+
+        while True:
+            data = self._recv(size)
+            if data is not None:
+                break
+
+            remaining = None if end_time is None else end_time - time.time()
+            if remaining is not None and remaining <= 0:
+                raise TIMEOUT('Timeout exceeded.')
+            select.select([self._fileno()], [], [], remaining)
+
+        if not data:
+            self.flag_eof = True
+            raise EOF('End Of File (EOF).')
+
+        self._log(data, 'read')
+        data = self._decoder.decode(data, final=False)
+        data, self._pending = data[:size], data[size:]
+        return data
+
+    def send(self, s):
+        s = self._coerce_send_string(s)
+        self._log(s, 'send')
+
+        b = self._encoder.encode(s, final=False)
+        self._write(b)
+        return len(b)
+
+    def sendline(self, s=''):
+        n = self.send(s)
+        return n + self.send(self.crlf)
+
+
+class TelnetSpawn(_SocketSpawn):
+    """Telnet session over a socket."""
+
+    # Options accepted from the router. Everything else is refused.
+    ACCEPTED_OPTIONS = (telnetlib.ECHO, telnetlib.SGA)
+
+    def __init__(self, host, port=TELNET_PORT, timeout=30, maxread=4000):
+        super(TelnetSpawn, self).__init__(timeout=timeout, maxread=maxread)
+
+        self._negotiated = set()
+        self.telnet = telnetlib.Telnet()
+        self.telnet.set_option_negotiation_callback(self._negotiate)
+        self.telnet.open(host, port, timeout)
+
+    def _negotiate(self, sock, cmd, opt):
+        """Let the router echo (like the telnet binary) and refuse the rest."""
+
+        if (cmd, opt) in self._negotiated:
+            return
+        self._negotiated.add((cmd, opt))
+
+        if cmd == telnetlib.WILL:
+            reply = telnetlib.DO if opt in self.ACCEPTED_OPTIONS else telnetlib.DONT
+        elif cmd == telnetlib.DO:
+            reply = telnetlib.WILL if opt == telnetlib.SGA else telnetlib.WONT
+        else:
+            return
+
+        sock.sendall(telnetlib.IAC + reply + opt)
+
+    def _fileno(self):
+        return self.telnet.fileno()
+
+    def _recv(self, size):
+        try:
+            data = self.telnet.read_very_eager()
+        except EOFError:
+            return self.string_type()
+
+        # Nothing or only option negotiation was received
+        return data or None
+
+    def _write(self, data):
+        self.telnet.write(data)
+
+    def isalive(self):
+        return bool(self.telnet.get_socket()) and not self.flag_eof
+
+    def close(self, force=True):
+        self.telnet.close()
+        self.closed = True
+
+
+class SshSpawn(_SocketSpawn):
+    """SSH interactive shell over a paramiko channel."""
+
+    def __init__(self, host, username, password, port=SSH_PORT, timeout=30,
+                 maxread=4000):
+        super(SshSpawn, self).__init__(timeout=timeout, maxread=maxread)
+
+        try:
+            import paramiko
+        except ImportError:
+            raise TransportUnavailable("paramiko is not installed")
+
+        self.transport = None
+
+        # Routers are reflashed and regenerate their keys all the time, so
+        # their host key is not checked (same as "ssh-keygen -R" before ssh)
+        try:
+            sock = socket.create_connection((host, port), timeout)
+            self.transport = paramiko.Transport(sock)
+            self._enable_legacy_kex(self.transport.get_security_options())
+            self.transport.start_client(timeout=timeout)
+            self.transport.auth_password(username, password)
+
+            self.channel = self.transport.open_session()
+            self.channel.get_pty()
+            self.channel.invoke_shell()
+
+        except paramiko.AuthenticationException:
+            self._close_transport()
+            raise ValueError("Incorrect Login Credential!\n")
+        except (paramiko.SSHException, socket.error) as e:
+            # e.g. no common key exchange, left to the ssh binary
+            self._close_transport()
+            raise TransportUnavailable("SSH negotiation failed: {}".format(e))
+
+    def _enable_legacy_kex(self, options):
+        """Add the LEGACY_KEX supported by this paramiko after its own."""
+
+        for kex in LEGACY_KEX:
+            if kex in options.kex:
+                continue
+            try:
+                options.kex = tuple(options.kex) + (kex,)
+            except ValueError:
+                logging.debug("paramiko does not support {}".format(kex))
+
+    def _close_transport(self):
+        if self.transport is not None:
+            self.transport.close()
+
+    def _fileno(self):
+        return self.channel.fileno()
+
+    def _recv(self, size):
+        if self.channel.recv_ready():
+            return self.channel.recv(size)
+        elif self.channel.closed or self.channel.eof_received:
+            return self.string_type()
+
+        return None
+
+    def _write(self, data):
+        self.channel.sendall(data)
+
+    def isalive(self):
+        return self.transport.is_active() and not self.channel.closed
+
+    def close(self, force=True):
+        self.transport.close()
+        self.closed = True
+
+
+def spawn_native(protocol, IP, username, password, timeout=None,
+                 maxread=4000):
+    """Returns an in-process session to the router."""
+
+    logging.info("Opening {:s} session to {:s}\r\n".format(protocol, IP))
+
+    if protocol.lower() == 'telnet':
+        try:
+            return TelnetSpawn(IP, timeout=timeout, maxread=maxread)
+        except socket.error as e:
+            logging.debug("Retrying telnet connect ({})".format(e))
+            time.sleep(2)
+            return TelnetSpawn(IP, timeout=timeout, maxread=maxread)
+
+    elif protocol.lower() == 'ssh':
+        return SshSpawn(IP, username, password, timeout=timeout,
+                        maxread=maxread)
+
+    raise ValueError('Invalid protocol type "{:s}"'.format(protocol))
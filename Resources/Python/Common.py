@@ -12,15 +12,16 @@ def parse_backspace(string):
     Returns the parsed string.
     """
 
-    parsed_str = ""
+    parsed_chars = []
 
     for ch in string:
         if ch == '\x08':
-            parsed_str = parsed_str[:-1]
+            if parsed_chars:
+                parsed_chars.pop()
         else:
-            parsed_str = parsed_str + ch
+            parsed_chars.append(ch)
 
-    return parsed_str
+    return "".join(parsed_chars)
 
 
 def parse_special_character(strings):
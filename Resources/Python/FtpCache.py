@@ -0,0 +1,266 @@
+import os
+import errno
+import fcntl
+import json
+import time
+import hashlib
+import logging
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from FtpTransfer import retrieve, DEFAULT_BLOCKSIZE
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ftp_cache")
+
+# Disk space the cached files may use, the least recently used are evicted
+DEFAULT_CACHE_QUOTA = 4 * 1024 ** 3
+
+# Seconds a cached file is served without checking the FTP server
+DEFAULT_MAX_AGE = 300
+
+# Seconds an interrupted download is kept for resuming. Older ones are left
+# behind by files changed on the server since.
+PART_MAX_AGE = 24 * 3600
+
+
+def cache_key(url, size, mtime):
+    return hashlib.sha1("{} {} {}".format(url, size, mtime)).hexdigest()
+
+
+def link_or_copy(cached, output_filename):
+    """
+    Puts a cached file at output_filename, hard linked so large files are not
+    written again. It is copied when the link is not possible, e.g. on
+    another filesystem.
+    """
+
+    if os.path.lexists(output_filename):
+        os.remove(output_filename)
+
+    try:
+        os.link(cached, output_filename)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+            raise
+        logging.debug("Copying {}, cannot link it: {}".format(cached, e))
+        shutil.copyfile(cached, output_filename)
+
+
+class FtpCache(object):
+    """
+    Local copies of FTP files, keyed by URL and the remote size/MDTM.
+
+    Files are downloaded to "<key>.part", resumed with REST when a download
+    was interrupted, and renamed to "<key>" once complete, so a cached file
+    is always whole. A ".part" file is locked while it is downloaded, so
+    concurrent runs missing the same file download it once. The index of
+    the cached files is a JSON file, updated under a lock file.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, quota=DEFAULT_CACHE_QUOTA,
+                 max_age=DEFAULT_MAX_AGE):
+        self.cache_dir = cache_dir
+        self.quota = quota
+        self.max_age = max_age
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.lock_path = os.path.join(cache_dir, "index.lock")
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _load(self):
+        try:
+            with open(self.index_path) as fin:
+                return json.load(fin)
+        except (IOError, ValueError):
+            return {}
+
+    def _save(self, index):
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+        with os.fdopen(fd, "w") as fout:
+            json.dump(index, fout, indent=1, sort_keys=True)
+        os.rename(tmp_path, self.index_path)
+
+    @contextmanager
+    def _locked(self):
+        """Holds the index for a read-modify-write, also against other runs."""
+
+        with self._lock:
+            with open(self.lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                yield
+
+    def _hit(self, index, key):
+        entry = index.get(key)
+        if entry is None or not os.path.isfile(self._path(key)):
+            index.pop(key, None)
+            return None
+
+        entry["atime"] = time.time()
+        return self._path(key)
+
+    def lookup(self, url, stat=None):
+        """
+        Returns the path of the cached file, None if it is not cached.
+
+        Without the (size, mtime) of the remote file, only a file checked
+        against the server within max_age seconds is returned.
+        """
+
+        if not os.path.isdir(self.cache_dir):
+            return None
+
+        with self._locked():
+            index = self._load()
+            entries = len(index)
+
+            if stat is None:
+                fresh = [(entry["validated"], key) for key, entry in index.items()
+                         if entry["url"] == url and
+                         time.time() - entry["validated"] < self.max_age]
+                path = self._hit(index, max(fresh)[1]) if fresh else None
+            else:
+                key = cache_key(url, *stat)
+                path = self._hit(index, key)
+                if path:
+                    index[key]["validated"] = time.time()
+
+            # Only written when an entry was used or dropped
+            if path or len(index) != entries:
+                self._save(index)
+
+        if path:
+            logging.debug("FTP cache hit for {}".format(url))
+        return path
+
+    def download(self, ftp, url, remote_path, stat, blocksize=DEFAULT_BLOCKSIZE,
+                 hasher=None):
+        """
+        Downloads the file of a cache miss, hashing it with hasher as it is
+        received.
+
+        Returns the path of the cached file and the FtpTransfer.TransferStats,
+        None for the stats if another run downloaded the file meanwhile.
+        """
+
+        size, mtime = stat
+        key = cache_key(url, size, mtime)
+        part_path = self._path(key) + ".part"
+
+        with self._lock:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+
+        # Not preallocated, the size of a ".part" file is where it resumes
+        with open(part_path, "ab") as fout:
+            # Waits for another run downloading the same file
+            fcntl.flock(fout, fcntl.LOCK_EX)
+
+            if os.path.isfile(self._path(key)):
+                logging.debug("FTP cache file {} downloaded by another run".format(url))
+                stats = None
+                self._remove_part(part_path)
+            else:
+                fout.seek(0, os.SEEK_END)
+                offset = fout.tell()
+                if offset > size:
+                    fout.truncate(0)
+                    offset = 0
+
+                logging.debug("FTP cache miss for {}, downloading from {}".format(url, offset))
+
+                stats = retrieve(ftp, remote_path, fout, blocksize, rest=offset or None,
+                                 hasher=hasher)
+                fout.flush()
+
+                if os.path.getsize(part_path) != size:
+                    raise ValueError("Incomplete download of {}: {} of {} bytes".format(
+                            url, os.path.getsize(part_path), size))
+
+                # Renamed while locked, so a waiting run finds the complete file
+                os.rename(part_path, self._path(key))
+
+        with self._locked():
+            index = self._load()
+            now = time.time()
+            index[key] = {"url": url, "size": size, "mtime": mtime,
+                          "atime": now, "validated": now}
+            self._evict(index, keep=key)
+            self._save(index)
+
+        return self._path(key), stats
+
+    def _remove_part(self, part_path):
+        try:
+            os.remove(part_path)
+        except OSError as e:
+            # Removed by another run waiting on the same file
+            if e.errno != errno.ENOENT:
+                raise
+
+    def _evict(self, index, keep):
+        """
+        Removes the stale ".part" files, then the least recently used files
+        over the quota. The ".part" files being resumed count in the quota.
+        """
+
+        total = sum(entry["size"] for entry in index.values()) + self._sweep_parts()
+
+        for key in sorted(index, key=lambda key: index[key]["atime"]):
+            if total <= self.quota:
+                break
+            if key == keep:
+                continue
+
+            logging.debug("FTP cache evicting {}".format(index[key]["url"]))
+            total -= index.pop(key)["size"]
+            if os.path.isfile(self._path(key)):
+                os.remove(self._path(key))
+
+    def _sweep_parts(self, max_age=PART_MAX_AGE):
+        """Removes the unlocked ".part" files older than max_age. Returns the size of the rest."""
+
+        total = 0
+
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".part"):
+                continue
+
+            path = os.path.join(self.cache_dir, name)
+            try:
+                # Not created again if it was just renamed
+                with os.fdopen(os.open(path, os.O_WRONLY | os.O_APPEND), "ab") as part:
+                    try:
+                        fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except IOError as e:
+                        if e.errno not in (errno.EAGAIN, errno.EACCES):
+                            raise
+                        # Being downloaded
+                        total += os.fstat(part.fileno()).st_size
+                        continue
+
+                    info = os.fstat(part.fileno())
+                    if time.time() - info.st_mtime > max_age:
+                        logging.debug("FTP cache removing stale {}".format(name))
+                        os.remove(path)
+                    else:
+                        total += info.st_size
+            except OSError as e:
+                # Renamed or removed by another run meanwhile
+                if e.errno != errno.ENOENT:
+                    raise
+
+        return total
+
+    def clear(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        with self._locked():
+            for name in os.listdir(self.cache_dir):
+                # Other runs may be waiting on it
+                if name != os.path.basename(self.lock_path):
+                    os.remove(os.path.join(self.cache_dir, name))
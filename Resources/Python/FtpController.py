@@ -3,10 +3,159 @@ import logging
 import hashlib
 import urlparse
 import os
+import json
+import socket
+import threading
+import atexit
+import time
+from multiprocessing.pool import ThreadPool
+from FtpCache import FtpCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_QUOTA, link_or_copy
+from FtpSessionPool import FtpSessionPool, is_session_lost
+from FtpTransfer import retrieve, store, DEFAULT_BLOCKSIZE
+
+
+# Sidecar manifest of the MD5s of the files on the FTP servers
+DEFAULT_MD5_MANIFEST = os.path.join(os.path.expanduser("~"), ".ftp_md5_manifest.json")
+
+
+class Md5Manifest(object):
+    """
+    MD5s of FTP files, keyed by URL and valid for the size and modification
+    time they were computed for.
+
+    The manifest is a JSON file, rewritten atomically so that concurrent
+    test runs sharing it never read a partial file.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+
+    def _load(self):
+        try:
+            with open(self.path) as fin:
+                return json.load(fin)
+        except (IOError, ValueError):
+            return {}
+
+    def get(self, url, size, mtime):
+        entry = self._load().get(url)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            return entry["md5"]
+        return None
+
+    def set(self, url, size, mtime, md5):
+        with self._lock:
+            # Entries added by other runs since are kept
+            entries = self._load()
+            entries[url] = {"size": size, "mtime": mtime, "md5": md5}
+
+            tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+            with open(tmp_path, "w") as fout:
+                json.dump(entries, fout, indent=1, sort_keys=True)
+            os.rename(tmp_path, self.path)
+
+
+def _file_url(site, remote_path, user):
+    """The URL of a file as stored in the manifest and cache, without the password."""
+    return "ftp://{}{}{}".format(user + "@" if user else "", site, remote_path)
+
+
+# Files transferred at the same time by the parallel keywords, each on its
+# own FTP session
+DEFAULT_TRANSFER_WORKERS = 4
+
+# Logged-in sessions are shared by all FtpController instances, as Robot
+# creates a new library instance for every test case
+_ftp_pool = FtpSessionPool()
+atexit.register(_ftp_pool.close_all)
 
 
 class FtpController(object):
 
+    def __init__(self, md5_manifest=DEFAULT_MD5_MANIFEST, cache_dir=DEFAULT_CACHE_DIR,
+                 cache_quota=DEFAULT_CACHE_QUOTA, blocksize=DEFAULT_BLOCKSIZE):
+        # None to always hash the file
+        self.md5_manifest = Md5Manifest(md5_manifest) if md5_manifest else None
+        # None to always download the files
+        self.cache = FtpCache(cache_dir, int(cache_quota)) if cache_dir else None
+        self.blocksize = int(blocksize)
+        # See FtpTransfer.TransferStats.as_dict()
+        self.last_transfer_stats = None
+
+    def set_ftp_blocksize(self, blocksize):
+        """Set the bytes moved per socket call by the transfers."""
+        self.blocksize = int(blocksize)
+
+    def get_last_transfer_stats(self):
+        """
+        Return the bytes, elapsed, time_to_first_byte and bytes_per_sec of
+        the last file transferred, None if it came from the cache.
+        """
+        return self.last_transfer_stats
+
+    def clear_ftp_cache(self):
+        """Remove the files downloaded to the local cache."""
+        if self.cache:
+            self.cache.clear()
+
+    def _download(self, ftp, site, remote_path, output_filename, user=None):
+        """
+        Download a file, through the cache unless its MDTM is unknown.
+
+        The MD5 of a file downloaded whole is computed as it is received and
+        added to the manifest, so get_ftp_md5() does not download it again.
+        """
+
+        url = _file_url(site, remote_path, user)
+        stat = self._get_ftp_stat(ftp, remote_path) if self.cache or self.md5_manifest else None
+        hasher = hashlib.md5() if stat and self.md5_manifest else None
+        stats = None
+
+        if self.cache and stat:
+            cached = self.cache.lookup(url, stat)
+            if cached is None:
+                cached, stats = self.cache.download(ftp, url, remote_path, stat,
+                                                    self.blocksize, hasher)
+            link_or_copy(cached, output_filename)
+        else:
+            with open(output_filename, 'wb') as fout:
+                stats = retrieve(ftp, remote_path, fout, self.blocksize,
+                                 size=stat[0] if stat else None, hasher=hasher)
+
+        self.last_transfer_stats = stats.as_dict() if stats else None
+
+        if hasher and stats and not stats.offset:
+            self.md5_manifest.set(url, stat[0], stat[1], hasher.hexdigest())
+
+    def _run(self, site, user, password, operation, idempotent=True):
+        """
+        Returns operation(ftp) run on a pooled session.
+
+        The operation is run once more on a new session if the server dropped
+        the session, e.g. with "421 Timeout". An operation that is not
+        idempotent, like a delete or an upload, is only run again if the
+        session was found dropped by a NOOP before it started.
+        """
+
+        factory = lambda: self._create_ftp_connection(site, user, password)
+        started = False
+
+        try:
+            with _ftp_pool.session(site, user, password, factory) as ftp:
+                if not idempotent:
+                    ftp.voidcmd("NOOP")
+                    started = True
+                return operation(ftp)
+        except (ftplib.Error, EOFError, socket.error) as e:
+            if started or not is_session_lost(e):
+                raise
+            logging.debug("FTP session to {} lost, reconnecting: {}".format(site, e))
+
+        with _ftp_pool.session(site, user, password, factory) as ftp:
+            return operation(ftp)
+
     def _create_ftp_connection(self, site, user, password):
         """Returns an instance of FTP."""
 
@@ -29,21 +178,47 @@ class FtpController(object):
                 parser.username,
                 parser.password)
 
+    def _get_ftp_stat(self, ftp, remote_path):
+        """Returns the (size, modification time) of a file, None if unknown."""
+
+        try:
+            ftp.voidcmd("TYPE I")
+            size = ftp.size(remote_path)
+            # "213 20170302101500"
+            mtime = ftp.sendcmd("MDTM {:s}".format(remote_path)).split()[-1]
+        except ftplib.error_perm as e:
+            logging.debug("No size or modification time for {}: {}".format(remote_path, e))
+            return None
+
+        return size, mtime
+
     def _get_ftp_md5(self, site, remote_path, user=None, password=None):
+        return self._run(site, user, password,
+                         lambda ftp: self._md5(ftp, site, remote_path, user))
+
+    def _md5(self, ftp, site, remote_path, user):
+
+        url = _file_url(site, remote_path, user)
+        stat = self._get_ftp_stat(ftp, remote_path) if self.md5_manifest else None
 
-        ftp = self._create_ftp_connection(site, user, password)
+        if stat:
+            md5 = self.md5_manifest.get(url, *stat)
+            if md5:
+                logging.debug("MD5 of {} from the manifest: {}".format(url, md5))
+                return md5
 
         logging.debug("Hashing firmware...")
         m = hashlib.md5()
 
         logging.debug("Retrieve firmware...")
-        ftp.retrbinary("RETR {:s}".format(remote_path), m.update)
-
-        logging.debug("Close FTP connection...")
-        ftp.quit()
+        stats = retrieve(ftp, remote_path, None, self.blocksize, hasher=m)
+        self.last_transfer_stats = stats.as_dict()
 
         logging.debug("Returning digest...")
 
+        if stat:
+            self.md5_manifest.set(url, stat[0], stat[1], m.hexdigest())
+
         return m.hexdigest()
 
     def list_ftp_files(self, ftp_url):
@@ -58,19 +233,16 @@ class FtpController(object):
 
     def _list_ftp_files(self, site, remote_path, user=None, password=None):
 
-        ftp = self._create_ftp_connection(site, user, password)
-
         logging.debug("Retrieve file listing...")
-        file_list = ftp.nlst(remote_path)
-
-        ftp.quit()
-
-        return file_list
+        return self._run(site, user, password, lambda ftp: ftp.nlst(remote_path))
 
     def get_ftp_file(self, ftp_url, output_dir):
         """
         Get a file at the FTP URL.
 
+        A file from the cache is hard linked to it when possible, it should
+        be replaced rather than modified in place.
+
         Returns the path of the downloaded file.
         """
 
@@ -90,20 +262,21 @@ class FtpController(object):
             user=None,
             password=None):
 
-        ftp = self._create_ftp_connection(site, user, password)
-
         output_filename = os.path.join(
                 output_dir,
                 os.path.basename(remote_path))
 
         logging.debug("Output filename: '{:s}'".format(output_filename))
 
-        command = "RETR {:s}".format(remote_path)
+        # Checked against the server recently, no need to connect
+        cached = self.cache.lookup(_file_url(site, remote_path, user)) if self.cache else None
+        if cached:
+            link_or_copy(cached, output_filename)
+            self.last_transfer_stats = None
+            return output_filename
 
-        with open(output_filename, 'wb') as fout:
-            ftp.retrbinary(command, fout.write)
-
-        ftp.quit()
+        self._run(site, user, password,
+                  lambda ftp: self._download(ftp, site, remote_path, output_filename, user))
 
         return output_filename
 
@@ -130,27 +303,152 @@ class FtpController(object):
             user=None,
             password=None):
 
-        dl_file_list = []
-        ftp = self._create_ftp_connection(site, user, password)
+        def operation(ftp):
+            dl_file_list = []
 
-        logging.debug("Retrieve file listing for {:s}".format(remote_path))
-        file_list = ftp.nlst(remote_path)
-        logging.debug("File listing: {:s}".format(file_list))
+            logging.debug("Retrieve file listing for {:s}".format(remote_path))
+            file_list = ftp.nlst(remote_path)
+            logging.debug("File listing: {}".format(file_list))
 
-        for filename in file_list:
-            logging.debug("Downloading {:s}".format(filename))
-            output_filename = os.path.join(
-                    output_dir,
-                    os.path.basename(filename))
-            command = "RETR {:s}".format(filename)
-            with open(output_filename, 'wb') as fout:
-                ftp.retrbinary(command, fout.write)
+            for filename in file_list:
+                logging.debug("Downloading {:s}".format(filename))
+                output_filename = os.path.join(
+                        output_dir,
+                        os.path.basename(filename))
+                self._download(ftp, site, filename, output_filename, user)
+
+                dl_file_list.append(output_filename)
+
+            return dl_file_list
+
+        return self._run(site, user, password, operation)
+
+    def get_ftp_files_parallel(self, ftp_url, output_dir,
+                               max_workers=DEFAULT_TRANSFER_WORKERS):
+        """
+        Get multiple files at the FTP URL, several at a time. Supports wildcard.
+
+        A failed file does not stop the others. Returns a dictionary:
+            files: the result of each file, in listing order, see _transfer()
+            done: number of files downloaded
+            failed: number of files that failed
+            bytes: bytes downloaded
+            elapsed: seconds taken
+        """
+
+        parser = urlparse.urlsplit(ftp_url)
+        site, user, password = parser.hostname, parser.username, parser.password
+
+        def download(ftp, filename):
+            output_filename = os.path.join(output_dir, os.path.basename(filename))
+            try:
+                self._download(ftp, site, filename, output_filename, user)
+            except:
+                # No partial file is left for a failed download
+                if os.path.isfile(output_filename):
+                    os.remove(output_filename)
+                raise
+            return output_filename, os.path.getsize(output_filename)
+
+        return self._transfer_all(site, user, password, parser.path, download,
+                                  int(max_workers))
+
+    def delete_ftp_files_parallel(self, ftp_url, max_workers=DEFAULT_TRANSFER_WORKERS):
+        """
+        Delete files at the FTP URL, several at a time. Wildcards are supported.
+
+        Returns the same dictionary as get_ftp_files_parallel().
+        """
+
+        parser = urlparse.urlsplit(ftp_url)
+
+        def delete(ftp, filename):
+            ftp.delete(filename)
+            return None, 0
 
-            dl_file_list.append(output_filename)
+        return self._transfer_all(parser.hostname, parser.username, parser.password,
+                                  parser.path, delete, int(max_workers), idempotent=False)
 
-        ftp.quit()
+    def _transfer_all(self, site, user, password, remote_path, transfer, max_workers,
+                      idempotent=True):
 
-        return dl_file_list
+        start_time = time.time()
+
+        logging.debug("Retrieve file listing for {:s}".format(remote_path))
+        file_list = self._run(site, user, password, lambda ftp: ftp.nlst(remote_path))
+
+        progress = {"count": 0, "lock": threading.Lock()}
+
+        def run(filename):
+            result = self._transfer(site, user, password, filename, transfer, idempotent)
+
+            with progress["lock"]:
+                progress["count"] += 1
+                count = progress["count"]
+
+            if result["error"]:
+                logging.info("[{}/{}] {} failed: {}".format(
+                        count, len(file_list), filename, result["error"]))
+            else:
+                logging.info("[{}/{}] {} done in {:.2f}s ({:.0f} bytes/s)".format(
+                        count, len(file_list), filename, result["elapsed"],
+                        result["bytes_per_sec"]))
+            return result
+
+        results = []
+        if file_list:
+            pool = ThreadPool(max(1, min(max_workers, len(file_list))))
+            try:
+                results = pool.map(run, file_list)
+            finally:
+                pool.close()
+                pool.join()
+
+        failed = len([result for result in results if result["error"]])
+
+        return {
+            "files": results,
+            "done": len(results) - failed,
+            "failed": failed,
+            "bytes": sum(result["bytes"] for result in results),
+            "elapsed": time.time() - start_time,
+        }
+
+    def _transfer(self, site, user, password, filename, transfer, idempotent=True):
+        """
+        Runs transfer(ftp, filename) on a pooled session, see _run().
+
+        Returns a dictionary:
+            remote: the remote file
+            local: the local file, None for a delete
+            bytes: bytes transferred
+            elapsed: seconds taken
+            bytes_per_sec: throughput of the file
+            error: the error, None if the transfer succeeded
+        """
+
+        result = {
+            "remote": filename,
+            "local": None,
+            "bytes": 0,
+            "elapsed": 0.0,
+            "bytes_per_sec": 0.0,
+            "error": None,
+        }
+
+        start_time = time.time()
+        try:
+            result["local"], result["bytes"] = self._run(
+                    site, user, password, lambda ftp: transfer(ftp, filename), idempotent)
+        except (ftplib.Error, EOFError, socket.error, IOError, OSError, ValueError) as e:
+            result["error"] = "{}: {}".format(type(e).__name__, e)
+        finally:
+            result["elapsed"] = time.time() - start_time
+
+        if result["elapsed"] > 0:
+            result["bytes_per_sec"] = result["bytes"] / result["elapsed"]
+
+        return result
 
     def send_ftp_file(self, local_path, ftp_url):
         """
@@ -175,8 +473,6 @@ class FtpController(object):
             user=None,
             password=None):
 
-        ftp = self._create_ftp_connection(site, user, password)
-
         if os.path.isabs(local_filename):
             src_filepath = local_filename
         else:
@@ -184,12 +480,12 @@ class FtpController(object):
 
         logging.debug("Uploading '{:s}' to '{:s}'".format(src_filepath, remote_path))
 
-        command = "STOR {:s}".format(remote_path)
-
-        with open(src_filepath, 'rb') as fout:
-            ftp.storbinary(command, fout)
+        def operation(ftp):
+            with open(src_filepath, 'rb') as fin:
+                return store(ftp, remote_path, fin, self.blocksize)
 
-        ftp.quit()
+        self.last_transfer_stats = self._run(site, user, password, operation,
+                                             idempotent=False).as_dict()
 
         return remote_path
 
@@ -211,15 +507,14 @@ class FtpController(object):
 
     def _delete_ftp_files(self, site, remote_path, user=None, password=None):
 
-        ftp = self._create_ftp_connection(site, user, password)
+        def operation(ftp):
+            logging.debug("Retrieve file listing for {:s}...".format(remote_path))
+            file_list = ftp.nlst(remote_path)
 
-        logging.debug("Retrieve file listing for {:s}...".format(remote_path))
-        file_list = ftp.nlst(remote_path)
-
-        for filename in file_list:
-            logging.debug("Deleting {:s}".format(filename))
-            ftp.delete(filename)
+            for filename in file_list:
+                logging.debug("Deleting {:s}".format(filename))
+                ftp.delete(filename)
 
-        ftp.quit()
+            return file_list
 
-        return file_list
+        return self._run(site, user, password, operation, idempotent=False)
@@ -1,6 +1,7 @@
 import ftplib
 import os
 import logging
+from FtpTransfer import retrieve, DEFAULT_BLOCKSIZE
 
 
 class FtpLib(object):
@@ -86,15 +87,24 @@ class FtpLib(object):
                 logging.info("Deleting {:s}".format(filename))
                 self.delete(filename)
 
-    def ftp_binary_get(self, filename, output_dir='.'):
-        """Retrieve a binary file."""
+    def ftp_binary_get(self, filename, output_dir='.', blocksize=DEFAULT_BLOCKSIZE):
+        """
+        Retrieve a binary file.
+
+        Returns the bytes, elapsed, time_to_first_byte and bytes_per_sec of
+        the transfer.
+        """
 
-        command = "RETR {:s}".format(filename)
-        logging.debug("FTP command: {:s}".format(command))
+        logging.debug("FTP command: RETR {:s}".format(filename))
 
         output_filename = os.path.join(output_dir, filename)
         logging.debug("Output filename: '{:s}'".format(output_filename))
 
         with open(output_filename, 'wb') as fout:
-            self.ftp.retrbinary(command, fout.write)
+            stats = retrieve(self.ftp, filename, fout, int(blocksize))
+
+        logging.info("Retrieved {:d} bytes at {:.0f} bytes/s".format(
+                stats.bytes, stats.bytes_per_sec))
+
+        return stats.as_dict()
 
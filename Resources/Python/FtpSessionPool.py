@@ -0,0 +1,54 @@
+import ftplib
+import socket
+import logging
+from contextlib import contextmanager
+from IdlePool import IdlePool
+
+
+def is_session_lost(error):
+    """Whether an FTP error means the server dropped the session."""
+
+    if isinstance(error, ftplib.error_temp):
+        # "421 Timeout." / "421 Service not available, closing control connection."
+        return str(error).startswith("421")
+    return isinstance(error, (EOFError, socket.error))
+
+
+class FtpSessionPool(IdlePool):
+    """Keeps logged-in FTP sessions open for reuse, per (host, user)."""
+
+    # FTP servers commonly drop idle sessions after 300s
+    DEFAULT_IDLE_TIMEOUT = 120
+    # Sessions idle for longer than this are sent a NOOP before reuse
+    NOOP_INTERVAL = 5
+
+    @contextmanager
+    def session(self, host, user, password, factory):
+        """
+        Returns a session for the duration of the with block.
+
+        A new session is created with factory() if there is no idle session
+        still answering NOOP. A session is only used by one thread at a time,
+        and is closed instead of being reused if an error occurred.
+        """
+
+        with self.borrow((host, user, password), factory) as ftp:
+            yield ftp
+
+    def _validate(self, ftp, idle_time):
+        if idle_time <= self.NOOP_INTERVAL:
+            return True
+
+        try:
+            ftp.voidcmd("NOOP")
+            return True
+        except (ftplib.Error, EOFError, socket.error) as e:
+            logging.debug("FTP session lost: {}".format(e))
+            return False
+
+    def _close(self, ftp):
+        try:
+            ftp.quit()
+        except (ftplib.Error, EOFError, socket.error) as e:
+            logging.debug("Error closing FTP session: {}".format(e))
+            ftp.close()
@@ -0,0 +1,131 @@
+import time
+
+
+# Bytes moved per socket call, ftplib's default is 8KB
+DEFAULT_BLOCKSIZE = 1024 * 1024
+
+
+class TransferStats(object):
+    """Timings of a file transfer."""
+
+    def __init__(self, offset=0):
+        # Bytes already there when a download was resumed
+        self.offset = offset
+        self.bytes = 0
+        self.start_time = time.time()
+        self.first_byte_time = None
+        self.end_time = None
+
+    def block(self, size):
+        if self.first_byte_time is None:
+            self.first_byte_time = time.time()
+        self.bytes += size
+
+    def done(self):
+        self.end_time = time.time()
+
+    @property
+    def elapsed(self):
+        return (self.end_time or time.time()) - self.start_time
+
+    @property
+    def time_to_first_byte(self):
+        """Seconds from the command to the first byte, None if nothing was moved."""
+        if self.first_byte_time is None:
+            return None
+        return self.first_byte_time - self.start_time
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            "bytes": self.bytes,
+            "offset": self.offset,
+            "elapsed": self.elapsed,
+            "time_to_first_byte": self.time_to_first_byte,
+            "bytes_per_sec": self.bytes_per_sec,
+        }
+
+
+def retrieve(ftp, remote_path, fout=None, blocksize=DEFAULT_BLOCKSIZE, rest=None,
+             size=None, hasher=None):
+    """
+    Download a file, like ftplib's retrbinary() but with larger blocks.
+
+    The blocks are received into one reused buffer and written to fout,
+    and hashed with hasher while they are in memory. fout is None when
+    only the hash is needed. The file is preallocated to size, if given.
+
+    Returns the TransferStats.
+    """
+
+    stats = TransferStats(rest or 0)
+    buf = bytearray(blocksize)
+
+    ftp.voidcmd("TYPE I")
+
+    if fout is not None and size:
+        # One resize instead of growing the file with every block
+        fout.truncate(size)
+        fout.seek(rest or 0)
+
+    try:
+        conn = ftp.transfercmd("RETR {:s}".format(remote_path), rest)
+        try:
+            while True:
+                n = conn.recv_into(buf)
+                if not n:
+                    break
+
+                stats.block(n)
+                data = buffer(buf, 0, n)
+                if fout is not None:
+                    fout.write(data)
+                if hasher is not None:
+                    hasher.update(data)
+        finally:
+            conn.close()
+
+        ftp.voidresp()
+    finally:
+        if fout is not None and size and stats.offset + stats.bytes < size:
+            # Not left looking like a complete file, also when it failed
+            fout.truncate(stats.offset + stats.bytes)
+
+    stats.done()
+
+    return stats
+
+
+def store(ftp, remote_path, fin, blocksize=DEFAULT_BLOCKSIZE, hasher=None):
+    """
+    Upload a file, like ftplib's storbinary() but with larger blocks read
+    into one reused buffer. Returns the TransferStats.
+    """
+
+    stats = TransferStats()
+    buf = bytearray(blocksize)
+
+    ftp.voidcmd("TYPE I")
+
+    conn = ftp.transfercmd("STOR {:s}".format(remote_path))
+    try:
+        while True:
+            n = fin.readinto(buf)
+            if not n:
+                break
+
+            data = buffer(buf, 0, n)
+            conn.sendall(data)
+            stats.block(n)
+            if hasher is not None:
+                hasher.update(data)
+    finally:
+        conn.close()
+
+    ftp.voidresp()
+    stats.done()
+
+    return stats
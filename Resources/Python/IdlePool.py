@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+class IdlePool(object):
+    """
+    Keeps idle sessions open for reuse, per key.
+
+    Subclasses check a session with _validate() before it is reused and
+    close it with _close(). The first item of a key is the host, for logging.
+    """
+
+    # Idle sessions are closed after this long, in seconds
+    DEFAULT_IDLE_TIMEOUT = 60
+
+    def __init__(self, idle_timeout=None):
+        if idle_timeout is None:
+            idle_timeout = self.DEFAULT_IDLE_TIMEOUT
+        self.idle_timeout = idle_timeout
+        self._idle = {}     # key -> list of (session, last used time)
+        self._lock = threading.Lock()
+
+    def acquire(self, key, factory):
+        """
+        Returns an idle session for the key.
+
+        A new session is created with factory() if there is no idle session
+        passing _validate().
+        """
+
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key)
+                if not sessions:
+                    break
+                session, last_used = sessions.pop()
+
+            idle_time = time.time() - last_used
+            if idle_time > self.idle_timeout:
+                logging.debug("Pooled session to {} expired".format(key[0]))
+            elif self._validate(session, idle_time):
+                logging.debug("Reusing pooled session to {}".format(key[0]))
+                return session
+            self._close(session)
+
+        return factory()
+
+    def release(self, key, session):
+        """Returns a session back to the pool."""
+
+        with self._lock:
+            self._idle.setdefault(key, []).append((session, time.time()))
+
+        self._evict_expired()
+
+    @contextmanager
+    def borrow(self, key, factory):
+        """
+        Returns a session for the duration of the with block.
+
+        A session is only used by one thread at a time, and is closed
+        instead of being reused if an error occurred.
+        """
+
+        session = self.acquire(key, factory)
+
+        try:
+            yield session
+        except:
+            self._close(session)
+            raise
+
+        self.release(key, session)
+
+    def close_all(self):
+        """Close every idle session."""
+        self._evict()
+
+    def _evict(self, match=None):
+        """Close the idle sessions of the keys match(key) is true for, all if None."""
+
+        evicted = []
+
+        with self._lock:
+            for key in list(self._idle):
+                if match is None or match(key):
+                    evicted.extend(session for session, _ in self._idle.pop(key))
+
+        for session in evicted:
+            self._close(session)
+
+    def _evict_expired(self):
+
+        expired = []
+        now = time.time()
+
+        with self._lock:
+            for key, sessions in list(self._idle.items()):
+                alive = [(session, last_used) for session, last_used in sessions
+                         if now - last_used <= self.idle_timeout]
+                expired.extend(session for session, last_used in sessions
+                               if now - last_used > self.idle_timeout)
+                if alive:
+                    self._idle[key] = alive
+                else:
+                    del self._idle[key]
+
+        for session in expired:
+            self._close(session)
+
+    def _validate(self, session, idle_time):
+        """Whether a session idle for idle_time seconds can be reused."""
+        raise NotImplementedError()
+
+    def _close(self, session):
+        raise NotImplementedError()
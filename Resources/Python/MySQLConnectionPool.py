@@ -0,0 +1,58 @@
+import logging
+import MySQLdb
+from contextlib import contextmanager
+from IdlePool import IdlePool
+
+
+class MySQLConnectionPool(IdlePool):
+    """Keeps MySQL connections open for reuse, per (host, db, user)."""
+
+    # Idle connections are closed after this long, in seconds
+    DEFAULT_IDLE_TIMEOUT = 300
+    # Connections idle for longer than this are pinged before reuse
+    PING_INTERVAL = 5
+
+    @contextmanager
+    def connection(self, host, user, passwd, db, port=3306):
+        """
+        Returns a connection for the duration of the with block.
+
+        A connection is only used by one thread at a time. It is closed
+        instead of being reused if an error occurred.
+        """
+
+        key = (host, port, db, user, passwd)
+
+        with self.borrow(key, lambda: self._connect(key)) as conn:
+            yield conn
+
+    def _connect(self, key):
+        host, port, db, user, passwd = key
+        logging.debug("Connecting to database {} at {}:{}".format(db, host, port))
+        conn = MySQLdb.connect(host=host,
+                               user=user,
+                               passwd=passwd,
+                               db=db,
+                               port=port)
+        # Without autocommit, a reused connection keeps reading the snapshot
+        # of its first query and never sees new log records
+        conn.autocommit(True)
+
+        return conn
+
+    def _validate(self, conn, idle_time):
+        if idle_time <= self.PING_INTERVAL:
+            return True
+
+        try:
+            conn.ping()
+            return True
+        except MySQLdb.Error as e:
+            logging.debug("Database connection lost: {}".format(e))
+            return False
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except MySQLdb.Error as e:
+            logging.debug("Error closing database connection: {}".format(e))
@@ -0,0 +1,29 @@
+"""Fake FTP connections shared by the FTP tests."""
+
+
+class DataConnection(object):
+    """A fake FTP data connection sending data a few bytes at a time."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def recv_into(self, buf):
+        n = min(len(buf), len(self.data), 4)
+        buf[:n] = self.data[:n]
+        self.data = self.data[n:]
+        return n
+
+    def close(self):
+        pass
+
+
+def serve(files):
+    """A fake FTP transfercmd() sending the files from the REST offset."""
+
+    def transfercmd(cmd, rest=None):
+        data = files[cmd.split(" ", 1)[1]]
+        if isinstance(data, Exception):
+            raise data
+        return DataConnection(data[rest or 0:])
+
+    return transfercmd
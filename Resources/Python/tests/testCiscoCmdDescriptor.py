@@ -0,0 +1,63 @@
+import unittest
+from CiscoCmdDescriptor import CiscoCmdDescriptor
+from CiscoCriteria import CriteriaEvaluator, strip_match_any
+
+
+class TestStripMatchAny(unittest.TestCase):
+
+    def test_strip(self):
+        self.assertEqual(strip_match_any("[\s\S]*by admin[\s\S]*"), ("by admin", False))
+        self.assertEqual(strip_match_any("Last[\s\S]*$"), ("Last", True))
+        self.assertEqual(strip_match_any("a|[\s\S]*b"), ("a|[\s\S]*b", True))
+
+    def test_strip_match_any_lazy(self):
+        self.assertEqual(strip_match_any("[\s\S]*?foo"), ("[\s\S]*?foo", True))
+        self.assertEqual(strip_match_any("[\s\S]*{2}foo"), ("[\s\S]*{2}foo", True))
+        self.assertEqual(strip_match_any("[\s\S]*foo[\s\S]*?"), ("foo[\s\S]*?", False))
+        CriteriaEvaluator([], [], [], [], ["[\s\S]*?foo"], None)
+
+
+class TestCiscoCmdDescriptor(unittest.TestCase):
+
+    def setUp(self):
+        self.output = ("Building configuration...\r\n\r\n"
+                       "! Last configuration change at 10:01:02 UTC Mon Mar 1 2018 by admin\r\n"
+                       "hostname router\r\n"
+                       "end")
+
+    def test_criteria_met(self):
+        test_cmd = CiscoCmdDescriptor("show run")
+        test_cmd.add_criteria(should_contain="hostname router",
+                              should_not_contain="No configuration change",
+                              should_begin_with="Building",
+                              should_end_with="end",
+                              should_match_regex="[\s\S]*Last configuration change at [a-zA-Z0-9 :]{17,} by admin[\s\S]*",
+                              should_be_empty=False)
+        self.assertEqual(test_cmd.parse_cmd_output(self.output), "")
+
+    def test_criteria_failed(self):
+        test_cmd = CiscoCmdDescriptor("show run")
+        test_cmd.add_criteria(should_contain="hostname switch",
+                              should_not_contain="hostname router",
+                              should_begin_with="hostname",
+                              should_match_regex="hostname")
+
+        errmsg = test_cmd.parse_cmd_output(self.output)
+        self.assertIn("Output does not contain[hostname switch]", errmsg)
+        self.assertIn("Output contains[hostname router]", errmsg)
+        self.assertIn("Output does not begin with [hostname]", errmsg)
+        self.assertIn("Output does not match regex [hostname]", errmsg)
+
+    def test_empty_output(self):
+        test_cmd = CiscoCmdDescriptor("show alignment")
+        test_cmd.add_criteria(should_contain="No alignment data")
+
+        self.assertEqual(test_cmd.parse_cmd_output(" \r\n"),
+                         "\t-> Output should contain[No alignment data]\n")
+
+    def test_criteria_added_after_compile(self):
+        test_cmd = CiscoCmdDescriptor("show run")
+        self.assertEqual(test_cmd.parse_cmd_output(self.output), "")
+
+        test_cmd.should_contain("hostname switch")
+        self.assertNotEqual(test_cmd.parse_cmd_output(self.output), "")
@@ -0,0 +1,66 @@
+import unittest
+from CiscoConfigProfiles import (PLANS, PROFILES, CommandPlan, Fragment, FRAGMENTS,
+                                 get_plan, profile_name, validate_plan, hook, block)
+
+
+PARAMS = {"username": "tester",
+          "syslog_ip": "10.0.0.1",
+          "tacacs_ip": "10.0.0.2",
+          "tacacs_pass": "password",
+          "remote_commands": ["access-list 1 permit any"]}
+
+
+class TestProfiles(unittest.TestCase):
+
+    def test_all_profiles_valid(self):
+        self.assertEqual(len(PLANS), 15)
+        for name, plan in PLANS.items():
+            self.assertEqual(validate_plan(plan), [], name)
+
+    def test_validate_problems(self):
+        FRAGMENTS["bad"] = Fragment([hook("reboot"), block("logging {syslog}")], [])
+        try:
+            problems = validate_plan(CommandPlan("CONF_BAD", ("enter", "bad")))
+        finally:
+            del FRAGMENTS["bad"]
+
+        self.assertEqual(problems, ["unknown hook [reboot]",
+                                    "unknown parameter [syslog] in [logging {syslog}]"])
+
+    def test_unknown_profile(self):
+        self.assertRaises(ValueError, get_plan, "CONF_LOCAL_UIDPASS")
+
+    def test_profile_name(self):
+        self.assertEqual(profile_name("local", "PASSONLY", 0), "CONF_LOCAL_PASS_USR")
+        self.assertEqual(profile_name("remote", "LOGINLOCAL", 1), "CONF_REMOTE_UIDPASS_ADMIN")
+        self.assertIn(profile_name("local", "NOLOGIN", 1), PROFILES)
+
+    def test_commands(self):
+        cmds = get_plan("CONF_LOCAL_UIDPASS_ADMIN").commands(PARAMS)
+
+        self.assertEqual(cmds[:3], ["config terminal", "no username tester",
+                                    "username tester privilege 15 password 0 password"])
+        self.assertLess(cmds.index("no aaa new-model"), cmds.index("no password"))
+        self.assertEqual(get_plan("CONF_ACL").commands(PARAMS),
+                         ["config terminal", "access-list 1 permit any", "exit"])
+        self.assertIn("logging 10.0.0.1", get_plan("CONF_RESET").commands(PARAMS))
+
+    def test_state_overrides(self):
+        state = get_plan("CONF_LOCAL_PASS_USR").state(PARAMS)
+        vty = dict((item.line, item.present) for item in state
+                   if item.section == "line vty 0 4")
+
+        # "login" replaces the "login local" of the local authentication
+        self.assertFalse(vty["login local"])
+        self.assertTrue(vty["login"])
+        self.assertFalse(vty["privilege level 15"])
+        self.assertEqual(get_plan("CONF_RESET").state(PARAMS), ())
+
+    def test_render_cached(self):
+        plan = get_plan("CONF_REMOTE_UIDPASS_ADMIN")
+        self.assertIs(plan.steps(dict(PARAMS)), plan.steps(dict(PARAMS)))
+        self.assertIsNot(plan.steps(PARAMS), plan.steps(dict(PARAMS, username="other")))
+
+
+if __name__ == "__main__":
+    unittest.main()
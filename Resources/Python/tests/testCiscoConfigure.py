@@ -0,0 +1,231 @@
+import unittest
+from mock import MagicMock, patch
+from CiscoConfigure import CiscoConfigure
+
+
+class TestConfPushBlock(unittest.TestCase):
+
+    def setUp(self):
+        self.cconn = MagicMock()
+        self.cconn.hostname = "r1"
+        self.cconfig = CiscoConfigure(self.cconn, "A")
+        self.cconfig.bulk_pacing = 0
+
+    def test_errors_from_transcript(self):
+        self.cconn.before.return_value = (
+                "line vty 0 4\r\nr1(config-line)#"
+                "transport input telnot\r\n"
+                "                        ^\r\n"
+                "% Invalid input detected at '^' marker.\r\n\r\nr1(config-line)#"
+                "exit\r\nr1(config)#")
+
+        with self.assertRaises(ValueError):
+            self.cconfig.conf_push_block(["line vty 0 4", "transport input telnot", "exit"])
+
+        self.assertEqual(self.cconn.expect_any.call_count, 1)
+        self.assertEqual(self.cconn.sendline.call_args_list[-1][0][0], "!bulk-sync-1")
+        self.assertEqual(self.cconfig.conf_errors,
+                         [("transport input telnot", "% Invalid input detected at '^' marker.")])
+        self.assertEqual(self.cconfig.last_cli_shell, "r1(config)#")
+
+    def test_unattributed_error(self):
+        self.cconn.before.return_value = (
+                "logging 10.0.0.1\r\nr1(config)#"
+                "% Incomplete command.\r\n")
+
+        with self.assertRaises(ValueError):
+            self.cconfig.conf_push_block(["logging 10.0.0.1"])
+
+        self.assertEqual(self.cconfig.conf_errors, [("", "% Incomplete command.")])
+
+    def test_confirmation_prompt(self):
+        self.cconn.before.return_value = (
+                "no aaa new-model\r\nContinue? [confirm]"
+                "line vty 0 4\r\nr1(config)#")
+
+        with self.assertRaises(ValueError) as error:
+            self.cconfig.conf_push_block(["no aaa new-model", "line vty 0 4"])
+
+        self.assertIn("[no aaa new-model] Line asked for a confirmation", str(error.exception))
+
+    def test_authorization_failed(self):
+        self.cconn.before.side_effect = [
+                "aaa new-model\r\nr1(config)#"
+                "tacacs-server directed-request\r\nCommand authorization failed.\r\nr1(config)#"
+                "no username admin\r\nCommand authorization failed.\r\nr1(config)#",
+                "tacacs-server directed-request\r\nr1(config)#"
+                "no username admin\r\nr1(config)#"]
+
+        with patch.object(self.cconfig, "rerun_conf_mode_cmds") as rerun:
+            self.cconfig.conf_push_block(["aaa new-model",
+                                          "tacacs-server directed-request",
+                                          "no username admin"])
+
+        self.cconn.reconnect_and_login.assert_called_once_with()
+        rerun.assert_called_once_with()
+        self.assertEqual(self.cconn.sendline.call_args_list[-3][0][0], "tacacs-server directed-request")
+        self.assertEqual(self.cconfig.conf_errors, [])
+
+    def test_authorization_failed_again(self):
+        self.cconn.before.return_value = (
+                "no username admin\r\nCommand authorization failed.\r\nr1(config)#")
+
+        with patch.object(self.cconfig, "rerun_conf_mode_cmds"):
+            with self.assertRaises(ValueError):
+                self.cconfig.conf_push_block(["no username admin"])
+
+    def test_line_by_line(self):
+        self.cconfig.bulk = False
+        with patch.object(self.cconfig, "conf_sendline_expect") as conf_sendline_expect:
+            self.cconfig.conf_send_block(["a", "b"])
+
+        self.assertEqual(conf_sendline_expect.call_count, 2)
+
+
+RUNNING_CONFIG = """do show run\r
+Building configuration...\r
+\r
+Current configuration : 1234 bytes\r
+!\r
+hostname r1\r
+!\r
+aaa new-model\r
+aaa accounting exec default\r
+ action-type start-stop\r
+ group tacacs+\r
+!\r
+archive\r
+ log config\r
+  logging enable\r
+  hidekeys\r
+!\r
+line vty 0 4\r
+ password 7 0822455D0A16\r
+ transport input telnet\r
+line vty 5 15\r
+ transport input ssh\r
+!\r
+end\r
+\r
+"""
+
+
+class TestVerifyConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.cconn = MagicMock()
+        self.cconn.hostname = "r1"
+        self.cconn.expect_any.return_value = 0
+        self.cconn.before.return_value = RUNNING_CONFIG
+        self.cconn.after.return_value = "r1(config)#"
+        self.cconfig = CiscoConfigure(self.cconn, "A")
+        self.cconfig.last_cli_shell = "r1(config)#"
+
+    def test_config_tree(self):
+        config = self.cconfig.get_running_config()
+
+        self.assertTrue(config.section_contains("line vty 5 15", "transport input ssh"))
+        self.assertFalse(config.section_contains("line vty 0 4", "transport input ssh"))
+        self.assertTrue(config.section("archive").child("log config").contains("hidekeys"))
+        self.assertFalse(config.has_line("do show run"))
+        self.assertFalse(config.has_line("end"))
+
+    def test_verify_config(self):
+        self.cconfig.verify_config(["archive",
+                                        "log config",
+                                            "logging enable",
+                                            "exit",
+                                        "exit",
+                                    "aaa new-model",
+                                    "aaa accounting exec default start-stop group tacacs+",
+                                    "line vty 0 4",
+                                        "password password",
+                                        "no privilege level 15",
+                                    "line vty 5 15",
+                                        "transport input ssh"])
+
+        with self.assertRaises(ValueError):
+            self.cconfig.verify_config(["line vty 0 4", "transport input ssh"])
+
+    def test_snapshot_reused(self):
+        self.cconfig.verify_config(["line vty 0 4"])
+        self.cconfig.verify_config(["line vty 5 15"])
+        self.cconfig.conf_sendline_expect("exit")
+        self.cconfig.verify_config(["hostname r1"])
+        self.assertEqual(self.cconn.sendline.call_args_list.count((("do show run",),)), 1)
+
+        self.cconfig.conf_sendline_expect("hostname r2")
+        self.cconfig.verify_config(["hostname r1"])
+        self.assertEqual(self.cconn.sendline.call_args_list.count((("do show run",),)), 2)
+
+
+LOCAL_UIDPASS_ADMIN_CONFIG = """show run\r
+hostname r1\r
+!\r
+username tester privilege 15 password 7 0822455D0A16\r
+ip ssh version 2\r
+!\r
+line vty 0 4\r
+ privilege level 15\r
+ login local\r
+ transport input telnet\r
+line vty 5 15\r
+ privilege level 15\r
+ login local\r
+ transport input ssh\r
+!\r
+end\r
+"""
+
+
+class TestConfigureLoginAuthDiff(unittest.TestCase):
+
+    def setUp(self):
+        self.cconn = MagicMock()
+        self.cconn.hostname = "r1"
+        self.cconn.expect_any.return_value = 0
+        self.cconn.after.return_value = "r1#"
+        self.cconfig = CiscoConfigure(self.cconn, "A", bulk=False)
+
+    def test_already_configured(self):
+        self.cconn.before.return_value = LOCAL_UIDPASS_ADMIN_CONFIG
+
+        diff = self.cconfig.configure_login_auth_diff("local", "LOGINLOCAL", 1, "tester")
+
+        self.assertEqual(diff, [])
+        self.assertEqual(self.cconn.sendline.call_args_list, [(("show run",),)])
+        self.assertFalse(self.cconn.reconnect_and_login.called)
+
+    def test_apply_diff(self):
+        self.cconn.before.side_effect = [
+                LOCAL_UIDPASS_ADMIN_CONFIG.replace(" login local\r\n transport input telnet",
+                                                   " password 7 0822455D0A16\r\n login\r\n transport input telnet"),
+                LOCAL_UIDPASS_ADMIN_CONFIG]
+
+        diff = self.cconfig.configure_login_auth_diff("local", "LOGINLOCAL", 1, "tester")
+
+        self.assertEqual(diff, ["+ line vty 0 4: login local", "- line vty 0 4: password"])
+        self.assertEqual([c[0][0] for c in self.cconn.sendline.call_args_list],
+                         ["show run", "config terminal", "line vty 0 4", "login local",
+                          "no password", "exit", "show run", "exit"])
+        self.cconn.reconnect_and_login.assert_called_once_with()
+
+    def test_profile_verified_once(self):
+        self.cconn.before.return_value = LOCAL_UIDPASS_ADMIN_CONFIG
+
+        self.cconfig.configure_profile("CONF_LOCAL_UIDPASS_ADMIN", {"username": "tester"})
+
+        sent = [c[0][0] for c in self.cconn.sendline.call_args_list]
+        self.assertEqual(sent.count("show run"), 1)
+        self.assertEqual(sent[-1], "show run")
+
+    def test_procedural_change(self):
+        self.cconn.before.return_value = LOCAL_UIDPASS_ADMIN_CONFIG.replace("ip ssh version 2\r\n", "")
+
+        with patch.object(self.cconfig, "run_plan") as run_plan:
+            diff = self.cconfig.configure_login_auth_diff("local", "LOGINLOCAL", 1, "tester")
+
+        self.assertEqual(diff, ["+ ip ssh version 2"])
+        plan, params = run_plan.call_args[0]
+        self.assertEqual(plan.name, "CONF_LOCAL_UIDPASS_ADMIN")
+        self.assertEqual(params, {"username": "tester"})
@@ -13,6 +13,7 @@ class TestCiscoController(unittest.TestCase):
         self.csc.set_database_ip("127.0.0.1", "127.0.0.1", "127.0.0.1")
         self.csc.set_credentials("user", "password", "enpassword")
         self.csc.set_config_credentials("super_user", "password", "enpassword")
+        self.csc.set_connection_pooling(False)
 
     def test_set_default_protocol(self):
         self.assertEqual(self.csc.protocol, "telnet")
@@ -28,7 +29,8 @@ class TestCiscoController(unittest.TestCase):
 
         # Mock return values from CiscoConnection
         instance = MockCiscoConnection.return_value
-        instance.after.side_effect = ["[confirm]", "[confirm]", self.csc.hostname+"#"]
+        instance.expect_any.side_effect = [2, 0]     # "[confirm]", prompt
+        instance.after.return_value = self.csc.hostname+"#"
         instance.before.side_effect = ["dummy_output_1", "dummy_output_2"]
 
         # Test sending dummy command with "[confirm]" interactive prompt
@@ -43,7 +45,8 @@ class TestCiscoController(unittest.TestCase):
 
         # Mock return values from CiscoConnection
         instance = MockCiscoConnection.return_value
-        instance.after.side_effect = ["[confirm]", "[confirm]", self.csc.hostname+"#"]
+        instance.expect_any.side_effect = [2, 0]     # "[confirm]", prompt
+        instance.after.return_value = self.csc.hostname+"#"
         instance.before.side_effect = ["dummy_output_1", "dummy_output_2"]
 
         # Test sending dummy command with "[confirm]" interactive prompt
@@ -64,7 +67,8 @@ class TestCiscoController(unittest.TestCase):
         # Mock return values from CiscoConnection
         instance = MockCiscoConnection.return_value
         instance.sendline.side_effect = [pexpect.exceptions.EOF("generic error")]
-        instance.after.side_effect = ["[confirm]", "[confirm]", self.csc.hostname+"#"]
+        instance.expect_any.side_effect = [2, 0]     # "[confirm]", prompt
+        instance.after.return_value = self.csc.hostname+"#"
         instance.before.side_effect = ["dummy_output_1", "dummy_output_2"]
 
         # Test sending dummy command with "[confirm]" interactive prompt
@@ -77,6 +81,44 @@ class TestCiscoController(unittest.TestCase):
         instance.sendline.assert_called_with("dummy")
         instance.disconnect.assert_called()
 
+    @patch("CiscoController.CiscoConnection")
+    def test_run_test_cmds(self, MockCiscoConnection):
+
+        # Mock return values from CiscoConnection
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = self.csc.hostname+"#"
+        instance.before.side_effect = ["dummy_1\r\noutput_1", "dummy_2\r\noutput_2", "dummy_3\r\noutput_3"]
+
+        test_cmds = [self.csc.create_test_cmd("dummy_{}".format(i)) for i in range(1, 4)]
+        self.csc.add_test_cmd_criteria(test_cmds[1], should_contain="not in output")
+
+        # Assert that all the commands ran before the failure is raised
+        with self.assertRaises(ValueError) as cm:
+            self.csc.run_test_cmds(test_cmds)
+
+        self.assertIn("failed 1/3", str(cm.exception))
+        self.assertIn("[-][dummy_2] failed", str(cm.exception))
+        self.assertEqual([result["passed"] for result in cm.exception.results],
+                         [True, False, True])
+        instance.sendline.assert_called_with("dummy_3")
+        self.assertEqual(MockCiscoConnection.call_count, 1)
+
+    @patch("CiscoController.CiscoConnection")
+    def test_run_test_cmds_no_raise(self, MockCiscoConnection):
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = self.csc.hostname+"#"
+        instance.before.side_effect = ["dummy_1\r\noutput_1", "dummy_2\r\noutput_2"]
+
+        test_cmds = [self.csc.create_test_cmd("dummy_{}".format(i)) for i in range(1, 3)]
+        self.csc.add_test_cmd_criteria(test_cmds[0], should_contain="not in output")
+
+        results = self.csc.run_test_cmds(test_cmds, raise_on_failure=False)
+
+        self.assertEqual([(result["cmd"], result["passed"]) for result in results],
+                         [("dummy_1", False), ("dummy_2", True)])
+
     @patch("CiscoController.CiscoConnection")
     def test_run_command_and_get_output(self, MockCiscoConnection):
         prompt = self.csc.hostname+"#"
@@ -85,6 +127,7 @@ class TestCiscoController(unittest.TestCase):
 
         # Mock return values from CiscoConnection
         instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
         instance.after.return_value = prompt
         instance.before.return_value = expected_output
 
@@ -94,3 +137,123 @@ class TestCiscoController(unittest.TestCase):
         instance.sendline.assert_called_with(dummy_cmd)
         instance.disconnect.assert_called()
 
+    @patch("CiscoController.CiscoConnection")
+    def test_run_command_yes_no_prompt(self, MockCiscoConnection):
+
+        # Mock return values from CiscoConnection
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.side_effect = [1, 2, 0]     # "[yes/no]", "[confirm]", prompt
+        instance.after.return_value = self.csc.hostname+"(config)#"
+        instance.before.side_effect = ["out_1", "out_2", "out_3"]
+
+        output = self.csc.run_command_and_get_output("dummy")
+        self.assertEqual(output, "out_1out_2out_3")
+        self.assertEqual(self.csc.last_cmd_prompt, self.csc.hostname+"(config)#")
+        instance.sendline.assert_called_with("n")
+        instance.send.assert_called_with("n")
+
+    @patch("CiscoController.CiscoConnection")
+    def test_iter_command_output(self, MockCiscoConnection):
+
+        # Mock return values from CiscoConnection
+        instance = MockCiscoConnection.return_value
+        instance.read_chunk.side_effect = [
+                "more flash:big.log\r\nline_1\r\nli",
+                "ne_2\r\nrouter#",
+                pexpect.TIMEOUT("no more output")]
+
+        lines = list(self.csc.iter_command_output("more flash:big.log", lines=True))
+        self.assertEqual(lines, ["line_1", "line_2"])
+        instance.sendline.assert_called_with("more flash:big.log")
+        instance.disconnect.assert_called()
+
+    @patch("CiscoController.CiscoConnection")
+    def test_run_commands_on_fleet(self, MockCiscoConnection):
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = "router#"
+        instance.before.return_value = "dummy_output"
+
+        def connect(protocol, router_ip, *args, **kwargs):
+            if router_ip == "10.0.0.2":
+                raise ValueError("Incorrect Login Credential!\n")
+            return instance
+        MockCiscoConnection.side_effect = connect
+
+        results = self.csc.run_commands_on_fleet(
+                {"10.0.0.1": "router", "10.0.0.2": "router"}, ["dummy", "dummy"])
+
+        self.assertEqual(results["10.0.0.1"]["outputs"], ["dummy_output"] * 2)
+        self.assertEqual(len(results["10.0.0.1"]["cmd_times"]), 2)
+        self.assertIsNone(results["10.0.0.1"]["error"])
+        self.assertIn("Incorrect Login Credential", results["10.0.0.2"]["error"])
+        self.assertEqual(results["10.0.0.2"]["outputs"], [])
+
+
+class TestCiscoControllerPooling(unittest.TestCase):
+
+    def setUp(self):
+        self.csc = CiscoController()
+        self.csc.initialise_controller("127.0.0.1", "router")
+        self.csc.set_credentials("user", "password", "enpassword")
+        self.csc.set_config_credentials("super_user", "password", "enpassword")
+
+    def tearDown(self):
+        self.csc.close_pooled_connections()
+
+    @patch("CiscoController.CiscoConnection")
+    def test_connection_reused(self, MockCiscoConnection):
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = self.csc.hostname+"#"
+        instance.before.return_value = "dummy_output"
+        instance.probe_prompt.return_value = True
+
+        self.csc.run_command_and_get_output("dummy")
+        self.csc.run_command_and_get_output("dummy")
+
+        self.assertEqual(MockCiscoConnection.call_count, 1)
+        instance.probe_prompt.assert_called_once()
+        instance.disconnect.assert_not_called()
+
+    @patch("CiscoController.CiscoConnection")
+    def test_dead_connection_replaced(self, MockCiscoConnection):
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = self.csc.hostname+"#"
+        instance.before.return_value = "dummy_output"
+        instance.probe_prompt.return_value = False
+
+        self.csc.run_command_and_get_output("dummy")
+        self.csc.run_command_and_get_output("dummy")
+
+        self.assertEqual(MockCiscoConnection.call_count, 2)
+        instance.disconnect.assert_called_once()
+
+    @patch("CiscoController.CiscoConnection")
+    def test_failed_check_keeps_connection(self, MockCiscoConnection):
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = self.csc.hostname+"#"
+        instance.before.return_value = "dummy_output"
+        instance.probe_prompt.return_value = True
+
+        test_cmd = self.csc.create_test_cmd("dummy")
+        self.csc.add_test_cmd_criteria(test_cmd, should_contain="not in output")
+        self.assertRaises(ValueError, self.csc.run_test_cmd, test_cmd)
+        self.csc.run_command_and_get_output("dummy")
+
+        self.assertEqual(MockCiscoConnection.call_count, 1)
+        instance.disconnect.assert_not_called()
+
+    @patch("CiscoController.CiscoConnection")
+    def test_credential_change_evicts(self, MockCiscoConnection):
+        instance = MockCiscoConnection.return_value
+        instance.expect_any.return_value = 0
+        instance.after.return_value = self.csc.hostname+"#"
+        instance.before.return_value = "dummy_output"
+
+        self.csc.run_command_and_get_output("dummy")
+        self.csc.set_credentials("user", "new_password", "enpassword")
+
+        instance.disconnect.assert_called_once()
@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime
+from mock import patch
+from CiscoHistoryParser import ShowHistoryParser
+
+
+class TestShowHistoryParser(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = ShowHistoryParser(today=datetime(2018, 3, 5, 12, 0, 0))
+
+    def test_parse_datetime(self):
+        parse_datetime = self.parser.parse_datetime
+        self.assertEqual(parse_datetime("CMD: 'show run' 10:01:02 UTC Mon Mar 01 2018"),
+                         datetime(2018, 3, 1, 10, 1, 2))
+        self.assertEqual(parse_datetime("*Mar 02 00:12:34.123: %SYS-5-CONFIG_I"),
+                         datetime(2018, 3, 2, 0, 12, 34))
+        self.assertEqual(parse_datetime("CMD: 'end' Mar 03"), datetime(2018, 3, 3))
+        self.assertEqual(parse_datetime("CMD: 'end' 09:08:07"), datetime(2018, 3, 5, 9, 8, 7))
+        self.assertIsNone(parse_datetime("CMD: 'show clock'"))
+
+    def test_dateutil_fallback(self):
+        # Not a valid date for strptime
+        self.assertIsNone(self.parser.parse_datetime("CMD: 'end' Feb 30 2018"))
+
+    def test_memoized(self):
+        with patch("CiscoHistoryParser.datetime") as mock_datetime:
+            mock_datetime.strptime.side_effect = datetime.strptime
+            self.parser.parse_datetime("CMD: 'a' 10:01:02 UTC Mon Mar 01 2018")
+            self.parser.parse_datetime("CMD: 'b' 10:01:02 UTC Mon Mar 01 2018")
+
+        self.assertEqual(mock_datetime.strptime.call_count, 1)
+
+    def test_parse(self):
+        output = ("show history all\r\n"
+                  "CMD: 'configure terminal'\r\n"
+                  "CMD: 'hostname r1' 10:01:03 UTC Mon Mar 01 2018\r\n"
+                  "CMD: 'end'\r\n"
+                  "CMD: 'show run' 10:01:01 UTC Mon Mar 01 2018\r\n"
+                  "CMD: 'show clock'\r\n"
+                  "Router#")
+
+        entries = self.parser.parse(output)
+
+        self.assertEqual([entry.line for entry in entries],
+                         ["CMD: 'show run' 10:01:01 UTC Mon Mar 01 2018",
+                          "CMD: 'show clock'",
+                          "CMD: 'configure terminal'",
+                          "CMD: 'hostname r1' 10:01:03 UTC Mon Mar 01 2018",
+                          "CMD: 'end'"])
+        self.assertEqual(entries[1].logDateTime, datetime(2018, 3, 1, 10, 1, 1))
+        self.assertEqual(entries[2].logDateTime, datetime(2018, 3, 1, 10, 1, 3))
+
+    def test_parse_no_datetime(self):
+        entries = self.parser.parse("CMD: 'b'\r\nCMD: 'a'\r\n")
+        self.assertEqual([entry.line for entry in entries], ["CMD: 'b'", "CMD: 'a'"])
+        self.assertIsNone(entries[0].logDateTime)
@@ -0,0 +1,62 @@
+import unittest
+import sqlite3
+from CiscoLogCursor import LogTableCursor
+
+
+class SQLiteCursor(object):
+    """MySQLdb style cursor over an sqlite3 database."""
+
+    def __init__(self, conn):
+        self.cur = conn.cursor()
+        self.queries = 0
+
+    def execute(self, query, parameters):
+        self.queries += 1
+        self.cur.execute(query.replace("%s", "?"), parameters)
+
+    def fetchall(self):
+        return self.cur.fetchall()
+
+
+class TestLogTableCursor(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE logs (id INTEGER, host TEXT, message TEXT)")
+        self.cur = SQLiteCursor(self.conn)
+
+    def insert(self, rows):
+        self.conn.executemany("INSERT INTO logs VALUES (?, ?, ?)", rows)
+
+    def test_pages(self):
+        self.insert([(i, "r1" if i % 2 else "r2", "msg{}".format(i)) for i in range(1, 21)])
+
+        cursor = LogTableCursor(("id", "message"), "logs", "id", id_start=5,
+                                filters=[("host = %s", "r1")], page_size=3)
+
+        pages = list(cursor.iter_pages(self.cur))
+        self.assertEqual([len(page) for page in pages], [3, 3, 2])
+        self.assertEqual([row[0] for row in cursor.rows], [5, 7, 9, 11, 13, 15, 17, 19])
+        self.assertEqual(cursor.last_id, 19)
+
+    def test_only_new_rows_fetched(self):
+        self.insert([(1, "r1", "a"), (2, "r1", "b")])
+
+        cursor = LogTableCursor(("id", "message"), "logs", "id", page_size=10)
+        self.assertEqual(cursor.read(self.cur), ((1, "a"), (2, "b")))
+
+        self.insert([(3, "r1", "c")])
+        pages = list(cursor.iter_pages(self.cur))
+        self.assertEqual(pages, [[(3, "c")]])
+        self.assertEqual(cursor.read(self.cur), ((1, "a"), (2, "b"), (3, "c")))
+
+    def test_non_unique_ids_not_split(self):
+        # Varbinds of SNMP traps share the trap id
+        self.insert([(1, "r1", "a"), (2, "r1", "b"), (2, "r1", "c"),
+                     (2, "r1", "d"), (2, "r1", "e"), (3, "r1", "f")])
+
+        cursor = LogTableCursor(("id", "message"), "logs", "id",
+                                unique_id=False, page_size=2)
+
+        self.assertEqual([row[1] for row in cursor.read(self.cur)],
+                         ["a", "b", "c", "d", "e", "f"])
@@ -0,0 +1,41 @@
+import unittest
+from CiscoLogDelta import LogDelta, SYSLOG_SEQUENCE, ARCHIVE_INDEX
+
+
+class TestLogDelta(unittest.TestCase):
+
+    def test_sequence_numbers(self):
+        delta = LogDelta(SYSLOG_SEQUENCE)
+        delta.mark(["000011: *Mar  1 00:01:02: %SYS-5-CONFIG_I: same\r\n",
+                    "000012: *Mar  1 00:01:02: %SYS-5-CONFIG_I: same\r\n"])
+
+        lines = ["000012: *Mar  1 00:01:02: %SYS-5-CONFIG_I: same\r\n",
+                 "000013: *Mar  1 00:01:02: %SYS-5-CONFIG_I: same\r\n"]
+        self.assertEqual(delta.new_lines(lines), lines[1:])
+
+    def test_sequence_restarted(self):
+        delta = LogDelta(SYSLOG_SEQUENCE)
+        delta.mark(["000100: %SYS-5-RELOAD\r\n"])
+
+        lines = ["000001: %SYS-5-RESTART\r\n"]
+        self.assertEqual(delta.new_lines(lines), lines)
+
+    def test_archive_index(self):
+        delta = LogDelta(ARCHIVE_INDEX)
+        delta.mark(["\r\n",
+                    "    1     1        console@console  |  logging enable\r\n"])
+
+        lines = ["\r\n",
+                 "    1     1        console@console  |  logging enable\r\n",
+                 "    2     3           admin@vty0     |  hostname r1\r\n"]
+        self.assertEqual(delta.new_lines(lines), lines[2:])
+
+    def test_unnumbered_lines(self):
+        delta = LogDelta(SYSLOG_SEQUENCE)
+        delta.mark(["CMD: 'show clock'", "CMD: 'enable'"])
+
+        lines = ["CMD: 'show clock'", "CMD: 'enable'", "CMD: 'show clock'"]
+        self.assertEqual(delta.new_lines(lines), ["CMD: 'show clock'"])
+
+    def test_not_marked(self):
+        self.assertEqual(LogDelta(SYSLOG_SEQUENCE).new_lines(["a", "b"]), ["a", "b"])
@@ -0,0 +1,51 @@
+import unittest
+from datetime import datetime
+import CiscoLogging
+from CiscoLogRender import field_labels
+from CiscoHistoryParser import CiscoShowHistoryLog
+from CiscoLogRecords import (TacacsAccessRecord, TacacsAccountingRecord,
+                             SyslogEventRecord, SnmpVarbindRecord, RecordSet,
+                             parse_syslog_buffer, parse_archive)
+
+
+class TestCiscoLogRecords(unittest.TestCase):
+
+    def test_fields(self):
+        for fields, record_type in ((CiscoLogging.ACCESS_FIELDS, TacacsAccessRecord),
+                                    (CiscoLogging.ACCOUNTING_FIELDS, TacacsAccountingRecord),
+                                    (CiscoLogging.SYSTEMEVENTS_FIELDS, SyslogEventRecord),
+                                    (CiscoLogging.SNMPNOTIFICATION_FIELDS, SnmpVarbindRecord)):
+            self.assertEqual(field_labels(fields), list(record_type._fields))
+
+    def test_no_instance_dict(self):
+        entry = CiscoShowHistoryLog("CMD: 'end' 10:01:02 UTC Mon Mar 01 2018")
+        self.assertFalse(hasattr(entry, "__dict__"))
+
+    def test_parse_syslog_buffer(self):
+        records = parse_syslog_buffer(["\r\n",
+                                       "000012: *Mar  1 00:01:02: %SYS-5-CONFIG_I\r\n",
+                                       "*Mar  1 00:01:03: %LINK-3-UPDOWN\r\n"])
+        self.assertEqual([record.sequence for record in records], [12, None])
+
+    def test_parse_archive(self):
+        records = parse_archive(["\r\n",
+                                 "    2     3           admin@vty0     |  hostname r1\r\n"])
+        self.assertEqual(records, [(2, 3, "admin@vty0", "hostname r1")])
+
+    def test_record_set(self):
+        rows = [(1, "10.0.0.1", "admin", "tty1", "10.0.0.9", "start", "shell", 15, "show run", 0),
+                (2, "10.0.0.1", "oper", "tty1", "10.0.0.9", "stop", "shell", 1, "show clock", 1),
+                (3, "10.0.0.1", "admin", "tty2", "10.0.0.9", "stop", "shell", 15, "reload", 2)]
+        records = RecordSet(TacacsAccountingRecord._make(row) for row in rows)
+
+        self.assertEqual(records.column("uid"), ("admin", "oper", "admin"))
+        self.assertEqual([r.id for r in records.where("uid", "admin")], [1, 3])
+        self.assertEqual([r.id for r in records.matching("cmd", "^show")], [1, 2])
+        self.assertEqual([r.id for r in records.between("id", 2)], [2, 3])
+        self.assertEqual(len(records.where("uid", "nobody")), 0)
+
+    def test_history_time_window(self):
+        entries = RecordSet([CiscoShowHistoryLog("CMD: 'a' 10:01:02 UTC Mon Mar 01 2018"),
+                             CiscoShowHistoryLog("CMD: 'b' 10:05:00 UTC Mon Mar 01 2018")])
+        window = entries.between("logDateTime", datetime(2018, 3, 1, 10, 2))
+        self.assertEqual(window.column("line"), ("CMD: 'b' 10:05:00 UTC Mon Mar 01 2018",))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import datetime
+from CiscoLogRender import field_labels, render, write, RenderCache
+
+
+class TestCiscoLogRender(unittest.TestCase):
+
+    def setUp(self):
+        self.fields = ("id", "net_snmp.varbinds.trap_id",
+                       "net_snmp.varbinds.type AS 'oid_type'")
+        self.rows = ((1, 10, "INTEGER"),
+                     (2, 11, u"caf\xe9, \"quoted\""))
+
+    def test_field_labels(self):
+        self.assertEqual(field_labels(self.fields), ["id", "trap_id", "oid_type"])
+
+    def test_tsv(self):
+        self.assertEqual(render(self.rows),
+                         "1\t10\tINTEGER\n2\t11\tcaf\xc3\xa9, \"quoted\"")
+        self.assertEqual(render(()), "")
+
+    def test_csv(self):
+        self.assertEqual(render(self.rows, "csv", self.fields).splitlines(),
+                         ["id,trap_id,oid_type",
+                          "1,10,INTEGER",
+                          "2,11,\"caf\xc3\xa9, \"\"quoted\"\"\""])
+
+    def test_jsonl(self):
+        when = datetime.datetime(2018, 3, 1, 10, 1, 2)
+        lines = render(((1, 10, when),), "jsonl", self.fields).splitlines()
+        self.assertEqual(json.loads(lines[0]),
+                         {"id": 1, "trap_id": 10, "oid_type": "2018-03-01 10:01:02"})
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            render(self.rows, "xml")
+
+    def test_write(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp_dir, "logs.csv")
+            self.assertEqual(write(self.rows, path, "csv", self.fields), 2)
+            with open(path) as f:
+                self.assertEqual(len(f.read().splitlines()), 3)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_cache(self):
+        cache = RenderCache()
+        first = cache.render("syslog", self.rows)
+        self.assertIs(cache.render("syslog", self.rows), first)
+
+        rows = self.rows + ((3, 12, "Counter32"),)
+        self.assertTrue(cache.render("syslog", rows).endswith("3\t12\tCounter32"))
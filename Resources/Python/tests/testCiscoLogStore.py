@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime
+from CiscoLogStore import LogStore
+from CiscoLogRecords import (TacacsAccountingRecord, SyslogEventRecord,
+                             parse_syslog_buffer)
+
+
+class TestLogStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = LogStore()
+        self.store.add("tacacs accounting", [
+                TacacsAccountingRecord(1, "10.0.0.1", "admin", "tty1", "10.0.0.9",
+                                       "stop", "shell", 15, "show running-config <cr>", 0),
+                TacacsAccountingRecord(2, "10.0.0.1", "oper", "tty1", "10.0.0.9",
+                                       "stop", "shell", 1, "show clock <cr>", 0),
+                TacacsAccountingRecord(3, "10.0.0.1", "admin", "tty2", "10.0.0.9",
+                                       "stop", "shell", 15, "reload <cr>", 0)])
+        self.store.add("syslog", [
+                SyslogEventRecord(7, None, datetime(2018, 3, 1, 10, 1, 2), "10.0.0.1",
+                                  "%SYS-5-CONFIG_I: Configured from console by admin", "r1"),
+                SyslogEventRecord(8, None, datetime(2018, 3, 1, 10, 5, 0), "10.0.0.1",
+                                  "%LINK-3-UPDOWN: Interface Gi0/1, changed state to up", "r1")])
+        self.store.add("show log", parse_syslog_buffer(
+                ["000012: *Mar  1 10:01:02: %SYS-5-CONFIG_I: Configured from console by admin\r\n"]))
+
+    def test_user_and_command(self):
+        self.assertEqual(self.store.count(user="admin", contains="show run"), 1)
+        self.assertEqual(self.store.count(user="admin"), 2)
+        self.assertEqual(self.store.count(source="tacacs accounting", contains="show"), 2)
+        self.assertEqual(self.store.count(contains="Show"), 0)
+
+    def test_facility_and_severity(self):
+        self.assertEqual(self.store.count(facility="SYS", severity=5), 2)
+        self.assertEqual(self.store.count(source="syslog", severity=3), 1)
+
+    def test_time_window(self):
+        entries = self.store.query(start=datetime(2018, 3, 1, 10, 1, 2),
+                                   end=datetime(2018, 3, 1, 10, 4))
+        self.assertEqual([entry.record.id for entry in entries], [7])
+        self.assertEqual(self.store.count(start=datetime(2018, 3, 1, 10, 1, 3)), 1)
+
+    def test_tacacs_time_window(self):
+        # The tacacs records have no timestamp to select a window with
+        with self.assertRaises(ValueError):
+            self.store.query(source="tacacs accounting", user="admin", contains="show",
+                             start=datetime(2018, 3, 1, 10), end=datetime(2018, 3, 1, 11))
+        with self.assertRaises(ValueError):
+            self.store.count(user="admin", start=datetime(2018, 3, 1, 10))
+
+        self.assertEqual(self.store.count(facility="SYS", start=datetime(2018, 3, 1, 10)), 1)
+
+    def test_regex(self):
+        self.assertEqual(self.store.count(regex="by admin$"), 2)
+        self.assertEqual(self.store.count(), 6)
@@ -0,0 +1,88 @@
+import unittest
+import time
+from mock import patch, MagicMock, DEFAULT
+from CiscoLogging import CiscoLogging
+
+
+class TestWaitForLogFlush(unittest.TestCase):
+
+    def setUp(self):
+        self.clog = CiscoLogging("127.0.0.1", "127.0.0.1", "127.0.0.1")
+        self.clock = [1000.0]
+
+    def sleep(self, seconds):
+        self.clock[0] += seconds
+
+    def time(self):
+        return self.clock[0]
+
+    @patch("CiscoLogging.time")
+    def test_returns_when_quiet(self, mock_time):
+        mock_time.time.side_effect = self.time
+        mock_time.sleep.side_effect = self.sleep
+
+        with patch.object(self.clog, "get_log_table_last_ids") as last_ids:
+            last_ids.side_effect = [{"syslog": 1}, {"syslog": 5}, {"syslog": 5},
+                                    {"syslog": 5}, {"syslog": 5}]
+            self.assertEqual(self.clog.wait_for_log_flush(["syslog"]), {"syslog": 5})
+
+        # Returned long before the 120s upper bound
+        self.assertLess(self.clock[0] - 1000.0, 10)
+
+    @patch("CiscoLogging.time")
+    def test_timeout(self, mock_time):
+        mock_time.time.side_effect = self.time
+        mock_time.sleep.side_effect = self.sleep
+
+        counter = iter(range(1000))
+        with patch.object(self.clog, "get_log_table_last_ids") as last_ids:
+            last_ids.side_effect = lambda log_check_list: {"snmp": next(counter)}
+            self.clog.wait_for_log_flush(["snmp"], timeout=30)
+
+        self.assertEqual(self.clock[0] - 1000.0, 30)
+
+    def test_nothing_to_wait_for(self):
+        self.assertEqual(self.clog.wait_for_log_flush(["show log"]), {})
+
+
+class TestLoggingRead(unittest.TestCase):
+
+    def setUp(self):
+        self.clog = CiscoLogging("127.0.0.1", "127.0.0.1", "127.0.0.1")
+        self.cisco_conn = MagicMock()
+        self.cisco_conn.IP = "10.0.0.1"
+
+    def test_sources_read(self):
+        log_check_list = ["tacacs access", "tacacs accounting", "syslog", "snmp", "show log"]
+
+        with patch.multiple(self.clog,
+                            get_tacacs_access_logs=DEFAULT,
+                            get_tacacs_accounting_logs=DEFAULT,
+                            get_syslogs=DEFAULT,
+                            get_snmp_logs=DEFAULT,
+                            get_show_logging_logs=DEFAULT) as mocks:
+            mocks["get_tacacs_access_logs"].return_value = ((1, "access"),)
+            mocks["get_tacacs_accounting_logs"].return_value = ((2, "accounting"),)
+            mocks["get_syslogs"].return_value = ((3, "syslog"),)
+            mocks["get_snmp_logs"].return_value = ((4, "snmp"),)
+            mocks["get_show_logging_logs"].return_value = "buffered"
+
+            self.clog.logging_read(self.cisco_conn, log_check_list, "user")
+
+        mocks["get_tacacs_access_logs"].assert_called_with("10.0.0.1", "user")
+        self.assertEqual(self.clog.tacacs_access, ((1, "access"),))
+        self.assertEqual(self.clog.tacacs_accounting, ((2, "accounting"),))
+        self.assertEqual(self.clog.syslog, ((3, "syslog"),))
+        self.assertEqual(self.clog.snmp, ((4, "snmp"),))
+        self.assertEqual(self.clog.buffered, "buffered")
+        self.assertEqual(set(self.clog.source_latency),
+                         set(["tacacs access", "tacacs accounting", "syslog", "snmp", "router"]))
+
+    def test_source_timeout(self):
+        self.clog.source_timeout = 0.1
+
+        with patch.object(self.clog, "get_syslogs") as get_syslogs:
+            get_syslogs.side_effect = lambda router_ip: time.sleep(1)
+
+            with self.assertRaises(ValueError):
+                self.clog.logging_read(self.cisco_conn, ["syslog"], "user")
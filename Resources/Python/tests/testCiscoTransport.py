@@ -0,0 +1,152 @@
+import socket
+import telnetlib
+import threading
+import types
+import unittest
+from mock import MagicMock, patch
+import CiscoConnection as cisco_connection
+from CiscoConnection import CiscoConnection
+from CiscoTransport import TelnetSpawn, SshSpawn, TransportUnavailable, LEGACY_KEX
+
+TTYPE = chr(24)
+
+
+class FakeRouter(threading.Thread):
+    """A telnet server negotiating options then running an IOS login."""
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.received = ""
+
+    def read_line(self, conn):
+        while "\n" not in self.received:
+            data = conn.recv(1024)
+            if not data:
+                raise EOFError()
+            self.received += data
+        line, self.received = self.received.split("\n", 1)
+        return line.strip()
+
+    def run(self):
+        conn, _ = self.server.accept()
+        self.lines = []
+        try:
+            conn.sendall(telnetlib.IAC + telnetlib.WILL + telnetlib.ECHO +
+                         telnetlib.IAC + telnetlib.DO + TTYPE +
+                         "\r\nUser Access Verification\r\n\r\nUsername: ")
+            self.lines.append(self.read_line(conn))
+            conn.sendall("\r\nPassword: ")
+            self.lines.append(self.read_line(conn))
+            conn.sendall("\r\nr1#")
+            self.lines.append(self.read_line(conn))
+            conn.sendall("terminal length 0\r\nr1#")
+            self.lines.append(self.read_line(conn))
+        except EOFError:
+            pass
+        finally:
+            conn.close()
+            self.server.close()
+
+
+class TestTelnetSpawn(unittest.TestCase):
+
+    def test_negotiation_and_login(self):
+        router = FakeRouter()
+        router.start()
+
+        with patch.object(cisco_connection, "spawn_native",
+                          lambda protocol, IP, username, password, timeout:
+                          TelnetSpawn(IP, router.port, timeout)):
+            cconn = CiscoConnection("telnet", "127.0.0.1", "admin", "secret", "",
+                                    "r1", default_timeout=5, transport="native")
+
+        cconn.disconnect()
+        router.join(5)
+
+        negotiation, lines = router.lines[0], router.lines[1:]
+        self.assertIn(telnetlib.IAC + telnetlib.DO + telnetlib.ECHO, negotiation)
+        self.assertIn(telnetlib.IAC + telnetlib.WONT + TTYPE, negotiation)
+        self.assertTrue(negotiation.endswith("admin"))
+        self.assertEqual(lines, ["secret", "terminal length 0", "exit"])
+
+
+def fake_paramiko(start_client_error=None):
+    """A paramiko module whose Transport fails start_client() with the error."""
+
+    paramiko = types.ModuleType("paramiko")
+    paramiko.SSHException = type("SSHException", (Exception,), {})
+    paramiko.AuthenticationException = type(
+            "AuthenticationException", (paramiko.SSHException,), {})
+
+    options = MagicMock()
+    options.kex = ("curve25519-sha256", "diffie-hellman-group14-sha1")
+    transport = MagicMock()
+    transport.get_security_options.return_value = options
+    if start_client_error:
+        transport.start_client.side_effect = paramiko.SSHException(start_client_error)
+    paramiko.Transport = MagicMock(return_value=transport)
+
+    return paramiko
+
+
+@patch("CiscoTransport.socket.create_connection", MagicMock())
+class TestSshSpawn(unittest.TestCase):
+
+    def test_legacy_kex_enabled(self):
+        paramiko = fake_paramiko()
+
+        with patch.dict("sys.modules", paramiko=paramiko):
+            SshSpawn("10.0.0.1", "admin", "secret", timeout=5)
+
+        options = paramiko.Transport.return_value.get_security_options.return_value
+        self.assertEqual(options.kex, ("curve25519-sha256",) + LEGACY_KEX)
+
+    def test_negotiation_failure(self):
+        paramiko = fake_paramiko("Incompatible ssh peer (no acceptable kex algorithm)")
+
+        with patch.dict("sys.modules", paramiko=paramiko):
+            self.assertRaises(TransportUnavailable, SshSpawn,
+                              "10.0.0.1", "admin", "secret", timeout=5)
+
+        paramiko.Transport.return_value.close.assert_called_with()
+
+
+class TestTransportFallback(unittest.TestCase):
+
+    def connect(self, transport, error):
+        with patch.object(cisco_connection, "spawn_native", side_effect=error), \
+                patch.object(cisco_connection, "spawn_and_print") as spawn_and_print, \
+                patch.object(CiscoConnection, "login"):
+            CiscoConnection("ssh", "10.0.0.1", "admin", "secret", "", "r1",
+                            default_timeout=5, transport=transport)
+        return spawn_and_print
+
+    def test_auto_falls_back(self):
+        for error in (TransportUnavailable("SSH negotiation failed"),
+                      socket.error("Connection reset by peer")):
+            spawn_and_print = self.connect("auto", error)
+            self.assertEqual(spawn_and_print.call_args[0][0], "ssh")
+            self.assertIn("KexAlgorithms=" + ",".join(LEGACY_KEX),
+                          spawn_and_print.call_args[0][1])
+
+    def test_native_raises(self):
+        self.assertRaises(TransportUnavailable, self.connect, "native",
+                          TransportUnavailable("paramiko is not installed"))
+
+    def test_pexpect_default(self):
+        with patch.object(cisco_connection, "spawn_native") as spawn_native, \
+                patch.object(cisco_connection, "spawn_and_print"), \
+                patch.object(CiscoConnection, "login"):
+            CiscoConnection("ssh", "10.0.0.1", "admin", "secret", "", "r1",
+                            default_timeout=5)
+
+        self.assertFalse(spawn_native.called)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import errno
+import fcntl
+import shutil
+import tempfile
+import time
+import unittest
+from mock import MagicMock, patch
+from FtpCache import FtpCache, cache_key, link_or_copy, PART_MAX_AGE
+from FtpFakes import serve
+
+
+class TestFtpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = FtpCache(os.path.join(self.tmp_dir, "cache"), quota=10)
+        self.ftp = MagicMock()
+        self.ftp.transfercmd.side_effect = serve(dict((path, "abcdef") for path in ("/a.bin", "/b.bin")))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_hit_after_download(self):
+        url = "ftp://10.0.0.1/a.bin"
+        self.assertIsNone(self.cache.lookup(url, (6, "1")))
+
+        path, _ = self.cache.download(self.ftp, url, "/a.bin", (6, "1"))
+
+        with open(path) as fin:
+            self.assertEqual(fin.read(), "abcdef")
+        self.assertEqual(self.cache.lookup(url, (6, "1")), path)
+        self.assertEqual(self.cache.lookup(url), path)
+        self.assertIsNone(self.cache.lookup(url, (6, "2")))
+
+    def test_no_fresh_entry(self):
+        self.cache.max_age = 0
+        self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (6, "1"))
+
+        self.assertIsNone(self.cache.lookup("ftp://10.0.0.1/a.bin"))
+
+    def test_resume_part(self):
+        url = "ftp://10.0.0.1/a.bin"
+        os.makedirs(self.cache.cache_dir)
+        with open(os.path.join(self.cache.cache_dir, cache_key(url, 6, "1") + ".part"), "w") as fout:
+            fout.write("abc")
+
+        path, _ = self.cache.download(self.ftp, url, "/a.bin", (6, "1"))
+
+        self.assertEqual(self.ftp.transfercmd.call_args[0][1], 3)
+        with open(path) as fin:
+            self.assertEqual(fin.read(), "abcdef")
+
+    def test_incomplete_download(self):
+        self.assertRaises(ValueError, self.cache.download,
+                          self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (7, "1"))
+        self.assertEqual(os.listdir(self.cache.cache_dir),
+                         [cache_key("ftp://10.0.0.1/a.bin", 7, "1") + ".part"])
+
+    def test_lookup_miss_not_saved(self):
+        self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (6, "1"))
+        mtime = int(os.path.getmtime(self.cache.index_path)) - 10
+        os.utime(self.cache.index_path, (mtime, mtime))
+
+        self.assertIsNone(self.cache.lookup("ftp://10.0.0.1/a.bin", (6, "2")))
+
+        self.assertEqual(os.path.getmtime(self.cache.index_path), mtime)
+
+    def test_shared_index(self):
+        other = FtpCache(self.cache.cache_dir, quota=10)
+        self.ftp.transfercmd.side_effect = serve({"/a.bin": "abc", "/b.bin": "abc"})
+
+        with patch("FtpCache.fcntl.flock", wraps=fcntl.flock) as flock:
+            self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (3, "1"))
+            other.download(self.ftp, "ftp://10.0.0.1/b.bin", "/b.bin", (3, "1"))
+
+        self.assertIn(self.cache.lock_path, [c[0][0].name for c in flock.call_args_list])
+        self.assertIsNotNone(self.cache.lookup("ftp://10.0.0.1/a.bin", (3, "1")))
+        self.assertIsNotNone(self.cache.lookup("ftp://10.0.0.1/b.bin", (3, "1")))
+        self.assertEqual([name for name in os.listdir(self.cache.cache_dir)
+                          if name.endswith(".tmp")], [])
+
+    def test_lru_eviction(self):
+        a, _ = self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (6, "1"))
+        self.cache.download(self.ftp, "ftp://10.0.0.1/b.bin", "/b.bin", (6, "1"))
+
+        self.assertFalse(os.path.exists(a))
+        self.assertIsNone(self.cache.lookup("ftp://10.0.0.1/a.bin", (6, "1")))
+        self.assertIsNotNone(self.cache.lookup("ftp://10.0.0.1/b.bin", (6, "1")))
+
+    def write_part(self, name, data, age=0):
+        if not os.path.isdir(self.cache.cache_dir):
+            os.makedirs(self.cache.cache_dir)
+        path = os.path.join(self.cache.cache_dir, name + ".part")
+        with open(path, "w") as fout:
+            fout.write(data)
+        os.utime(path, (time.time() - age, time.time() - age))
+        return path
+
+    def test_stale_part_swept(self):
+        stale = self.write_part(cache_key("ftp://10.0.0.1/a.bin", 6, "0"), "abc", age=PART_MAX_AGE + 1)
+        recent = self.write_part(cache_key("ftp://10.0.0.1/b.bin", 6, "0"), "abc")
+
+        self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (6, "1"))
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(recent))
+
+    def test_part_counts_in_quota(self):
+        self.ftp.transfercmd.side_effect = serve({"/a.bin": "abc", "/b.bin": "abc"})
+        a, _ = self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (3, "1"))
+        self.write_part(cache_key("ftp://10.0.0.1/c.bin", 6, "1"), "abcde")
+
+        self.cache.download(self.ftp, "ftp://10.0.0.1/b.bin", "/b.bin", (3, "1"))
+
+        # 3 + 3 + 5 bytes are over the quota of 10
+        self.assertFalse(os.path.exists(a))
+
+    def test_downloaded_by_another_run(self):
+        url = "ftp://10.0.0.1/a.bin"
+        os.makedirs(self.cache.cache_dir)
+        with open(os.path.join(self.cache.cache_dir, cache_key(url, 6, "1")), "w") as fout:
+            fout.write("abcdef")
+
+        path, stats = self.cache.download(self.ftp, url, "/a.bin", (6, "1"))
+
+        self.assertIsNone(stats)
+        self.assertFalse(self.ftp.transfercmd.called)
+        self.assertEqual(self.cache.lookup(url, (6, "1")), path)
+        self.assertFalse(os.path.exists(path + ".part"))
+
+    def test_link_or_copy(self):
+        path, _ = self.cache.download(self.ftp, "ftp://10.0.0.1/a.bin", "/a.bin", (6, "1"))
+        output = os.path.join(self.tmp_dir, "a.bin")
+        with open(output, "w") as fout:
+            fout.write("old")
+
+        link_or_copy(path, output)
+
+        self.assertEqual(os.stat(output).st_ino, os.stat(path).st_ino)
+
+        other = os.path.join(self.tmp_dir, "b.bin")
+        with patch("FtpCache.os.link", side_effect=OSError(errno.EXDEV, "Cross-device link")):
+            link_or_copy(path, other)
+
+        self.assertNotEqual(os.stat(other).st_ino, os.stat(path).st_ino)
+        with open(other) as fin:
+            self.assertEqual(fin.read(), "abcdef")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import ftplib
+import unittest
+from mock import patch, MagicMock
+from FtpSessionPool import FtpSessionPool, is_session_lost
+
+
+class TestFtpSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = FtpSessionPool()
+        self.factory = MagicMock(side_effect=lambda: MagicMock())
+
+    def test_session_reused(self):
+        with self.pool.session("10.0.0.1", "user", "pass", self.factory) as first:
+            pass
+        with self.pool.session("10.0.0.1", "user", "pass", self.factory) as second:
+            pass
+        with self.pool.session("10.0.0.1", "other", "pass", self.factory) as third:
+            pass
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(self.factory.call_count, 2)
+
+    def test_session_closed_on_error(self):
+        with self.assertRaises(ftplib.error_temp):
+            with self.pool.session("10.0.0.1", "user", "pass", self.factory) as first:
+                raise ftplib.error_temp("421 Timeout.")
+        with self.pool.session("10.0.0.1", "user", "pass", self.factory) as second:
+            pass
+
+        first.quit.assert_called_with()
+        self.assertIsNot(first, second)
+
+    @patch("IdlePool.time")
+    def test_noop_keepalive(self, mock_time):
+        mock_time.time.return_value = 1000.0
+
+        with self.pool.session("10.0.0.1", "user", "pass", self.factory) as first:
+            pass
+
+        mock_time.time.return_value = 1060.0
+        with self.pool.session("10.0.0.1", "user", "pass", self.factory) as second:
+            first.voidcmd.side_effect = EOFError()
+
+        mock_time.time.return_value = 1120.0
+        with self.pool.session("10.0.0.1", "user", "pass", self.factory) as third:
+            pass
+
+        self.assertIs(first, second)
+        self.assertIsNot(second, third)
+        first.voidcmd.assert_called_with("NOOP")
+
+    def test_is_session_lost(self):
+        self.assertTrue(is_session_lost(ftplib.error_temp("421 Timeout.")))
+        self.assertTrue(is_session_lost(EOFError()))
+        self.assertFalse(is_session_lost(ftplib.error_temp("450 File busy")))
+        self.assertFalse(is_session_lost(ftplib.error_perm("550 No such file")))
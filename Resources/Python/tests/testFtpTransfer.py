@@ -0,0 +1,58 @@
+import ftplib
+import os
+import shutil
+import tempfile
+import unittest
+from mock import MagicMock
+from FtpTransfer import retrieve
+
+
+class FailingConnection(object):
+    """A fake FTP data connection dropped after sending data."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def recv_into(self, buf):
+        if not self.data:
+            raise ftplib.error_temp("426 Connection closed; transfer aborted.")
+        n = len(self.data)
+        buf[:n] = self.data
+        self.data = ""
+        return n
+
+    def close(self):
+        pass
+
+
+class TestRetrieve(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "c3845.bin")
+        self.ftp = MagicMock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_failed_transfer_truncated(self):
+        self.ftp.transfercmd.return_value = FailingConnection("abc")
+
+        with open(self.path, "wb") as fout:
+            self.assertRaises(ftplib.error_temp, retrieve,
+                              self.ftp, "/c3845.bin", fout, size=100)
+
+        self.assertEqual(os.path.getsize(self.path), 3)
+
+    def test_failed_command_truncated(self):
+        self.ftp.transfercmd.side_effect = ftplib.error_perm("550 No such file")
+
+        with open(self.path, "wb") as fout:
+            self.assertRaises(ftplib.error_perm, retrieve,
+                              self.ftp, "/c3845.bin", fout, size=100)
+
+        self.assertEqual(os.path.getsize(self.path), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
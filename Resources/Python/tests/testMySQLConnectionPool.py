@@ -0,0 +1,55 @@
+import unittest
+import MySQLdb
+from mock import patch, MagicMock
+from MySQLConnectionPool import MySQLConnectionPool
+
+
+class TestMySQLConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = MySQLConnectionPool()
+
+    @patch("MySQLConnectionPool.MySQLdb.connect")
+    def test_connection_reused(self, mock_connect):
+        mock_connect.side_effect = lambda **kwargs: MagicMock()
+
+        with self.pool.connection("127.0.0.1", "user", "pass", "db") as first:
+            pass
+        with self.pool.connection("127.0.0.1", "user", "pass", "db") as second:
+            pass
+        with self.pool.connection("127.0.0.1", "user", "pass", "other_db") as third:
+            pass
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
+        self.assertEqual(mock_connect.call_count, 2)
+        first.autocommit.assert_called_with(True)
+
+    @patch("MySQLConnectionPool.MySQLdb.connect")
+    def test_connection_closed_on_error(self, mock_connect):
+        mock_connect.side_effect = lambda **kwargs: MagicMock()
+
+        with self.assertRaises(MySQLdb.Error):
+            with self.pool.connection("127.0.0.1", "user", "pass", "db") as first:
+                raise MySQLdb.Error("lost connection")
+        with self.pool.connection("127.0.0.1", "user", "pass", "db") as second:
+            pass
+
+        first.close.assert_called()
+        self.assertIsNot(first, second)
+
+    @patch("IdlePool.time")
+    @patch("MySQLConnectionPool.MySQLdb.connect")
+    def test_dead_connection_replaced(self, mock_connect, mock_time):
+        mock_connect.side_effect = lambda **kwargs: MagicMock()
+        mock_time.time.return_value = 1000.0
+
+        with self.pool.connection("127.0.0.1", "user", "pass", "db") as first:
+            first.ping.side_effect = MySQLdb.OperationalError("gone away")
+
+        mock_time.time.return_value = 1060.0
+        with self.pool.connection("127.0.0.1", "user", "pass", "db") as second:
+            pass
+
+        first.ping.assert_called()
+        self.assertIsNot(first, second)